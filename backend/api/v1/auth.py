@@ -9,7 +9,7 @@ from backend.db.models import User
 from backend.db.sync import ensure_user_dirs, sync_user_configs, sync_user_urls, delete_user_data_folder, sync_folders_to_db
 from backend.core.security import verify_password, get_password_hash, create_access_token
 from backend.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, get_allow_only_one_admin, get_admin_username, get_allow_new_users
-from backend.core.deps import get_current_user, app_logger, get_user_logger
+from backend.core.deps import get_current_user, app_logger, get_user_logger, user_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -32,6 +32,15 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+def revoke_tokens(user: User):
+    """
+    Invalidate every token issued to user. Every process's user cache is
+    keyed by token version, so they all miss on the next request instead
+    of serving the old snapshot until its TTL runs out.
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
 class PasswordChange(BaseModel):
     current_password: str
     new_password: str
@@ -46,6 +55,13 @@ class Token(BaseModel):
     token_type: str
 
 
+def issue_access_token(user: User) -> str:
+    return create_access_token(
+        data={"sub": user.username, "ver": user.token_version or 0},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user: UserCreate, db: Session = Depends(get_db)):
     if not get_allow_new_users():
@@ -105,10 +121,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = issue_access_token(user)
     user_logger = get_user_logger(user.username)
     user_logger.info(f"User logged in")
     app_logger.info(f"User logged in: {user.username}")
@@ -132,6 +145,7 @@ def delete_account(current_user: User = Depends(get_current_user), db: Session =
     user_logger.info(f"User deleted account")
     db.delete(current_user)
     db.commit()
+    user_cache.invalidate(username)
     delete_user_data_folder(username)
     app_logger.info(f"User deleted: {username}")
     return None
@@ -150,13 +164,15 @@ def change_password(
         )
     
     current_user.hashed_password = get_password_hash(password_data.new_password)
+    revoke_tokens(current_user)
     db.commit()
+    user_cache.invalidate(current_user.username)
     
     user_logger = get_user_logger(current_user.username)
     user_logger.info(f"Password changed")
     app_logger.info(f"User {current_user.username} changed password")
     
-    return {"message": "Password changed successfully"}
+    return {"message": "Password changed successfully", "access_token": issue_access_token(current_user)}
 
 
 @router.put("/me/username", status_code=status.HTTP_200_OK)
@@ -183,6 +199,7 @@ def change_username(
     old_username = current_user.username
     current_user.username = new_username
     db.commit()
+    user_cache.invalidate(old_username)
     
     from backend.db.sync import rename_user_folder
     rename_user_folder(old_username, new_username)
@@ -191,7 +208,11 @@ def change_username(
     user_logger.info(f"Username changed from {old_username}")
     app_logger.info(f"User {old_username} changed username to {new_username}")
     
-    return {"message": "Username changed successfully", "username": new_username}
+    return {
+        "message": "Username changed successfully",
+        "username": new_username,
+        "access_token": issue_access_token(current_user)
+    }
 
 
 class EmailChange(BaseModel):
@@ -216,6 +237,7 @@ def change_email(
     old_email = current_user.email
     current_user.email = new_email
     db.commit()
+    user_cache.invalidate(current_user.username)
     
     user_logger = get_user_logger(current_user.username)
     user_logger.info(f"Email changed from {old_email}")
@@ -261,6 +283,7 @@ async def upload_avatar(
     avatar_url = f"/api/v1/avatar/{current_user.username}/avatar.png"
     current_user.avatar = avatar_url
     db.commit()
+    user_cache.invalidate(current_user.username)
     
     return current_user
 
@@ -273,6 +296,7 @@ def update_avatar_url(
 ):
     current_user.avatar = avatar_data.avatar
     db.commit()
+    user_cache.invalidate(current_user.username)
     return current_user
 
 
@@ -360,6 +384,7 @@ def delete_user(
     username = user.username
     db.delete(user)
     db.commit()
+    user_cache.invalidate(username)
     delete_user_data_folder(username)
     app_logger.info(f"User {username} deleted by admin {current_user.username}")
     
@@ -370,6 +395,7 @@ class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[EmailStr] = None
     is_admin: Optional[bool] = None
+    is_active: Optional[bool] = None
 
 
 class UserPasswordChange(BaseModel):
@@ -390,6 +416,7 @@ def update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    old_username = user.username
     if user_data.username:
         if user_data.username.lower() == "global":
             raise HTTPException(status_code=400, detail="Username 'global' is reserved")
@@ -412,10 +439,21 @@ def update_user(
                 existing_admin = db.query(User).filter(User.is_admin == True, User.id != user_id).first()
                 if existing_admin:
                     raise HTTPException(status_code=400, detail="Another user is already an admin")
-        user.is_admin = user_data.is_admin
+        if user.is_admin != user_data.is_admin:
+            user.is_admin = user_data.is_admin
+            revoke_tokens(user)
+    
+    if user_data.is_active is not None and user.is_active != user_data.is_active:
+        if user.id == current_user.id:
+            raise HTTPException(status_code=400, detail="Cannot deactivate your own account")
+        if user.username.lower() == get_admin_username().lower():
+            raise HTTPException(status_code=400, detail="Cannot deactivate the super admin")
+        user.is_active = user_data.is_active
+        revoke_tokens(user)
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(old_username)
     app_logger.info(f"User {user.id} updated by admin {current_user.username}")
     
     return user
@@ -436,7 +474,9 @@ def change_user_password(
         raise HTTPException(status_code=404, detail="User not found")
     
     user.hashed_password = get_password_hash(password_data.new_password)
+    revoke_tokens(user)
     db.commit()
+    user_cache.invalidate(user.username)
     app_logger.info(f"Password for user {user.username} changed by admin {current_user.username}")
     
     return {"message": "Password changed successfully"}
@@ -8,6 +8,7 @@ from backend.db.session import get_db
 from backend.db.models import User, Config
 from backend.db.sync import write_config_to_file, delete_config_file, sync_user_configs, ensure_user_dirs
 from backend.core.deps import get_current_user, app_logger
+from backend.services.config_compiler import validate_config
 
 router = APIRouter(prefix="/configs", tags=["configs"])
 
@@ -88,6 +89,10 @@ def upsert_config(
             except Exception as e:
                 app_logger.warning(f"Failed to load template for new config {name}: {e}")
 
+    errors = validate_config(content)
+    if errors:
+        raise HTTPException(status_code=400, detail="Invalid config: " + "; ".join(errors))
+
     write_config_to_file(current_user.username, name, content)
 
     from datetime import datetime
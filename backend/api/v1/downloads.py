@@ -7,8 +7,10 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from backend.db.session import get_db
-from backend.db.models import User, Config, UrlSource, DownloadJob
+from backend.db.models import User, Config, UrlSource, DownloadJob, DownloadRetry
 from backend.services.downloader import start_download_job, stop_download_job, get_running_jobs
+from backend.services.media_info import probe_media_info
+from backend.services import attempts
 from backend.core.deps import get_current_user, get_current_user_optional, get_current_user_from_query
 
 router = APIRouter(prefix="/downloads", tags=["downloads"])
@@ -30,6 +32,7 @@ class JobStatusResponse(BaseModel):
     name: str
     status: str
     create_symlinks: bool
+    is_retry: bool = False
     started_at: datetime
     finished_at: Optional[datetime] = None
     error_message: Optional[str] = None
@@ -38,6 +41,23 @@ class JobStatusResponse(BaseModel):
         from_attributes = True
 
 
+class RetryResponse(BaseModel):
+    id: int
+    config_name: str
+    urls_name: str
+    folder: str
+    url: str
+    error_class: str
+    attempts: int
+    status: str
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    job_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
 @router.get(
     "/",
     response_model=List[DownloadSourceResponse],
@@ -133,6 +153,45 @@ def start_download(
         raise HTTPException(status_code=500, detail=f"Error starting download: {str(e)}")
 
 
+class MediaInfoResponse(BaseModel):
+    media_key: str
+    title: Optional[str] = None
+    upload_date: Optional[str] = None
+    duration: Optional[int] = None
+    thumbnail: Optional[str] = None
+    webpage_url: Optional[str] = None
+    fetched_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+@router.get(
+    "/info",
+    response_model=MediaInfoResponse,
+    summary="Get metadata for a video URL",
+    description="""
+Return title, upload date, duration and thumbnail for a video URL.
+
+Metadata comes from the extraction cache filled by downloads and earlier
+lookups; the site is only contacted on a cache miss or with `refresh=true`.
+"""
+)
+def get_media_info(
+    url: str = Query(..., description="Video URL"),
+    refresh: bool = Query(False, description="Extract again even if cached"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        row = probe_media_info(url, db, refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to extract metadata: {str(e)[:200]}")
+    if row is None:
+        raise HTTPException(status_code=404, detail="No video metadata found for this URL")
+    return row
+
+
 @router.get("/status/{job_id}", response_model=JobStatusResponse)
 def get_job_status(
     job_id: int,
@@ -380,3 +439,126 @@ def get_users_with_jobs(
             })
     
     return users_with_jobs
+
+
+def _analytics_scope(current_user: User, user_id: Optional[int]) -> Optional[int]:
+    """The user whose attempts to aggregate; None means everyone (admins only)."""
+    if not current_user.is_admin:
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Admin only")
+        return current_user.id
+    return user_id
+
+
+@router.get(
+    "/analytics/outcomes",
+    summary="Count download attempts by outcome",
+    description="""
+Number of per-URL download attempts in the last `days` days, by outcome:
+`ok`, `archived-skip`, `dedup`, `429`, `stall`, `timeout`, `geo`, `private`
+or `error`.
+
+Admins see every user's attempts unless `user_id` is given.
+"""
+)
+def get_attempt_outcomes(
+    days: int = Query(30, ge=1, description="How many days back to look"),
+    user_id: Optional[int] = Query(None, description="Only this user's attempts (admin only)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return attempts.outcome_counts(db, _analytics_scope(current_user, user_id), days)
+
+
+@router.get(
+    "/analytics/failing-urls",
+    summary="List the URLs that fail most often",
+    description="""
+URLs with the most failed attempts in the last `days` days, with their total
+attempts and the outcome and error of their latest failure. Useful for
+finding dead sources to remove from URL lists.
+"""
+)
+def get_failing_urls(
+    days: int = Query(30, ge=1, description="How many days back to look"),
+    limit: int = Query(20, ge=1, le=500, description="How many URLs to return"),
+    user_id: Optional[int] = Query(None, description="Only this user's attempts (admin only)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return attempts.top_failing_urls(db, _analytics_scope(current_user, user_id), days, limit)
+
+
+@router.get(
+    "/analytics/extractors",
+    summary="Get download statistics per extractor",
+    description="""
+Attempts, failures, bytes written and the p50/p95 duration in seconds of
+successful downloads, per extractor (the site's host when the extractor is
+unknown), over the last `days` days.
+"""
+)
+def get_extractor_stats(
+    days: int = Query(30, ge=1, description="How many days back to look"),
+    user_id: Optional[int] = Query(None, description="Only this user's attempts (admin only)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return attempts.extractor_stats(db, _analytics_scope(current_user, user_id), days)
+
+
+@router.get(
+    "/analytics/bytes-per-day",
+    summary="Get bytes downloaded per day",
+    description="""
+Bytes written by downloads and the number of attempts per day (UTC) over the
+last `days` days.
+"""
+)
+def get_bytes_per_day(
+    days: int = Query(30, ge=1, description="How many days back to look"),
+    user_id: Optional[int] = Query(None, description="Only this user's attempts (admin only)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return attempts.bytes_per_day(db, _analytics_scope(current_user, user_id), days)
+
+
+@router.get(
+    "/retries",
+    response_model=List[RetryResponse],
+    summary="List failed URLs queued for retry",
+    description="""
+Failed URLs of your jobs and their retry state: `waiting` for their backoff
+to pass, `queued` in a retry job, or `exhausted` once their error class has
+used up its retry budget (`BACKEND_RETRY_BUDGETS`).
+"""
+)
+def list_retries(
+    status_filter: Optional[str] = Query(None, alias="status", description="Only retries in this state"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(DownloadRetry).filter(DownloadRetry.user_id == current_user.id)
+    if status_filter:
+        query = query.filter(DownloadRetry.status == status_filter)
+    return query.order_by(DownloadRetry.next_attempt_at, DownloadRetry.id).all()
+
+
+@router.delete("/retries/{retry_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_retry(
+    retry_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    retry = db.query(DownloadRetry).filter(
+        DownloadRetry.id == retry_id,
+        DownloadRetry.user_id == current_user.id
+    ).first()
+
+    if not retry:
+        raise HTTPException(status_code=404, detail="Retry not found")
+
+    db.delete(retry)
+    db.commit()
+    return None
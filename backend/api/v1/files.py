@@ -1,12 +1,16 @@
 # TODO: Consider using "SVAR Svelte File Manager" frontend component for better UX
 # https://github.com/sVAR-Svelte-File-Manager/svar-svelte-file-manager
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
-from backend.core.deps import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from backend.core.deps import get_current_user, get_current_user_from_query
+from backend.db.session import get_db
 from backend.db.models import User
+from backend.services.streaming import MediaFileResponse, resolve_media_path, iter_archive_members, stream_zip, stream_tar
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+from urllib.parse import quote
 
 router = APIRouter()
 
@@ -36,6 +40,32 @@ def require_admin(user: User = Depends(get_current_user)):
     return user
 
 
+def get_user_from_request(request: Request, token: Optional[str], db: Session) -> User:
+    """Authenticate from ?token= (players, download links) or the Authorization header."""
+    if token is None:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    current_user = get_current_user_from_query(token, db)
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    return current_user
+
+
+def user_download_path(username: str, path: str) -> Tuple[Path, Path]:
+    """
+    The user's downloads folder and path inside it. Raises 403 when path
+    leads outside the folder; the folder itself is allowed.
+    """
+    base_path = Path(f"data/{username}/downloads")
+    full_path = base_path / path
+    base = os.path.abspath(base_path)
+    target = os.path.abspath(full_path)
+    if target != base and not target.startswith(base + os.sep):
+        raise HTTPException(status_code=403, detail="Invalid path")
+    return base_path, full_path
+
+
 @router.get("/avatar/{username}/{filename}")
 def get_avatar(username: str, filename: str):
     avatar_path = f"data/{username}/avatar/{filename}"
@@ -102,6 +132,55 @@ def list_all_files(
         "has_more": offset + limit < total
     }
 
+@router.api_route("/files/media/{path:path}", methods=["GET", "HEAD"])
+def stream_media_file(
+    path: str,
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT token, for players that can't send an Authorization header"),
+    db: Session = Depends(get_db)
+):
+    current_user = get_user_from_request(request, token, db)
+    base_path, full_path = user_download_path(current_user.username, path)
+
+    # Files deduplicated into the global store are symlinks, so allow the
+    # resolved path to land there as well as in the user's own folder.
+    real_path = resolve_media_path(str(full_path), [base_path, DATA_ROOT / "global" / "downloads"])
+    if real_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return MediaFileResponse(real_path, request.headers, filename=full_path.name)
+
+
+@router.get("/files/archive/{path:path}")
+def download_folder_archive(
+    path: str,
+    request: Request,
+    format: str = Query("zip", pattern="^(zip|tar)$", description="Archive format: zip (store mode) or tar"),
+    token: Optional[str] = Query(None, description="JWT token, for plain download links"),
+    db: Session = Depends(get_db)
+):
+    current_user = get_user_from_request(request, token, db)
+    base_path, full_path = user_download_path(current_user.username, path)
+
+    if not full_path.is_dir():
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    members = iter_archive_members(str(full_path), [base_path, DATA_ROOT / "global" / "downloads"])
+    if format == "tar":
+        body = stream_tar(members)
+        media_type = "application/x-tar"
+    else:
+        body = stream_zip(members)
+        media_type = "application/zip"
+
+    archive_name = f"{full_path.resolve().name or current_user.username}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(archive_name)}"}
+    )
+
+
 @router.post("/files/rename")
 def rename_file(old_path: str, new_path: str, current_user: User = Depends(get_current_user)):
     base_path = f"data/{current_user.username}/downloads"
@@ -178,6 +257,7 @@ def admin_rename_file(
 @router.get("/admin/files/download/{path:path}")
 def admin_download_file(
     path: str, 
+    request: Request,
     current_user: User = Depends(require_admin)
 ):
     full_path = DATA_ROOT / path
@@ -191,8 +271,9 @@ def admin_download_file(
     if not str(full_path.absolute()).startswith(str(DATA_ROOT.absolute())):
         raise HTTPException(status_code=403, detail="Invalid path")
     
-    return FileResponse(
-        full_path, 
+    return MediaFileResponse(
+        str(full_path.resolve()),
+        request.headers,
         filename=full_path.name,
-        media_type='application/octet-stream'
+        as_attachment=True
     )
@@ -9,7 +9,10 @@ from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 from backend.core.config import YT_DLP_PATH, DENO_PATH
 from backend.core.deps import app_logger
+from backend.services.bandwidth import ENV_KEYS as BANDWIDTH_ENV_KEYS, apply_env_config, get_bandwidth_governor, parse_env_config
 import platform
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/system", tags=["system"])
 
@@ -52,6 +55,26 @@ class UpgradeResponse(BaseModel):
     message: str
 
 
+class SyncStatusResponse(BaseModel):
+    state: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    current_user: Optional[str] = None
+    users_total: int
+    users_done: int
+    dirs_scanned: int
+    dirs_changed: int
+    files_added: int
+    files_removed: int
+    error: Optional[str] = None
+
+
+@router.get("/sync-status", response_model=SyncStatusResponse)
+def get_sync_status():
+    from backend.db.sync import sync_status
+    return dict(sync_status)
+
+
 @router.get("/check", response_model=SystemCheckResponse)
 def get_system_check():
     yt_dlp_installed = False
@@ -139,9 +162,18 @@ def get_env_config():
         else:
             result[key] = value
     
+    # Bandwidth settings are applied live, so list them even when unset
+    for key in BANDWIDTH_ENV_KEYS:
+        result.setdefault(key, os.getenv(key, ""))
+    
     return result
 
 
+@router.get("/bandwidth", response_model=dict)
+def get_bandwidth_status():
+    return get_bandwidth_governor().status()
+
+
 
 @router.get("/server-info", response_model=ServerInfoResponse)
 def get_server_info():
@@ -200,6 +232,11 @@ def update_env_config(config: dict):
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
     env_path = os.path.join(project_root, ".env")
     
+    try:
+        parse_env_config(config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         with open(env_path, 'r') as f:
             lines = f.readlines()
@@ -219,7 +256,11 @@ def update_env_config(config: dict):
                 f.write(f"{key}={value}\n")
         
         app_logger.info(f"Environment config updated: {list(config.keys())}")
-        return {"success": True, "message": "Configuration updated. Restart server to apply changes."}
+        bandwidth_applied = apply_env_config(config)
+        message = "Configuration updated. Restart server to apply changes."
+        if bandwidth_applied:
+            message += " Bandwidth limits were applied immediately."
+        return {"success": True, "message": message}
     except Exception as e:
         app_logger.error(f"Failed to update env config: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
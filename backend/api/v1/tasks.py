@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 from backend.db.session import get_db
 from backend.db.models import User, ScheduledTask
 from backend.core.deps import get_current_user
-from backend.services.scheduler import validate_cron_expression, get_next_run_time, delete_old_files
+from backend.services.scheduler import validate_cron_expression, get_next_run_time, delete_old_files, scheduler, MISFIRE_POLICIES
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -20,6 +20,9 @@ class ScheduledTaskCreate(BaseModel):
     cron_expression: str
     config: Optional[str] = None
     target_user_id: Optional[int] = None
+    misfire_policy: str = "once"
+    jitter_seconds: int = 0
+    max_catchup: int = 5
 
 
 class ScheduledTaskUpdate(BaseModel):
@@ -29,6 +32,9 @@ class ScheduledTaskUpdate(BaseModel):
     cron_expression: Optional[str] = None
     config: Optional[str] = None
     is_active: Optional[bool] = None
+    misfire_policy: Optional[str] = None
+    jitter_seconds: Optional[int] = None
+    max_catchup: Optional[int] = None
 
 
 class ScheduledTaskResponse(BaseModel):
@@ -42,12 +48,24 @@ class ScheduledTaskResponse(BaseModel):
     is_active: bool
     last_run: Optional[datetime] = None
     next_run: Optional[datetime] = None
+    misfire_policy: str = "once"
+    jitter_seconds: int = 0
+    max_catchup: int = 5
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+def validate_misfire_settings(misfire_policy: Optional[str], jitter_seconds: Optional[int], max_catchup: Optional[int]):
+    if misfire_policy is not None and misfire_policy not in MISFIRE_POLICIES:
+        raise HTTPException(status_code=400, detail=f"misfire_policy must be one of: {', '.join(MISFIRE_POLICIES)}")
+    if jitter_seconds is not None and jitter_seconds < 0:
+        raise HTTPException(status_code=400, detail="jitter_seconds must not be negative")
+    if max_catchup is not None and max_catchup < 1:
+        raise HTTPException(status_code=400, detail="max_catchup must be at least 1")
+
+
 class DeleteOldFilesRequest(BaseModel):
     days: int
 
@@ -95,6 +113,8 @@ def create_scheduled_task(
     if not validate_cron_expression(task.cron_expression):
         raise HTTPException(status_code=400, detail="Invalid cron expression")
 
+    validate_misfire_settings(task.misfire_policy, task.jitter_seconds, task.max_catchup)
+
     if task.task_type == "download":
         config = db.query(Config).filter(
             Config.user_id == target_user_id,
@@ -117,11 +137,15 @@ def create_scheduled_task(
         datasource=task.datasource,
         cron_expression=task.cron_expression,
         config=task.config,
-        next_run=next_run
+        next_run=next_run,
+        misfire_policy=task.misfire_policy,
+        jitter_seconds=task.jitter_seconds,
+        max_catchup=task.max_catchup
     )
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    scheduler.reschedule(db_task.id)
     
     return db_task
 
@@ -193,6 +217,14 @@ def update_scheduled_task(
     
     if task_update.config is not None:
         task.config = task_update.config
+
+    validate_misfire_settings(task_update.misfire_policy, task_update.jitter_seconds, task_update.max_catchup)
+    if task_update.misfire_policy is not None:
+        task.misfire_policy = task_update.misfire_policy
+    if task_update.jitter_seconds is not None:
+        task.jitter_seconds = task_update.jitter_seconds
+    if task_update.max_catchup is not None:
+        task.max_catchup = task_update.max_catchup
     
     if task_update.is_active is not None:
         task.is_active = task_update.is_active
@@ -203,6 +235,7 @@ def update_scheduled_task(
     
     db.commit()
     db.refresh(task)
+    scheduler.reschedule(task.id)
     
     return task
 
@@ -225,6 +258,7 @@ def delete_scheduled_task(
     
     db.delete(task)
     db.commit()
+    scheduler.unschedule(task_id)
     
     return None
 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+fragment_throughput.py - Compare throughput profiles on a local HLS stream
+
+Writes an HLS fixture (a media playlist of fixed-size segments) to a temp
+directory and serves it from localhost with per-request latency and a
+per-connection bandwidth cap, so fragment concurrency matters the way it
+does against a real CDN. The stream is then downloaded once per throughput
+profile with yt-dlp's native HLS downloader.
+
+Usage:
+    python -m backend.benchmarks.fragment_throughput --segments 40 --latency 0.05 --rate 2048
+"""
+
+import argparse
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import yt_dlp
+
+from backend.services.throughput import THROUGHPUT_PROFILES, build_throughput_params
+
+
+def write_fixture(folder: str, segments: int, segment_size: int):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0"]
+    for i in range(segments):
+        with open(os.path.join(folder, f"seg{i:05d}.ts"), "wb") as f:
+            f.write(os.urandom(segment_size))
+        lines += ["#EXTINF:2.0,", f"seg{i:05d}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    with open(os.path.join(folder, "stream.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+class ThrottledHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    rate = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def copyfile(self, source, outputfile):
+        time.sleep(self.latency)
+        chunk_size = 16 * 1024
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            if self.rate:
+                time.sleep(len(chunk) / self.rate)
+
+
+def serve(folder: str, latency: float, rate: int) -> ThreadingHTTPServer:
+    handler = type("Handler", (ThrottledHandler,), {"latency": latency, "rate": rate})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=folder))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_profile(profile: str, url: str, out_dir: str) -> float:
+    params = build_throughput_params(profile, {})
+    params.update({
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "outtmpl": os.path.join(out_dir, f"{profile}.%(ext)s"),
+        "fixup": "never",
+    })
+    start = time.perf_counter()
+    with yt_dlp.YoutubeDL(params) as ydl:
+        ydl.download([url])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fragment download throughput profiles")
+    parser.add_argument("--segments", type=int, default=40, help="Number of HLS segments")
+    parser.add_argument("--segment-size", type=int, default=256, help="Segment size in KiB")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of latency added to every request")
+    parser.add_argument("--rate", type=int, default=2048, help="Per-connection bandwidth cap in KiB/s (0 = unlimited)")
+    parser.add_argument("--profiles", nargs="+", default=list(THROUGHPUT_PROFILES), help="Profiles to compare")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp(prefix="hls-fixture-")
+    out_dir = tempfile.mkdtemp(prefix="hls-out-")
+    try:
+        write_fixture(fixture_dir, args.segments, args.segment_size * 1024)
+        server = serve(fixture_dir, args.latency, args.rate * 1024)
+        url = f"http://127.0.0.1:{server.server_address[1]}/stream.m3u8"
+        total_mib = args.segments * args.segment_size / 1024
+        print(f"{args.segments} segments, {total_mib:.1f} MiB, {args.latency * 1000:.0f} ms latency, "
+              f"{args.rate} KiB/s per connection", flush=True)
+
+        for profile in args.profiles:
+            elapsed = run_profile(profile, url, out_dir)
+            print(f"{profile:>12}: {elapsed:.2f}s = {total_mib / elapsed:.1f} MiB/s", flush=True)
+
+        server.shutdown()
+    finally:
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
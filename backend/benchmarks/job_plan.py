@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+job_plan.py - Compare per-URL config resolution with a per-job JobPlan
+
+Resolves the bundled video_720p.json template for every URL of a synthetic
+source (what run_download used to do) and once per job followed by
+JobPlan.for_url(). The per-URL baseline clears the compile cache before
+every URL, since run_download used to parse the config each time; the
+per-URL time with a warm cache is printed too. The template's download
+archive is dropped so the benchmark doesn't touch any user's data folder.
+
+Usage:
+    python -m backend.benchmarks.job_plan --urls 5000
+"""
+
+import argparse
+import json
+import time
+
+from backend.core.config import BACKEND_DIR
+from backend.services.config_compiler import clear_compile_cache
+from backend.services.job_plan import build_job_plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-URL vs per-job config resolution")
+    parser.add_argument("--urls", type=int, default=5000, help="Number of URLs in the synthetic source")
+    parser.add_argument("--username", default="benchmark", help="Username the plan is built for")
+    args = parser.parse_args()
+
+    with open(BACKEND_DIR / "templates" / "video_720p.json", "r", encoding="utf-8") as f:
+        config_data = json.load(f)
+    config_data["yt-dlp"].pop("--download-archive", None)
+    config_content = json.dumps(config_data)
+
+    urls = [f"https://www.youtube.com/watch?v={i:011d}" for i in range(args.urls)]
+
+    start = time.perf_counter()
+    for url in urls:
+        clear_compile_cache()
+        build_job_plan(config_content, args.username).for_url(url)
+    per_url = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for url in urls:
+        build_job_plan(config_content, args.username).for_url(url)
+    per_url_cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plan = build_job_plan(config_content, args.username)
+    for url in urls:
+        plan.for_url(url)
+    per_job = time.perf_counter() - start
+
+    print(f"per-URL resolution:         {per_url * 1000:.1f} ms ({per_url / len(urls) * 1e6:.1f} us/URL)", flush=True)
+    print(f"per-URL, warm compile cache: {per_url_cached * 1000:.1f} ms ({per_url_cached / len(urls) * 1e6:.1f} us/URL)", flush=True)
+    print(f"per-job JobPlan:            {per_job * 1000:.1f} ms ({per_job / len(urls) * 1e6:.1f} us/URL)", flush=True)
+    print(f"speedup: {per_url / per_job:.1f}x ({per_url_cached / per_job:.1f}x with a warm cache)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+login_throughput.py - Measure password verifications per second under concurrency
+
+Runs the same number of concurrent logins three ways:
+- inline: bcrypt in the calling threads (the old behaviour)
+- pool:   bcrypt in the bounded hashing process pool
+- cached: repeated logins answered by the verification cache
+
+Usage:
+    python -m backend.benchmarks.login_throughput --logins 64 --concurrency 16
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.core import security
+
+
+def run(label: str, verify, password: str, hashed: str, logins: int, concurrency: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: verify(password, hashed), range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    print(f"{label:>7}: {logins} logins in {elapsed:.2f}s = {logins / elapsed:.1f} logins/s", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password verification throughput")
+    parser.add_argument("--logins", type=int, default=64, help="Number of logins per run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent request threads")
+    args = parser.parse_args()
+
+    password = "benchmark-password"
+    hashed = security.pwd_context.hash(password)
+    print(f"bcrypt rounds: {security.BCRYPT_ROUNDS}, hash workers: {security.PASSWORD_HASH_WORKERS}", flush=True)
+
+    run("inline", security._verify_in_process, password, hashed, args.logins, args.concurrency)
+
+    security._verification_cache.ttl = 0
+    security.get_password_hash("warm-up")
+    run("pool", security.verify_password, password, hashed, args.logins, args.concurrency)
+
+    security._verification_cache.ttl = 300
+    security.verify_password(password, hashed)
+    run("cached", security.verify_password, password, hashed, args.logins, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
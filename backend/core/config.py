@@ -21,6 +21,14 @@ SECRET_KEY = os.getenv("BACKEND_SECRET_KEY", "your-secret-key-change-in-producti
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+AUTH_USER_CACHE_TTL = int(os.getenv("BACKEND_AUTH_USER_CACHE_TTL", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("BACKEND_AUTH_USER_CACHE_SIZE", "1024"))
+
+BCRYPT_ROUNDS = int(os.getenv("BACKEND_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("BACKEND_PASSWORD_HASH_WORKERS", "2"))
+LOGIN_CACHE_TTL = int(os.getenv("BACKEND_LOGIN_CACHE_TTL", "300"))
+LOGIN_CACHE_SIZE = int(os.getenv("BACKEND_LOGIN_CACHE_SIZE", "1024"))
+
 HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
 PORT = int(os.getenv("BACKEND_PORT", "8200"))
 
@@ -33,7 +41,40 @@ LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
 MAX_COOKIES_FILE_SIZE = int(os.getenv("MAX_COOKIES_FILE_SIZE", "10")) * 1024 * 1024  # 10 MB default
 
 MAX_CONCURRENT_DOWNLOADS = int(os.getenv("BACKEND_MAX_CONCURRENT_DOWNLOADS", "3"))
+EXECUTION_MODE = os.getenv("BACKEND_EXECUTION_MODE", "thread").lower()
+WORKER_MAX_JOBS = int(os.getenv("BACKEND_WORKER_MAX_JOBS", "20"))
+WORKER_MAX_RSS_MB = int(os.getenv("BACKEND_WORKER_MAX_RSS_MB", "0"))
+WORKER_KILL_GRACE = int(os.getenv("BACKEND_WORKER_KILL_GRACE", "60"))
+WORKER_POLL_INTERVAL = int(os.getenv("BACKEND_WORKER_POLL_INTERVAL", "5"))
+WORKER_HEARTBEAT_INTERVAL = int(os.getenv("BACKEND_WORKER_HEARTBEAT_INTERVAL", "15"))
+WORKER_STALE_AFTER = int(os.getenv("BACKEND_WORKER_STALE_AFTER", "90"))
 DEDUPLICATION_ENABLED = os.getenv("BACKEND_DEDUPLICATION_ENABLED", "true").lower() == "true"
+DEDUPLICATION_LINK_MODE = os.getenv("BACKEND_DEDUPLICATION_LINK_MODE", "symlink").lower()
+
+LEASE_BACKEND = os.getenv("BACKEND_LEASE_BACKEND", "none").lower()
+LEASE_TTL = int(os.getenv("BACKEND_LEASE_TTL", "60"))
+
+SCHEDULER_MISFIRE_GRACE = int(os.getenv("BACKEND_SCHEDULER_MISFIRE_GRACE", "60"))
+SCHEDULER_CATCHUP_SPREAD = int(os.getenv("BACKEND_SCHEDULER_CATCHUP_SPREAD", "30"))
+SCHEDULER_RESYNC_INTERVAL = int(os.getenv("BACKEND_SCHEDULER_RESYNC_INTERVAL", "30"))
+
+PLAYLIST_STOP_AFTER_KNOWN = int(os.getenv("BACKEND_PLAYLIST_STOP_AFTER_KNOWN", "10"))
+PLAYLIST_FULL_SCAN_DAYS = int(os.getenv("BACKEND_PLAYLIST_FULL_SCAN_DAYS", "7"))
+
+MEDIA_INFO_TTL = int(os.getenv("BACKEND_MEDIA_INFO_TTL", "2592000"))
+MEDIA_INFO_FORMATS_TTL = int(os.getenv("BACKEND_MEDIA_INFO_FORMATS_TTL", "18000"))
+
+SIDECAR_WORKERS = int(os.getenv("BACKEND_SIDECAR_WORKERS", "4"))
+SIDECAR_TIMEOUT = int(os.getenv("BACKEND_SIDECAR_TIMEOUT", "20"))
+
+BANDWIDTH_LIMIT = os.getenv("BACKEND_BANDWIDTH_LIMIT", "0")
+BANDWIDTH_USER_LIMIT = os.getenv("BACKEND_BANDWIDTH_USER_LIMIT", "0")
+BANDWIDTH_SCHEDULE = os.getenv("BACKEND_BANDWIDTH_SCHEDULE", "")
+
+RETRY_BUDGETS = os.getenv("BACKEND_RETRY_BUDGETS", "429=5,stall=3,timeout=3,error=2")
+RETRY_BASE_DELAY = int(os.getenv("BACKEND_RETRY_BASE_DELAY", "300"))
+RETRY_MAX_DELAY = int(os.getenv("BACKEND_RETRY_MAX_DELAY", "21600"))
+RETRY_POLL_INTERVAL = int(os.getenv("BACKEND_RETRY_POLL_INTERVAL", "60"))
 
 def get_allow_only_one_admin():
     return os.getenv("ALLOW_ONLY_ONE_ADMIN", "true").lower() == "true"
@@ -1,19 +1,47 @@
 import logging
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from logging.handlers import RotatingFileHandler
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from backend.db.session import get_db
 from backend.db.models import User
 from backend.core.security import decode_access_token
-from backend.core.config import LOGS_DIR, DATA_DIR, MAX_LOG_FILE_SIZE, LOG_BACKUP_COUNT
+from backend.core.config import LOGS_DIR, DATA_DIR, MAX_LOG_FILE_SIZE, LOG_BACKUP_COUNT, AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 os.makedirs(LOGS_DIR, exist_ok=True)
 
+_TOKEN_QUERY_RE = re.compile(r"([?&]token=)[^&\s\"']+")
+
+
+class RedactTokenFilter(logging.Filter):
+    """
+    Masks ?token= values in log records. Media and download links carry the
+    session JWT in the URL, which the access log would otherwise keep.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if "token=" not in record.getMessage():
+            return True
+        if isinstance(record.msg, str):
+            record.msg = _TOKEN_QUERY_RE.sub(r"\1[redacted]", record.msg)
+        if isinstance(record.args, tuple):
+            # Formatters such as uvicorn's access log read the args themselves
+            record.args = tuple(
+                _TOKEN_QUERY_RE.sub(r"\1[redacted]", str(arg)) if "token=" in str(arg) else arg
+                for arg in record.args
+            )
+        return True
+
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -26,6 +54,11 @@ logging.basicConfig(
         logging.StreamHandler()
     ]
 )
+_redact_tokens = RedactTokenFilter()
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(_redact_tokens)
+# uvicorn's access logger has its own handlers and doesn't propagate
+logging.getLogger("uvicorn.access").addFilter(_redact_tokens)
 
 app_logger = logging.getLogger("app")
 
@@ -55,6 +88,83 @@ def get_user_logger(username: str) -> logging.Logger:
     return _user_loggers[username]
 
 
+class UserCache:
+    """
+    Short-lived, size-bounded cache of authenticated users.
+
+    Entries are keyed by (username, token version) and hold detached
+    snapshots of active users; each request merges the snapshot into its own
+    session without a SELECT. Call invalidate() after changing a user. Other
+    workers keep their copy until the TTL runs out, so changes that must
+    take effect everywhere at once (password, is_active, is_admin) also
+    bump User.token_version, which none of the cached keys match.
+    """
+
+    def __init__(self, ttl: int = AUTH_USER_CACHE_TTL, max_size: int = AUTH_USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str, version: int) -> Optional[User]:
+        if self.ttl <= 0:
+            return None
+        key = (username, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def put(self, user: User, version: int):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        snapshot = User(**{
+            attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs
+        })
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[(user.username, version)] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end((user.username, version))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """Drop cached entries for username, or everything when username is None."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == username]:
+                del self._entries[key]
+
+
+user_cache = UserCache()
+
+
+def _load_user(payload: dict, db: Session) -> Optional[User]:
+    username: Optional[str] = payload.get("sub")
+    if username is None:
+        return None
+    version = payload.get("ver", 0)
+
+    snapshot = user_cache.get(username, version)
+    if snapshot is not None:
+        return db.merge(snapshot, load=False)
+
+    user = db.query(User).filter(User.username == username).first()
+    if user is None or (user.token_version or 0) != version:
+        return None
+    if user.is_active:
+        user_cache.put(user, version)
+    return user
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -67,10 +177,7 @@ def get_current_user(
     payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
-    username: Optional[str] = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    user = db.query(User).filter(User.username == username).first()
+    user = _load_user(payload, db)
     if user is None:
         raise credentials_exception
     if not user.is_active:
@@ -100,10 +207,7 @@ def get_current_user_from_query(
         payload = decode_access_token(token)
         if payload is None:
             return None
-        username: Optional[str] = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
+        user = _load_user(payload, db)
         if user is None or not user.is_active:
             return None
         return user
@@ -1,20 +1,138 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from backend.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from backend.core.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, LOGIN_CACHE_TTL, LOGIN_CACHE_SIZE
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
+DEFAULT_PASSWORD = "changeme"
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+
+
+def _verify_in_process(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+def _hash_in_process(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _get_hash_pool() -> Optional[ProcessPoolExecutor]:
+    global _hash_pool
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _hash_pool
+
+
+def _run_hashing(fn, *args):
+    """
+    Run a bcrypt operation in the bounded hashing pool.
+
+    bcrypt burns ~250 ms of CPU per call; the pool caps how many cores a
+    login storm can take, no matter how many request threads are waiting.
+    Falls back to hashing inline when the pool is disabled or broken.
+    """
+    global _hash_pool
+    pool = _get_hash_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        with _hash_pool_lock:
+            if _hash_pool is pool:
+                _hash_pool = None
+        return fn(*args)
+
+
+class _VerificationCache:
+    """
+    Remembers recent successful password checks so repeated logins skip bcrypt.
+
+    Entries are HMACs of (password, stored hash) under a per-process random
+    key, so plaintext passwords are never kept in memory and an entry stops
+    matching as soon as the stored hash changes.
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._key = os.urandom(32)
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, plain_password: str, hashed_password: str) -> bytes:
+        message = plain_password.encode() + b"\0" + hashed_password.encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def check(self, plain_password: str, hashed_password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        digest = self._digest(plain_password, hashed_password)
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[digest]
+                return False
+            return True
+
+    def add(self, plain_password: str, hashed_password: str):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        digest = self._digest(plain_password, hashed_password)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_verification_cache = _VerificationCache(LOGIN_CACHE_TTL, LOGIN_CACHE_SIZE)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    if _verification_cache.check(plain_password, hashed_password):
+        return True
+    if not _run_hashing(_verify_in_process, plain_password, hashed_password):
+        return False
+    _verification_cache.add(plain_password, hashed_password)
+    return True
+
+
+def get_password_hash(password: str) -> str:
+    return _run_hashing(_hash_in_process, password)
+
+
+@lru_cache(maxsize=1)
+def get_default_password_hash() -> str:
+    """Hash of DEFAULT_PASSWORD, computed once and shared by auto-created users."""
+    return get_password_hash(DEFAULT_PASSWORD)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,69 @@
+from sqlalchemy import inspect, text
+from backend.db.base import Base
+from backend.db.session import SessionLocal
+
+
+def add_missing_columns(engine):
+    """
+    Add columns and indexes that exist on the models but not in the database.
+
+    `Base.metadata.create_all` only creates missing tables, so columns and
+    indexes added to existing models would never reach databases created by
+    older versions.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+_BACKFILL_BATCH = 1000
+
+
+def backfill_media_keys():
+    """
+    Fill DownloadedFile.media_key for rows recorded without one. Each row
+    is tried once; rows no extractor resolves are marked checked so later
+    startups skip them.
+    """
+    from backend.db.models import DownloadedFile
+    from backend.services.media_key import get_media_key
+
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = db.query(DownloadedFile).filter(
+                DownloadedFile.id > last_id,
+                DownloadedFile.media_key.is_(None),
+                DownloadedFile.media_key_checked.is_(False),
+                ~DownloadedFile.url.startswith("file://")
+            ).order_by(DownloadedFile.id).limit(_BACKFILL_BATCH).all()
+            if not rows:
+                break
+            for row in rows:
+                row.media_key = get_media_key(row.url)
+                row.media_key_checked = True
+            db.commit()
+            last_id = rows[-1].id
+    finally:
+        db.close()
+
+
+def upgrade_schema(engine):
+    add_missing_columns(engine)
+    backfill_media_keys()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, DateTime, Boolean, ForeignKey, LargeBinary, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.db.base import Base
@@ -15,6 +15,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     configs = relationship("Config", back_populates="user", cascade="all, delete-orphan")
     url_sources = relationship("UrlSource", back_populates="user", cascade="all, delete-orphan")
@@ -51,7 +52,10 @@ class DownloadedFile(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, nullable=False, index=True)
-    file_path = Column(String, nullable=False)
+    media_key = Column(String, nullable=True, index=True)
+    # Set once backfill_media_keys has tried to resolve a row without a key
+    media_key_checked = Column(Boolean, nullable=False, default=False, server_default="0")
+    file_path = Column(String, nullable=False, index=True)
     file_hash = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -65,11 +69,73 @@ class DownloadJob(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
-    status = Column(String, default="pending")
+    status = Column(String, default="pending", index=True)
     create_symlinks = Column(Boolean, default=True)
     started_at = Column(DateTime, default=datetime.utcnow)
     finished_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    stop_requested = Column(Boolean, nullable=False, default=False, server_default="0")
+    is_retry = Column(Boolean, nullable=False, default=False, server_default="0")
+
+    items = relationship("DownloadJobItem", back_populates="job", cascade="all, delete-orphan")
+
+
+class DownloadJobItem(Base):
+    __tablename__ = "download_job_items"
+    __table_args__ = (UniqueConstraint("job_id", "folder", "url", name="uq_download_job_items_job_folder_url"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("download_jobs.id"), nullable=False, index=True)
+    folder = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    error_message = Column(Text, nullable=True)
+
+    job = relationship("DownloadJob", back_populates="items")
+
+
+class DownloadAttempt(Base):
+    __tablename__ = "download_attempts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("download_jobs.id"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    url = Column(String, nullable=False, index=True)
+    extractor = Column(String, nullable=True, index=True)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration = Column(Float, nullable=True)
+    bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    outcome = Column(String, nullable=False, index=True)
+    error = Column(Text, nullable=True)
+
+
+class DownloadRetry(Base):
+    __tablename__ = "download_retries"
+    __table_args__ = (UniqueConstraint("user_id", "config_name", "folder", "url", name="uq_download_retries_user_config_folder_url"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    config_name = Column(String, nullable=False)
+    urls_name = Column(String, nullable=False)
+    folder = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    create_symlinks = Column(Boolean, nullable=False, default=True)
+    error_class = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # JSON object: retries used so far per error class, checked against that class's budget
+    class_retries = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="waiting", index=True)
+    next_attempt_at = Column(DateTime, nullable=True, index=True)
+    last_error = Column(Text, nullable=True)
+    job_id = Column(Integer, ForeignKey("download_jobs.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class ScheduledTask(Base):
@@ -85,6 +151,64 @@ class ScheduledTask(Base):
     is_active = Column(Boolean, default=True)
     last_run = Column(DateTime, nullable=True)
     next_run = Column(DateTime, nullable=True)
+    misfire_policy = Column(String, nullable=False, default="once", server_default=text("'once'"))
+    jitter_seconds = Column(Integer, nullable=False, default=0, server_default="0")
+    max_catchup = Column(Integer, nullable=False, default=5, server_default="5")
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="scheduled_tasks")
+
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    key = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# What one process's running downloads of a user ask for, so processes
+# can split the bandwidth limits between them (see services/bandwidth.py)
+class BandwidthDemand(Base):
+    __tablename__ = "bandwidth_demands"
+
+    owner = Column(String, primary_key=True)
+    username = Column(String, primary_key=True)
+    demand = Column(BigInteger, nullable=False, default=0)  # bytes/s, 0 = unlimited
+    downloads = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class PlaylistState(Base):
+    __tablename__ = "playlist_states"
+    __table_args__ = (UniqueConstraint("user_id", "url", name="uq_playlist_states_user_url"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    url = Column(String, nullable=False)
+    playlist_id = Column(String, nullable=True)
+    newest_id = Column(String, nullable=True)
+    entry_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_new_entries = Column(Integer, nullable=False, default=0, server_default="0")
+    last_expanded_at = Column(DateTime, nullable=True)
+    last_full_scan_at = Column(DateTime, nullable=True)
+
+
+class MediaInfo(Base):
+    __tablename__ = "media_info"
+
+    media_key = Column(String, primary_key=True)
+    extractor = Column(String, nullable=False)
+    video_id = Column(String, nullable=False)
+    webpage_url = Column(String, nullable=True, index=True)
+    title = Column(String, nullable=True)
+    upload_date = Column(String, nullable=True)
+    duration = Column(Integer, nullable=True)
+    thumbnail = Column(String, nullable=True)
+    info_json = Column(LargeBinary, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    formats_expire_at = Column(DateTime, nullable=True)
+    # Who the format URLs were extracted for (see media_info.info_scope);
+    # they are only reused within the same scope
+    formats_scope = Column(String, nullable=True)
@@ -1,13 +1,18 @@
+import hashlib
 import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Optional, Set
 from backend.db.session import SessionLocal
 from backend.db.models import User, Config, UrlSource, DownloadedFile
 
 
 DATA_DIR = Path("data")
 GLOBAL_DIR = Path("global")
+SYNC_STATE_FILE = DATA_DIR / "global" / "sync_state.json"
+SYNC_COMMIT_INTERVAL = 200
 
 
 def get_user_data_dir(username: str) -> Path:
@@ -175,6 +180,291 @@ def sync_all_users():
         db.close()
 
 
+sync_status = {
+    "state": "idle",
+    "started_at": None,
+    "finished_at": None,
+    "current_user": None,
+    "users_total": 0,
+    "users_done": 0,
+    "dirs_scanned": 0,
+    "dirs_changed": 0,
+    "files_added": 0,
+    "files_removed": 0,
+    "error": None,
+}
+_sync_status_lock = threading.Lock()
+
+
+def _load_sync_state() -> dict:
+    try:
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == 1:
+            return state
+    except (OSError, ValueError):
+        pass
+    return {"version": 1, "users": {}}
+
+
+def _save_sync_state(state: dict):
+    SYNC_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = SYNC_STATE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, SYNC_STATE_FILE)
+
+
+def _json_dir_signature(directory: Path) -> Optional[str]:
+    """Fingerprint of the *.json files in directory (names, sizes and mtimes)."""
+    try:
+        parts = [str(directory.stat().st_mtime_ns)]
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if entry.name.endswith(".json") and entry.is_file():
+                st = entry.stat()
+                parts.append(f"{entry.name}:{st.st_mtime_ns}:{st.st_size}")
+    except OSError:
+        return None
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _load_downloaded_paths(db, user_id: int) -> Dict[str, Set[str]]:
+    """All recorded file paths of a user, grouped by directory, in one query."""
+    paths: Dict[str, Set[str]] = {}
+    rows = db.query(DownloadedFile.file_path).filter(DownloadedFile.user_id == user_id)
+    for (file_path,) in rows:
+        file_path = file_path or ""
+        paths.setdefault(os.path.dirname(file_path), set()).add(os.path.basename(file_path))
+    return paths
+
+
+def _delete_downloaded_paths(db, user_id: int, rel_paths) -> int:
+    rel_paths = list(rel_paths)
+    for i in range(0, len(rel_paths), 500):
+        db.query(DownloadedFile).filter(
+            DownloadedFile.user_id == user_id,
+            DownloadedFile.file_path.in_(rel_paths[i:i + 500])
+        ).delete(synchronize_session=False)
+    return len(rel_paths)
+
+
+def reconcile_user_downloads(
+    user_id: int,
+    username: str,
+    dir_state: dict,
+    complete: bool = True,
+    stats: Optional[dict] = None,
+    checkpoint: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Incrementally sync a user's downloads tree into downloaded_files.
+
+    dir_state maps each directory (relative to the downloads folder) to its
+    mtime and subdirectories from the previous pass. A directory whose mtime
+    hasn't changed has the same entries as last time, so it is neither listed
+    nor reconciled; only its recorded subdirectories are visited. Recorded
+    paths are loaded in a single query, and only once something changed.
+
+    checkpoint is called with the merged state after each batch of committed
+    changes, so an interrupted pass resumes where it stopped. complete=False
+    means the previous pass never finished, which forces a final sweep for
+    rows in directories that no longer exist. Returns the new dir_state.
+    """
+    stats = stats if stats is not None else {}
+    for key in ("dirs_scanned", "dirs_changed", "files_added", "files_removed"):
+        stats.setdefault(key, 0)
+
+    downloads_dir = get_user_downloads_dir(username)
+    if not downloads_dir.exists():
+        return dir_state
+
+    new_state = {}
+    db_paths = None
+    pending = 0
+    db = SessionLocal()
+    try:
+        if not complete or not dir_state:
+            db_paths = _load_downloaded_paths(db, user_id)
+
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(downloads_dir, rel_dir) if rel_dir else str(downloads_dir)
+            try:
+                mtime = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                continue
+            stats["dirs_scanned"] += 1
+
+            previous = dir_state.get(rel_dir)
+            if previous and previous["mtime"] == mtime:
+                new_state[rel_dir] = previous
+                stack.extend(os.path.join(rel_dir, name) for name in previous["dirs"])
+                continue
+
+            files, subdirs = set(), []
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.add(entry.name)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.name)
+
+            if db_paths is None:
+                db_paths = _load_downloaded_paths(db, user_id)
+
+            known = db_paths.get(rel_dir, set())
+            for filename in files - known:
+                rel_path = os.path.join(rel_dir, filename) if rel_dir else filename
+                db.add(DownloadedFile(user_id=user_id, url=f"file://{rel_path}", file_path=rel_path))
+                stats["files_added"] += 1
+            missing = known - files
+            if missing:
+                stats["files_removed"] += _delete_downloaded_paths(
+                    db, user_id, (os.path.join(rel_dir, name) if rel_dir else name for name in missing)
+                )
+            db_paths[rel_dir] = files
+
+            stats["dirs_changed"] += 1
+            new_state[rel_dir] = {"mtime": mtime, "dirs": sorted(subdirs)}
+            stack.extend(os.path.join(rel_dir, name) for name in subdirs)
+
+            pending += 1
+            if pending >= SYNC_COMMIT_INTERVAL:
+                db.commit()
+                pending = 0
+                if checkpoint:
+                    checkpoint({**dir_state, **new_state})
+
+        if db_paths is not None:
+            stale = [
+                os.path.join(rel_dir, name) if rel_dir else name
+                for rel_dir, names in db_paths.items() if rel_dir not in new_state
+                for name in names
+            ]
+            if stale:
+                stats["files_removed"] += _delete_downloaded_paths(db, user_id, stale)
+
+        db.commit()
+        return new_state
+    finally:
+        db.close()
+
+
+def reconcile_all_users(status: Optional[dict] = None):
+    """
+    Bring the database in line with every user's files, skipping what hasn't
+    changed since the checkpoint in data/global/sync_state.json.
+    """
+    status = status if status is not None else {}
+    state = _load_sync_state()
+
+    db = SessionLocal()
+    try:
+        users = [(user.id, user.username) for user in db.query(User).all()]
+    finally:
+        db.close()
+    status["users_total"] = len(users)
+
+    for user_id, username in users:
+        status["current_user"] = username
+        key = str(user_id)
+        user_state = state["users"].get(key)
+        if not user_state or user_state.get("username") != username:
+            user_state = {"username": username}
+
+        configs_signature = _json_dir_signature(get_user_configs_dir(username))
+        if configs_signature is None or configs_signature != user_state.get("configs"):
+            sync_user_configs(user_id, username)
+            user_state["configs"] = configs_signature
+
+        urls_signature = _json_dir_signature(get_user_urls_dir(username))
+        if urls_signature is None or urls_signature != user_state.get("urls"):
+            sync_user_urls(user_id, username)
+            user_state["urls"] = urls_signature
+
+        def checkpoint(dirs: dict):
+            user_state["downloads"] = dirs
+            user_state["complete"] = False
+            state["users"][key] = user_state
+            _save_sync_state(state)
+
+        user_state["downloads"] = reconcile_user_downloads(
+            user_id,
+            username,
+            user_state.get("downloads", {}),
+            complete=user_state.get("complete", False),
+            stats=status,
+            checkpoint=checkpoint
+        )
+        user_state["complete"] = True
+        state["users"][key] = user_state
+        _save_sync_state(state)
+        status["users_done"] = status.get("users_done", 0) + 1
+
+    user_keys = {str(user_id) for user_id, _ in users}
+    state["users"] = {key: value for key, value in state["users"].items() if key in user_keys}
+    _save_sync_state(state)
+    status["current_user"] = None
+
+
+def _run_background_sync():
+    from backend.core.deps import app_logger
+    from backend.services.leases import get_lease_backend
+
+    backend = get_lease_backend()
+    lease = backend.acquire("sync:startup")
+    if lease is None:
+        with _sync_status_lock:
+            sync_status.update(state="skipped", finished_at=datetime.utcnow())
+        app_logger.info("Startup sync is running in another worker")
+        return
+
+    try:
+        reconcile_all_users(sync_status)
+        with _sync_status_lock:
+            sync_status.update(state="completed", finished_at=datetime.utcnow())
+        app_logger.info(
+            f"Startup sync finished: {sync_status['dirs_changed']}/{sync_status['dirs_scanned']} directories changed, "
+            f"{sync_status['files_added']} files added, {sync_status['files_removed']} removed"
+        )
+    except Exception as e:
+        with _sync_status_lock:
+            sync_status.update(state="failed", finished_at=datetime.utcnow(), error=str(e))
+        app_logger.error(f"Startup sync failed: {e}")
+    finally:
+        backend.release(lease)
+
+
+def start_background_sync() -> bool:
+    """Run reconcile_all_users in a background thread. Returns False if one is already running."""
+    with _sync_status_lock:
+        if sync_status["state"] == "running":
+            return False
+        sync_status.update(
+            state="running",
+            started_at=datetime.utcnow(),
+            finished_at=None,
+            current_user=None,
+            users_total=0,
+            users_done=0,
+            dirs_scanned=0,
+            dirs_changed=0,
+            files_added=0,
+            files_removed=0,
+            error=None,
+        )
+    threading.Thread(target=_run_background_sync, daemon=True, name="startup-sync").start()
+    return True
+
+
 def write_config_to_file(username: str, name: str, content: str):
     config_path = get_user_configs_dir(username) / f"{name}.json"
     config_path.parent.mkdir(parents=True, exist_ok=True)
@@ -229,11 +519,11 @@ def sync_folders_to_db():
                 username = folder.name
                 existing = db.query(User).filter(User.username == username).first()
                 if not existing:
-                    from backend.core.security import get_password_hash
+                    from backend.core.security import get_default_password_hash
                     new_user = User(
                         username=username,
                         email=f"{username}@local",
-                        hashed_password=get_password_hash("changeme"),
+                        hashed_password=get_default_password_hash(),
                         is_active=True,
                         is_admin=False
                     )
@@ -7,9 +7,10 @@ import os
 # TODO: Add l10n (internationalization) support using FastAPI's request localization or similar
 from backend.db.base import Base
 from backend.db.session import engine, SessionLocal
+from backend.db.migrate import upgrade_schema
 from backend.db.models import User, Config, UrlSource, DownloadedFile, DownloadJob
 from backend.api.v1 import auth, configs, urls, downloads, system, logs, files, tasks
-from backend.db.sync import sync_all_users
+from backend.db.sync import start_background_sync
 from backend.core.deps import app_logger
 from backend.core.config import ADMIN_USERNAME, ADMIN_PASSWORD, BASE_DIR
 from backend.core.security import get_password_hash
@@ -50,8 +51,7 @@ app.include_router(tasks.router, prefix="/api/v1")
 def startup_event():
     app_logger.info("Creating database tables...")
     Base.metadata.create_all(bind=engine)
-    app_logger.info("Syncing JSON files and downloads to database...")
-    sync_all_users()
+    upgrade_schema(engine)
     
     db = SessionLocal()
     try:
@@ -69,9 +69,16 @@ def startup_event():
     finally:
         db.close()
     
+    app_logger.info("Syncing JSON files and downloads to database in the background...")
+    start_background_sync()
+    
     from backend.services.scheduler import scheduler
     scheduler.start()
     
+    from backend.services.downloader import resume_interrupted_jobs, retry_scheduler
+    resume_interrupted_jobs()
+    retry_scheduler.start()
+    
     app_logger.info("yt-dlp Manager backend started")
 
 
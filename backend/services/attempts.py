@@ -0,0 +1,195 @@
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import and_, case, func
+
+from backend.db.models import DownloadAttempt
+from backend.services.media_info import lookup_media_key
+from backend.services.media_key import get_extractor_name
+
+
+OUTCOMES = ("ok", "archived-skip", "dedup", "429", "stall", "timeout", "geo", "private", "error")
+
+FAILED_OUTCOMES = ("429", "stall", "timeout", "geo", "private", "error")
+
+# Checked in order; the first match wins
+_ERROR_CLASSES = [
+    ("429", re.compile(r"\b429\b|too many requests|rate.?limit", re.I)),
+    ("stall", re.compile(r"stalled", re.I)),
+    ("timeout", re.compile(r"timed? ?out", re.I)),
+    ("geo", re.compile(r"geo.?restrict|not available (in|from) your (country|location)|blocked in your country", re.I)),
+    ("private", re.compile(r"private video|video is private|members.only|sign in to|login required|requires authentication", re.I)),
+]
+
+_ERROR_EXCERPT = 500
+
+# Rows fetched at a time when streaming durations for the percentiles
+_STREAM_BATCH = 1000
+
+
+def classify_error(error: Optional[str]) -> str:
+    """The outcome class of a failed download, from its error message."""
+    for outcome, pattern in _ERROR_CLASSES:
+        if error and pattern.search(error):
+            return outcome
+    return "error"
+
+
+def extractor_for_url(url: str, db) -> Optional[str]:
+    """The yt-dlp extractor of a URL, or its host when only the generic extractor handles it."""
+    extractor = get_extractor_name(url)
+    if extractor:
+        return extractor
+    media_key = lookup_media_key(url, db)
+    if media_key:
+        return media_key.split(" ", 1)[0]
+    host = urlparse(url).hostname
+    return host[4:] if host and host.startswith("www.") else host
+
+
+def record_attempt(
+    db,
+    user_id: int,
+    job_id: Optional[int],
+    url: str,
+    started_at: datetime,
+    outcome: str,
+    bytes_written: int = 0,
+    error: Optional[str] = None,
+):
+    finished_at = datetime.utcnow()
+    db.add(DownloadAttempt(
+        job_id=job_id,
+        user_id=user_id,
+        url=url,
+        extractor=extractor_for_url(url, db),
+        started_at=started_at,
+        finished_at=finished_at,
+        duration=(finished_at - started_at).total_seconds(),
+        bytes=bytes_written,
+        outcome=outcome,
+        error=error[:_ERROR_EXCERPT] if error else None,
+    ))
+    db.commit()
+
+
+def _scoped(query, user_id: Optional[int], days: int):
+    query = query.filter(DownloadAttempt.started_at >= datetime.utcnow() - timedelta(days=days))
+    if user_id is not None:
+        query = query.filter(DownloadAttempt.user_id == user_id)
+    return query
+
+
+def _nearest_rank(count: int, percent: float) -> int:
+    """1-based nearest-rank position of a percentile among count ascending values."""
+    return max(math.ceil(percent / 100 * count), 1)
+
+
+def outcome_counts(db, user_id: Optional[int], days: int) -> Dict[str, int]:
+    rows = _scoped(
+        db.query(DownloadAttempt.outcome, func.count(DownloadAttempt.id)), user_id, days
+    ).group_by(DownloadAttempt.outcome).all()
+    return {outcome: count for outcome, count in rows}
+
+
+def top_failing_urls(db, user_id: Optional[int], days: int, limit: int) -> List[Dict[str, Any]]:
+    """URLs with the most failed attempts, with their total attempts and latest failure."""
+    failures = func.sum(case((DownloadAttempt.outcome.in_(FAILED_OUTCOMES), 1), else_=0))
+    rows = _scoped(
+        db.query(
+            DownloadAttempt.url,
+            func.count(DownloadAttempt.id),
+            failures,
+            func.max(DownloadAttempt.started_at),
+        ),
+        user_id, days,
+    ).group_by(DownloadAttempt.url).having(failures > 0).order_by(failures.desc()).limit(limit).all()
+    if not rows:
+        return []
+
+    # The latest failure of every listed URL in one query
+    last_ids = _scoped(
+        db.query(func.max(DownloadAttempt.id).label("id")), user_id, days
+    ).filter(
+        DownloadAttempt.url.in_([url for url, _, _, _ in rows]),
+        DownloadAttempt.outcome.in_(FAILED_OUTCOMES)
+    ).group_by(DownloadAttempt.url).subquery()
+    last_failures = {
+        url: (outcome, error) for url, outcome, error in
+        db.query(DownloadAttempt.url, DownloadAttempt.outcome, DownloadAttempt.error)
+        .join(last_ids, DownloadAttempt.id == last_ids.c.id)
+    }
+
+    result = []
+    for url, attempts, failed, last_attempt in rows:
+        last_outcome, last_error = last_failures.get(url, (None, None))
+        result.append({
+            "url": url,
+            "attempts": attempts,
+            "failures": int(failed),
+            "last_attempt": last_attempt,
+            "last_outcome": last_outcome,
+            "last_error": last_error,
+        })
+    return result
+
+
+def extractor_stats(db, user_id: Optional[int], days: int) -> List[Dict[str, Any]]:
+    """
+    Per extractor: attempts, failures, bytes and p50/p95 duration of
+    successful downloads. The counts are aggregated in SQL; the percentiles
+    stream the sorted durations and keep only the two ranks they need.
+    """
+    extractor = func.coalesce(DownloadAttempt.extractor, "unknown")
+    timed = and_(DownloadAttempt.outcome == "ok", DownloadAttempt.duration.isnot(None))
+    rows = _scoped(
+        db.query(
+            extractor,
+            func.count(DownloadAttempt.id),
+            func.sum(case((DownloadAttempt.outcome.in_(FAILED_OUTCOMES), 1), else_=0)),
+            func.sum(DownloadAttempt.bytes),
+            func.sum(case((timed, 1), else_=0)),
+        ),
+        user_id, days,
+    ).group_by(extractor).all()
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    ranks: Dict[str, Dict[int, List[str]]] = {}
+    for name, attempts, failed, size, timed_count in rows:
+        stats[name] = {
+            "extractor": name,
+            "attempts": attempts,
+            "failures": int(failed or 0),
+            "bytes": int(size or 0),
+            "p50_duration": None,
+            "p95_duration": None,
+        }
+        if timed_count:
+            wanted = ranks[name] = {}
+            for percent in (50, 95):
+                wanted.setdefault(_nearest_rank(timed_count, percent), []).append(f"p{percent}_duration")
+
+    if ranks:
+        durations = _scoped(
+            db.query(extractor, DownloadAttempt.duration), user_id, days
+        ).filter(timed).order_by(extractor, DownloadAttempt.duration).yield_per(_STREAM_BATCH)
+        position = 0
+        current = None
+        for name, duration in durations:
+            if name != current:
+                current, position = name, 0
+            position += 1
+            for key in ranks.get(name, {}).get(position, ()):
+                stats[name][key] = duration
+    return sorted(stats.values(), key=lambda entry: entry["attempts"], reverse=True)
+
+
+def bytes_per_day(db, user_id: Optional[int], days: int) -> List[Dict[str, Any]]:
+    day = func.date(DownloadAttempt.started_at)
+    rows = _scoped(
+        db.query(day, func.sum(DownloadAttempt.bytes), func.count(DownloadAttempt.id)), user_id, days
+    ).group_by(day).order_by(day).all()
+    return [{"day": str(d), "bytes": int(total or 0), "attempts": count} for d, total, count in rows]
@@ -0,0 +1,471 @@
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from yt_dlp.utils import parse_bytes
+
+from backend.core.config import BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE, BANDWIDTH_USER_LIMIT
+from backend.core.deps import app_logger
+from backend.db.session import SessionLocal
+from backend.db.models import BandwidthDemand
+from backend.services.leases import PROCESS_OWNER
+
+
+# Env keys the governor reads; /system/env-config applies them without a restart
+ENV_KEYS = ("BACKEND_BANDWIDTH_LIMIT", "BACKEND_BANDWIDTH_USER_LIMIT", "BACKEND_BANDWIDTH_SCHEDULE")
+
+_WINDOW_RE = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})=(.+)$")
+
+# Longest single sleep while throttling, so rate changes apply quickly
+_MAX_SLEEP = 1.0
+
+_SCHEDULE_CHECK_INTERVAL = 30
+
+# How often a shared governor republishes its demand and picks up the other
+# processes'; rows not refreshed for _SHARE_STALE_AFTER belong to dead processes
+_SHARE_INTERVAL = 10
+_SHARE_STALE_AFTER = 3 * _SHARE_INTERVAL
+
+
+def parse_rate(value: Any) -> int:
+    """
+    Bytes/s from a rate such as 500K or 4.2M. 0, empty and "unlimited"
+    mean no limit. Raises ValueError for anything else.
+    """
+    if value is None or isinstance(value, bool):
+        raise ValueError(f"Invalid rate: {value!r}")
+    if isinstance(value, (int, float)):
+        rate = int(value)
+    else:
+        text = str(value).strip()
+        if text.lower() in ("", "0", "unlimited", "none"):
+            return 0
+        rate = parse_bytes(text)
+        if rate is None:
+            raise ValueError(f"Invalid rate: {value!r}")
+    if rate < 0:
+        raise ValueError(f"Invalid rate: {value!r}")
+    return rate
+
+
+def parse_schedule(value: str) -> List[Tuple[int, int, int]]:
+    """
+    Parse a time-of-day schedule into (start_minute, end_minute, rate) windows.
+
+    The format is comma separated HH:MM-HH:MM=RATE windows in server local
+    time, e.g. "01:00-07:00=0,18:00-23:00=2M". A window may wrap past
+    midnight; RATE 0 means unlimited. The first matching window wins, and
+    outside every window the global limit applies. Raises ValueError on malformed input.
+    """
+    windows = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _WINDOW_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid schedule window {part!r}, expected HH:MM-HH:MM=RATE")
+        start_h, start_m, end_h, end_m, rate = match.groups()
+        start = int(start_h) * 60 + int(start_m)
+        end = int(end_h) * 60 + int(end_m)
+        if start >= 24 * 60 or end > 24 * 60 or int(start_m) >= 60 or int(end_m) >= 60:
+            raise ValueError(f"Invalid time in schedule window {part!r}")
+        windows.append((start, end, parse_rate(rate)))
+    return windows
+
+
+def _in_window(minute: int, start: int, end: int) -> bool:
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def _share(total: float, demands: List[float]) -> List[float]:
+    """
+    Split total between demands max-min fairly: nobody gets more than they
+    ask for, and whatever a capped demand leaves over goes to the rest.
+    """
+    if math.isinf(total):
+        return list(demands)
+    shares = [0.0] * len(demands)
+    remaining = total
+    order = sorted(range(len(demands)), key=lambda i: demands[i])
+    for n, i in enumerate(order):
+        fair = remaining / (len(order) - n)
+        shares[i] = min(demands[i], fair)
+        remaining -= shares[i]
+    return shares
+
+
+class TokenBucket:
+    """A token bucket refilled at rate bytes/s that holds at most one second of tokens."""
+
+    def __init__(self, rate: float = math.inf):
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self, now: float):
+        if math.isinf(self._rate):
+            self._tokens = 0.0
+        else:
+            self._tokens = min(self._tokens + (now - self._updated) * self._rate, self._rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+
+    def consume(self, amount: int, stop_check=None):
+        """Take amount tokens, sleeping while the bucket is in debt."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if math.isinf(self._rate):
+                return
+            self._tokens -= amount
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 0 or math.isinf(self._rate):
+                    return
+                wait = -self._tokens / self._rate
+            if stop_check and stop_check():
+                return
+            time.sleep(min(wait, _MAX_SLEEP))
+
+
+class BandwidthSlot:
+    """
+    One running download's share of the bandwidth.
+
+    The slot's bucket is fed by yt-dlp's progress hooks through throttle();
+    the governor changes its rate as downloads start and finish. The rate
+    is also pushed into the params of attached YoutubeDL instances, which
+    yt-dlp's native and external downloaders read as ratelimit.
+    """
+
+    def __init__(self, governor: "BandwidthGovernor", user: str, limit: float):
+        self.governor = governor
+        self.user = user
+        self.limit = limit
+        self.bucket = TokenBucket()
+        self._ydls: List[Any] = []
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> int:
+        """Current limit in bytes/s, 0 when unlimited."""
+        rate = self.bucket.rate
+        return 0 if math.isinf(rate) else int(rate)
+
+    def set_rate(self, rate: float):
+        self.bucket.set_rate(rate)
+        with self._lock:
+            for ydl in self._ydls:
+                self._apply(ydl)
+
+    def _apply(self, ydl):
+        rate = self.rate
+        if rate:
+            ydl.params["ratelimit"] = rate
+        else:
+            ydl.params.pop("ratelimit", None)
+
+    def attach(self, ydl):
+        with self._lock:
+            self._ydls.append(ydl)
+            self._apply(ydl)
+
+    def detach(self, ydl):
+        with self._lock:
+            if ydl in self._ydls:
+                self._ydls.remove(ydl)
+
+    def throttle(self, progress: Mapping[str, Any], stop_check=None):
+        """Charge the bytes reported by a yt-dlp progress hook, sleeping when over the rate."""
+        downloaded = progress.get("downloaded_bytes")
+        if not downloaded:
+            return
+        key = progress.get("tmpfilename") or progress.get("filename") or ""
+        with self._lock:
+            last = self._seen.get(key, 0)
+            if downloaded <= last:
+                return
+            self._seen[key] = downloaded
+        self.bucket.consume(downloaded - last, stop_check)
+
+    def release(self):
+        self.governor.release(self)
+
+
+class BandwidthGovernor:
+    """
+    Bandwidth limits, shared hierarchically: the global limit is split
+    fairly between users with running downloads, each user's share (capped
+    by the per-user limit) between their downloads, and a download never
+    gets more than its config's own --limit-rate. Shares are recomputed
+    whenever a download starts or finishes, the settings change, or a
+    schedule window begins or ends.
+
+    A shared governor also publishes what its users' downloads ask for in
+    the bandwidth_demands table and reads the other processes' rows (the
+    API and every download worker), so the limits hold for all of them
+    together rather than once per process. Other processes' changes are
+    picked up every _SHARE_INTERVAL seconds. When the database can't be
+    reached the governor falls back to its own downloads alone.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = 0,
+        user_limit: int = 0,
+        schedule: Optional[List[Tuple[int, int, int]]] = None,
+        shared: bool = False,
+    ):
+        self._lock = threading.Lock()
+        self._rebalance_lock = threading.Lock()
+        self._slots: List[BandwidthSlot] = []
+        self.global_limit = global_limit
+        self.user_limit = user_limit
+        self.schedule = schedule or []
+        self.shared = shared
+        self._current_limit: Optional[int] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._fixed_rate: Optional[int] = None
+        self._other_processes = 0
+
+    def configure(self, global_limit: int, user_limit: int, schedule: List[Tuple[int, int, int]]):
+        with self._lock:
+            self.global_limit = global_limit
+            self.user_limit = user_limit
+            self.schedule = schedule
+        self.rebalance()
+
+    def set_fixed_rate(self, rate: int):
+        """
+        Give every download in this process rate bytes/s (0 = unlimited)
+        instead of sharing the limits here. Worker processes use this: their
+        share is decided by the governor of the process that started them.
+        """
+        with self._lock:
+            self._fixed_rate = rate
+        self.rebalance()
+
+    def effective_global_limit(self, now: Optional[datetime] = None) -> int:
+        """The global limit at now (local time) after the schedule, 0 when unlimited."""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.schedule:
+            if _in_window(minute, start, end):
+                return rate
+        return self.global_limit
+
+    def register(self, user: str, config_opts: Optional[Mapping[str, Any]] = None) -> BandwidthSlot:
+        """Add a running download for user; config_opts may carry its own rate limit."""
+        limit = (config_opts or {}).get("ratelimit") or 0
+        slot = BandwidthSlot(self, user, limit or math.inf)
+        with self._lock:
+            self._slots.append(slot)
+            self._ensure_watcher()
+        self.rebalance()
+        return slot
+
+    def release(self, slot: BandwidthSlot):
+        with self._lock:
+            if slot in self._slots:
+                self._slots.remove(slot)
+        self.rebalance()
+
+    def rebalance(self):
+        with self._rebalance_lock:
+            with self._lock:
+                global_limit = self.effective_global_limit()
+                self._current_limit = global_limit
+                fixed_rate = self._fixed_rate
+                slots = list(self._slots)
+                user_cap = self.user_limit or math.inf
+
+            if fixed_rate is not None:
+                rates = {slot: min(slot.limit, fixed_rate or math.inf) for slot in slots}
+            else:
+                by_user: Dict[str, List[BandwidthSlot]] = {}
+                for slot in slots:
+                    by_user.setdefault(slot.user, []).append(slot)
+                demands = {
+                    user: min(user_cap, sum(slot.limit for slot in user_slots))
+                    for user, user_slots in by_user.items()
+                }
+                others = self._exchange_demands(demands, by_user) if self.shared else {}
+                rates = _shares(global_limit or math.inf, user_cap, by_user, demands, others)
+
+            for slot, rate in rates.items():
+                slot.set_rate(rate)
+
+    def _exchange_demands(
+        self,
+        demands: Dict[str, float],
+        by_user: Dict[str, List[BandwidthSlot]],
+    ) -> Dict[str, List[float]]:
+        """
+        Publish this process's demand per user and return the other live
+        processes' demands per user (math.inf when unlimited).
+        """
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.query(BandwidthDemand).filter(
+                BandwidthDemand.updated_at < now - timedelta(seconds=_SHARE_STALE_AFTER)
+            ).delete(synchronize_session=False)
+            db.query(BandwidthDemand).filter(
+                BandwidthDemand.owner == PROCESS_OWNER,
+                BandwidthDemand.username.notin_(list(demands))
+            ).delete(synchronize_session=False)
+            for user, demand in demands.items():
+                db.merge(BandwidthDemand(
+                    owner=PROCESS_OWNER,
+                    username=user,
+                    demand=0 if math.isinf(demand) else int(demand),
+                    downloads=len(by_user[user]),
+                    updated_at=now,
+                ))
+            rows = db.query(
+                BandwidthDemand.owner, BandwidthDemand.username, BandwidthDemand.demand
+            ).filter(BandwidthDemand.owner != PROCESS_OWNER).all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            app_logger.warning(f"Failed to share bandwidth demands, limiting this process alone: {e}")
+            return {}
+        finally:
+            db.close()
+
+        others: Dict[str, List[float]] = {}
+        for owner, user, demand in rows:
+            others.setdefault(user, []).append(demand or math.inf)
+        self._other_processes = len({owner for owner, _, _ in rows})
+        return others
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            slots = list(self._slots)
+            global_limit = self.effective_global_limit()
+        return {
+            "global_limit": self.global_limit,
+            "user_limit": self.user_limit,
+            "effective_global_limit": global_limit,
+            "other_processes": self._other_processes,
+            "downloads": [{"user": slot.user, "rate": slot.rate} for slot in slots],
+        }
+
+    def _ensure_watcher(self):
+        """
+        Start the thread that rebalances when a schedule window opens or
+        closes and, for a shared governor, when other processes' demands change.
+        """
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch, name="bandwidth-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(_SHARE_INTERVAL if self.shared else _SCHEDULE_CHECK_INTERVAL)
+            with self._lock:
+                if not self._slots:
+                    self._watcher = None
+                    return
+                changed = (self.shared and self._fixed_rate is None) or (
+                    self.schedule and self.effective_global_limit() != self._current_limit
+                )
+            if changed:
+                try:
+                    self.rebalance()
+                except Exception as e:
+                    app_logger.error(f"Bandwidth rebalance failed: {e}")
+
+
+def _shares(
+    total: float,
+    user_cap: float,
+    by_user: Dict[str, List[BandwidthSlot]],
+    demands: Dict[str, float],
+    others: Dict[str, List[float]],
+) -> Dict[BandwidthSlot, float]:
+    """
+    Rates for this process's slots. Users are shared across all processes:
+    a user's demand is the sum of every process's (capped by user_cap), and
+    their share is then split between the processes by the same rule.
+    """
+    users = list(set(demands) | set(others))
+    totals = [min(user_cap, demands.get(user, 0) + sum(others.get(user, []))) for user in users]
+    rates: Dict[BandwidthSlot, float] = {}
+    for user, user_rate in zip(users, _share(total, totals)):
+        if user not in by_user:
+            continue
+        local_rate = _share(user_rate, [demands[user]] + others.get(user, []))[0]
+        slots = by_user[user]
+        for slot, rate in zip(slots, _share(local_rate, [slot.limit for slot in slots])):
+            rates[slot] = rate
+    return rates
+
+
+def parse_env_config(values: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the bandwidth keys present in values (env-config names) and
+    return them parsed. Raises ValueError naming the bad key.
+    """
+    parsed = {}
+    for key in ENV_KEYS:
+        if key not in values:
+            continue
+        try:
+            if key == "BACKEND_BANDWIDTH_SCHEDULE":
+                parsed[key] = parse_schedule(str(values[key]))
+            else:
+                parsed[key] = parse_rate(values[key])
+        except ValueError as e:
+            raise ValueError(f"{key}: {e}")
+    return parsed
+
+
+_governor: Optional[BandwidthGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_bandwidth_governor() -> BandwidthGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BandwidthGovernor(
+                parse_rate(BANDWIDTH_LIMIT),
+                parse_rate(BANDWIDTH_USER_LIMIT),
+                parse_schedule(BANDWIDTH_SCHEDULE),
+                shared=True,
+            )
+        return _governor
+
+
+def apply_env_config(values: Mapping[str, Any]) -> bool:
+    """
+    Apply the bandwidth keys present in values to the running governor.
+    Returns whether any were present. Raises ValueError on invalid values.
+    """
+    parsed = parse_env_config(values)
+    if not parsed:
+        return False
+    governor = get_bandwidth_governor()
+    governor.configure(
+        parsed.get("BACKEND_BANDWIDTH_LIMIT", governor.global_limit),
+        parsed.get("BACKEND_BANDWIDTH_USER_LIMIT", governor.user_limit),
+        parsed.get("BACKEND_BANDWIDTH_SCHEDULE", governor.schedule),
+    )
+    return True
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from backend.db.models import DownloadJobItem
+
+
+# Items a resumed job doesn't process again
+FINISHED_STATUSES = ("done", "failed")
+
+
+class JobCheckpoint:
+    """
+    Per-URL progress of one job, kept in download_job_items.
+
+    An item is written as "running" when its URL starts and finished as
+    "done" or "failed", so a job picked up again after a restart skips the
+    URLs it already got through without extracting them. Items left
+    "running" were interrupted mid-download; they run again, and yt-dlp
+    continues their .part files instead of starting over.
+    """
+
+    def __init__(self, job_id: int, db):
+        self.job_id = job_id
+        self.db = db
+        self._items: Dict[Tuple[str, str], DownloadJobItem] = {
+            (item.folder, item.url): item
+            for item in db.query(DownloadJobItem).filter(DownloadJobItem.job_id == job_id)
+        }
+
+    @property
+    def resuming(self) -> bool:
+        return bool(self._items)
+
+    def finished_count(self) -> int:
+        return sum(1 for item in self._items.values() if item.status in FINISHED_STATUSES)
+
+    def is_finished(self, folder: str, url: str) -> bool:
+        item = self._items.get((folder, url))
+        return item is not None and item.status in FINISHED_STATUSES
+
+    def was_interrupted(self, folder: str, url: str) -> bool:
+        item = self._items.get((folder, url))
+        return item is not None and item.status == "running"
+
+    def start(self, folder: str, url: str):
+        item = self._items.get((folder, url))
+        if item is None:
+            item = DownloadJobItem(job_id=self.job_id, folder=folder, url=url, attempts=0)
+            self.db.add(item)
+            self._items[(folder, url)] = item
+        item.status = "running"
+        item.attempts += 1
+        item.started_at = datetime.utcnow()
+        item.finished_at = None
+        item.error_message = None
+        self.db.commit()
+
+    def finish(self, folder: str, url: str, status: str, error_message: Optional[str] = None):
+        item = self._items.get((folder, url))
+        if item is None:
+            return
+        item.status = status
+        item.finished_at = datetime.utcnow()
+        item.error_message = error_message
+        self.db.commit()
@@ -0,0 +1,385 @@
+import difflib
+import hashlib
+import json
+import random
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from backend.services.throughput import EXTERNAL_DOWNLOADERS, THROUGHPUT_PROFILES
+
+
+# Option names the manager accepts for a yt-dlp option under another name
+OPTION_ALIASES = {
+    "--subtitleslangs": "--sub-langs",
+    "--js-runtime": "--js-runtimes",
+}
+
+# Options the manager implements itself with its sidecar writers; they are
+# kept out of yt-dlp's params and land in CompiledConfig.manager instead
+MANAGER_OPTIONS = {
+    "--write-info-json": "write_info_json",
+    "--write-thumbnail": "write_thumbnail",
+    "--write-description": "write_description",
+    "--write-link": "write_link",
+}
+
+# Options that run commands or take a server path. Paths a config may still
+# name are confined elsewhere: typed --output templates are rejected below,
+# and build_job_plan() replaces --cookies and --download-archive with the
+# user's own files
+BLOCKED_OPTIONS = {
+    "--exec", "--exec-before-download", "--use-postprocessor", "--alias",
+    "--config-locations", "--batch-file", "--load-info-json", "--print-to-file",
+    "--paths", "--cache-dir", "--plugin-dirs", "--ffmpeg-location",
+    "--netrc", "--netrc-location", "--netrc-cmd", "--cookies-from-browser",
+    "--client-certificate", "--client-certificate-key", "--enable-file-urls",
+    "--downloader", "--downloader-args", "--postprocessor-args", "--write-pages",
+    "--update", "--update-to",
+}
+
+CUSTOM_OPTIONS = {
+    "--poster": bool,
+    "--random-agent": bool,
+    "--download-timeout": int,
+    "--stall-timeout": int,
+    "--only-new-entries": bool,
+    "--throughput-profile": str,
+    "--external-downloader": str,
+    "--stall-min-rate": int,
+}
+
+CUSTOM_CHOICES = {
+    "--throughput-profile": tuple(THROUGHPUT_PROFILES),
+    "--external-downloader": EXTERNAL_DOWNLOADERS,
+}
+
+_RANGE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*$")
+
+_CACHE_SIZE = 128
+
+
+class OptionSpec(NamedTuple):
+    canonical: str
+    dest: Optional[str]
+    takes_value: bool
+
+
+@lru_cache(maxsize=1)
+def get_option_table() -> Dict[str, OptionSpec]:
+    """
+    Map every option string of yt-dlp's CLI, aliases and short forms
+    included, to the spec of its canonical (first long) option.
+    """
+    from yt_dlp.options import create_parser
+
+    table = {}
+    for option in create_parser()._get_all_options():
+        if not option._long_opts:
+            continue
+        spec = OptionSpec(option._long_opts[0], option.dest, option.takes_value())
+        for name in option._long_opts + option._short_opts:
+            table[name] = spec
+    return table
+
+
+@lru_cache(maxsize=1)
+def default_params() -> Dict[str, Any]:
+    """The params yt-dlp's CLI builds when given no options at all."""
+    import yt_dlp
+
+    return yt_dlp.parse_options([]).ydl_opts
+
+
+def resolve_option(key: str) -> Optional[OptionSpec]:
+    """
+    Return the spec of a config key, or None when yt-dlp has no such option.
+    Keys may be any CLI form ("-f", "--format") or the older params-style
+    spelling ("write_info_json").
+    """
+    table = get_option_table()
+    name = key if key.startswith("-") else "--" + key.replace("_", "-")
+    name = OPTION_ALIASES.get(name, name)
+    return table.get(key) or table.get(name)
+
+
+class RangeSampler:
+    """A "min-max" config value, sampled anew every time options are built."""
+
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+        self.integral = low == int(low) and high == int(high)
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["RangeSampler"]:
+        match = _RANGE_RE.match(value) if isinstance(value, str) else None
+        if not match:
+            return None
+        return cls(float(match.group(1)), float(match.group(2)))
+
+    def sample(self):
+        if self.integral:
+            return random.randint(int(self.low), int(self.high))
+        return random.uniform(self.low, self.high)
+
+    def __repr__(self):
+        return f"RangeSampler({self.low:g}-{self.high:g})"
+
+
+class CompiledConfig:
+    """
+    A config translated to yt-dlp params once.
+
+    opts holds the YoutubeDL params the config changes from yt-dlp's
+    defaults, built by yt-dlp's own option parser; samplers holds
+    randomized ranges, which build_opts() samples on each call. manager
+    holds the MANAGER_OPTIONS the config turns on. errors lists the
+    problems found; every setting they name is left out of the compiled
+    config, so a stored config that became invalid still runs without
+    them. Instances are shared through the compile cache and must not be
+    mutated.
+    """
+
+    def __init__(
+        self,
+        opts: Dict[str, Any],
+        samplers: Dict[str, RangeSampler],
+        custom: Dict[str, Any],
+        errors: List[str],
+        manager: Optional[Dict[str, Any]] = None,
+    ):
+        self.opts = opts
+        self.samplers = samplers
+        self.custom = custom
+        self.errors = errors
+        self.manager = manager or {}
+
+    def build_opts(self) -> Dict[str, Any]:
+        opts = dict(self.opts)
+        for key, sampler in self.samplers.items():
+            opts[key] = sampler.sample()
+        return opts
+
+
+def _split_sections(config_data: Dict[str, Any], errors: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return (yt-dlp section, custom section) for both config formats."""
+    if "yt-dlp" in config_data:
+        yt_dlp_section = config_data.get("yt-dlp")
+        custom = config_data.get("custom", {})
+        if not isinstance(yt_dlp_section, dict):
+            errors.append('"yt-dlp" must be an object')
+            yt_dlp_section = {}
+        if not isinstance(custom, dict):
+            errors.append('"custom" must be an object')
+            custom = {}
+        return yt_dlp_section, dict(custom)
+
+    yt_dlp_section = {}
+    custom = {}
+    for key, value in config_data.items():
+        if key.startswith("_"):
+            custom_key = key[1:]
+            if not custom_key.startswith("--"):
+                custom_key = f"--{custom_key}"
+            custom[custom_key] = value
+        else:
+            yt_dlp_section[key] = value
+    return yt_dlp_section, custom
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _parse_error(error: Exception) -> str:
+    """The message of an optparse error without the usage text around it."""
+    message = str(error).strip()
+    return message.rsplit("error: ", 1)[-1].strip()
+
+
+def _parse_args(groups: List[Tuple[str, List[str]]], errors: List[str]) -> Dict[str, Any]:
+    """
+    Run yt-dlp's option parser over the config's arguments. When it rejects
+    them, arguments are added one key at a time, twice over since some
+    options depend on others, and keys that still fail are reported and left
+    out, so a stored config that became invalid still downloads.
+    """
+    import yt_dlp
+
+    def parse(args: List[str]) -> Dict[str, Any]:
+        return yt_dlp.parse_options(args).ydl_opts
+
+    try:
+        return parse([arg for _, args in groups for arg in args])
+    except Exception:
+        pass
+
+    accepted: List[str] = []
+    pending = list(groups)
+    failures: Dict[str, str] = {}
+    for _ in range(2):
+        remaining = []
+        for key, args in pending:
+            try:
+                parse(accepted + args)
+            except Exception as e:
+                failures[key] = _parse_error(e)
+                remaining.append((key, args))
+                continue
+            accepted.extend(args)
+            failures.pop(key, None)
+        pending = remaining
+    for key, message in failures.items():
+        errors.append(f"{key}: {message}")
+    return parse(accepted)
+
+
+def _compile(config_data: Any) -> CompiledConfig:
+    errors: List[str] = []
+    samplers: Dict[str, RangeSampler] = {}
+    manager: Dict[str, Any] = {}
+
+    if not isinstance(config_data, dict):
+        return CompiledConfig({}, {}, {}, ["Config must be a JSON object"])
+
+    yt_dlp_section, custom = _split_sections(config_data, errors)
+    defaults = default_params()
+
+    groups: List[Tuple[str, List[str]]] = []
+    high_args: Dict[str, List[str]] = {}
+    seen: Dict[str, str] = {}
+    for key, value in yt_dlp_section.items():
+        spec = resolve_option(key)
+        if spec is None:
+            suggestion = difflib.get_close_matches(key, get_option_table().keys(), n=1)
+            hint = f" (did you mean {suggestion[0]}?)" if suggestion else ""
+            errors.append(f"Unknown yt-dlp option {key}{hint}")
+            continue
+        if spec.canonical in BLOCKED_OPTIONS:
+            errors.append(f"{key} is not allowed in configs")
+            continue
+        if spec.canonical in seen:
+            errors.append(f"{key} sets the same option as {seen[spec.canonical]}")
+            continue
+        seen[spec.canonical] = key
+
+        if not spec.takes_value:
+            if not isinstance(value, bool):
+                errors.append(f"{key} is a flag and expects true or false")
+            elif value and spec.canonical in MANAGER_OPTIONS:
+                manager[MANAGER_OPTIONS[spec.canonical]] = True
+            elif value:
+                groups.append((key, [spec.canonical]))
+            continue
+
+        if value is True:
+            errors.append(f"{key} expects a value")
+            continue
+        if value is False or value is None:
+            continue
+
+        sampler = RangeSampler.parse(value)
+        if sampler:
+            if spec.dest not in defaults:
+                errors.append(f"{key} doesn't accept a min-max range")
+                continue
+            # Parsed with the range's low end as a stand-in
+            samplers[spec.dest] = sampler
+            value = sampler.low
+            high_args[key] = [spec.canonical, _format_value(sampler.high)]
+
+        args = []
+        for item in value if isinstance(value, list) else [value]:
+            args += [spec.canonical, _format_value(item)]
+        if key.lstrip("-").replace("_", "-") == "subtitleslangs":
+            # The manager's --subtitleslangs also turns subtitles on
+            args += ["--write-subs", "--write-auto-subs"]
+        groups.append((key, args))
+
+    params = _parse_args(groups, errors)
+    opts = {
+        key: value for key, value in params.items()
+        if not key.startswith("_") and (key not in defaults or defaults[key] != value)
+    }
+    if samplers:
+        # Params yt-dlp derived from a sampled value (max_sleep_interval
+        # defaults to sleep_interval) must not keep the stand-in
+        high_params = _parse_args([(key, high_args.get(key, args)) for key, args in groups], [])
+        for key in list(opts):
+            if key in samplers or high_params.get(key) != params.get(key):
+                opts.pop(key)
+    if opts.get("writethumbnail"):
+        # yt-dlp writes the thumbnail itself to embed or convert it
+        manager.pop("write_thumbnail", None)
+    if "outtmpl" in opts:
+        # The manager owns the output template; only entries that turn a
+        # file type off ("pl_thumbnail:" from --embed-thumbnail) are kept
+        typed = sorted(k for k, v in opts["outtmpl"].items() if k != "default" and v)
+        if typed:
+            errors.append(f"--output: typed templates are not allowed ({', '.join(typed)})")
+        outtmpl = {k: v for k, v in opts.pop("outtmpl").items() if k != "default" and not v}
+        if outtmpl:
+            opts["outtmpl"] = outtmpl
+
+    for key, expected in CUSTOM_OPTIONS.items():
+        if key not in custom:
+            continue
+        value = custom[key]
+        if expected is bool and not isinstance(value, bool):
+            errors.append(f"custom {key} expects true or false")
+        elif expected is int and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            errors.append(f"custom {key} expects a number")
+        elif key in CUSTOM_CHOICES and value not in CUSTOM_CHOICES[key]:
+            errors.append(f"custom {key} must be one of: {', '.join(CUSTOM_CHOICES[key])}")
+        else:
+            continue
+        del custom[key]
+
+    return CompiledConfig(opts, samplers, custom, errors, manager)
+
+
+_cache: "OrderedDict[str, CompiledConfig]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_config(content: str) -> CompiledConfig:
+    """
+    Compile a stored config, reusing the result for identical content.
+
+    Raises ValueError when the content isn't valid JSON. Validation problems
+    don't raise; they are listed in CompiledConfig.errors and the settings
+    they name are dropped.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        compiled = _cache.get(digest)
+        if compiled is not None:
+            _cache.move_to_end(digest)
+            return compiled
+
+    compiled = _compile(json.loads(content))
+
+    with _cache_lock:
+        _cache[digest] = compiled
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def clear_compile_cache():
+    """Forget every compiled config, so the next compile_config() parses again."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def validate_config(content: str) -> List[str]:
+    """Return the problems in a config; an empty list means it is valid."""
+    try:
+        return list(compile_config(content).errors)
+    except ValueError as e:
+        return [f"Invalid JSON: {e}"]
@@ -7,13 +7,26 @@ import subprocess
 import threading
 import time
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 from datetime import datetime
-from backend.core.config import BASE_DIR, DATA_DIR, GLOBAL_DIR, SCRIPT_DIR, YT_DLP_PATH, DENO_PATH, MAX_CONCURRENT_DOWNLOADS, DEDUPLICATION_ENABLED
+from backend.core.config import BASE_DIR, DATA_DIR, GLOBAL_DIR, SCRIPT_DIR, YT_DLP_PATH, DENO_PATH, MAX_CONCURRENT_DOWNLOADS, DEDUPLICATION_ENABLED, EXECUTION_MODE, LEASE_BACKEND
 from backend.db.session import SessionLocal
 from backend.db.models import DownloadedFile, DownloadJob, Config, UrlSource
-from backend.core.deps import get_user_logger
-from backend.services.yt_dlp_new import download_batch, build_yt_dlp_opts_from_json
+from backend.core.deps import app_logger, get_user_logger
+from backend.services.yt_dlp_new import download_batch
+from backend.services.job_plan import build_job_plan
+from backend.services.media_key import get_media_key, resolve_media_key, is_collection_url
+from backend.services.playlist_expander import expand_playlist
+from backend.services.media_info import get_reusable_info, info_scope, lookup_media_key, store_media_info
+from backend.services.sidecars import wait_for_sidecars
+from backend.services.bandwidth import get_bandwidth_governor
+from backend.services.job_queue import JobHeartbeat, cancel_pending_job, request_stop, requeue_running_jobs, split_job_name
+from backend.services.checkpoints import JobCheckpoint
+from backend.services.attempts import classify_error, record_attempt
+from backend.services.retries import RetryScheduler, clear_retry, retry_urls_for_job, schedule_retry
+from backend.services.linker import link_file
+from backend.services.singleflight import SingleFlight, Flight
+from backend.services.leases import PROCESS_OWNER, get_lease_backend
 
 
 _running_jobs: Dict[int, dict] = {}
@@ -25,32 +38,71 @@ _users_lock = threading.Lock()
 _queue_processing = False
 _queue_lock = threading.Lock()
 
-_url_locks: Dict[str, threading.Lock] = {}
-_url_locks_lock = threading.Lock()
+download_flights = SingleFlight()
 
 
-def get_url_lock(url: str) -> threading.Lock:
-    """Get or create a lock for a specific URL."""
-    with _url_locks_lock:
-        if url not in _url_locks:
-            _url_locks[url] = threading.Lock()
-        return _url_locks[url]
+def claim_download(
+    url: str,
+    stop_check: Optional[Callable[[], bool]] = None,
+    on_wait: Optional[Callable[[], None]] = None,
+) -> Optional[Flight]:
+    """
+    Become the only downloader of the media behind a URL, keyed by media key.
 
+    Duplicate jobs in this process wait on the leader's flight; the leader
+    then takes a cross-process lease so other workers and hosts sharing the
+    data volume wait as well.
 
-def acquire_url_lock(url: str, timeout: int = 10) -> bool:
-    """Try to acquire a lock for the URL. Returns True if acquired."""
-    lock = get_url_lock(url)
-    return lock.acquire(timeout=timeout)
+    Returns the Flight the caller must pass to finish_download() once done.
+    Returns None when another job downloaded the media while we waited (or
+    the job was stopped); the caller should then look the file up with
+    find_existing_file().
+    """
+    key = get_media_key(url) or url
+    while True:
+        flight, is_leader = download_flights.join(key)
+        if is_leader:
+            flight.lease = acquire_download_lease(key, stop_check, on_wait)
+            return flight
+
+        if on_wait:
+            on_wait()
+        try:
+            while not flight.wait(timeout=5):
+                if stop_check and stop_check():
+                    return None
+        finally:
+            download_flights.leave(flight)
 
+        if flight.result is not None:
+            return None
 
-def release_url_lock(url: str):
-    """Release the lock for the URL."""
-    with _url_locks_lock:
-        if url in _url_locks:
-            try:
-                _url_locks[url].release()
-            except RuntimeError:
-                pass
+
+def acquire_download_lease(
+    key: str,
+    stop_check: Optional[Callable[[], bool]] = None,
+    on_wait: Optional[Callable[[], None]] = None,
+):
+    """Wait for the cross-process lease on a media key. Returns None if the job was stopped."""
+    backend = get_lease_backend()
+    lease = backend.acquire(f"download:{key}")
+    if lease is None and on_wait:
+        on_wait()
+    while lease is None:
+        if stop_check and stop_check():
+            return None
+        time.sleep(5)
+        lease = backend.acquire(f"download:{key}")
+    return lease
+
+
+def finish_download(flight: Flight, result: Optional[str] = None):
+    """Release the leader's lease and hand the result to every waiting job."""
+    try:
+        if flight.lease is not None:
+            get_lease_backend().release(flight.lease)
+    finally:
+        download_flights.finish(flight, result)
 
 
 def hash_url(url: str) -> str:
@@ -67,9 +119,21 @@ def get_user_download_dir(username: str, folder_name: str) -> Path:
 
 
 def find_existing_file(url: str) -> Optional[str]:
+    """
+    Find an already downloaded copy of the media behind a URL.
+
+    Matches on the canonical media key, so every URL form of the same video
+    hits the same row; URLs without a key fall back to an exact match.
+    """
     db = SessionLocal()
     try:
-        downloaded = db.query(DownloadedFile).filter(DownloadedFile.url == url).first()
+        media_key = lookup_media_key(url, db)
+        query = db.query(DownloadedFile).filter(DownloadedFile.file_path != "")
+        if media_key:
+            query = query.filter(DownloadedFile.media_key == media_key)
+        else:
+            query = query.filter(DownloadedFile.url == url)
+        downloaded = query.first()
         if downloaded and os.path.exists(downloaded.file_path):
             return downloaded.file_path
         return None
@@ -140,14 +204,16 @@ def sync_all_archives_to_db(db):
                         if match:
                             video_id = match.group(1)
                             video_url = f"https://www.youtube.com/watch?v={video_id}"
+                            media_key = f"youtube {video_id}"
                             
                             existing = db.query(DownloadedFile).filter(
-                                DownloadedFile.url == video_url
+                                DownloadedFile.media_key == media_key
                             ).first()
                             
                             if not existing:
                                 downloaded = DownloadedFile(
                                     url=video_url,
+                                    media_key=media_key,
                                     file_path="",
                                     user_id=user.id
                                 )
@@ -160,8 +226,6 @@ def sync_all_archives_to_db(db):
 
 def populate_user_archive(username: str, db):
     """Populate user's archive file with all known video IDs from database for yt-dlp to skip."""
-    import re
-    
     user_data_dir = DATA_DIR / username
     archive_file = user_data_dir / "ytdl-archive.txt"
     
@@ -176,18 +240,17 @@ def populate_user_archive(username: str, db):
         except Exception:
             pass
     
-    all_videos = db.query(DownloadedFile).all()
-    
-    yt_id_pattern = re.compile(r'(?:v=|/)([a-zA-Z0-9_-]{11})')
+    all_media_keys = db.query(DownloadedFile.media_key).filter(
+        DownloadedFile.media_key.isnot(None)
+    ).distinct().all()
     
     with open(archive_file, 'a', encoding='utf-8') as f:
-        for video in all_videos:
-            match = yt_id_pattern.search(video.url)
-            if match:
-                video_id = match.group(1)
-                archive_line = f"yt-dlp_manager {video_id}"
-                if archive_line not in existing_ids:
-                    f.write(archive_line + "\n")
+        for (media_key,) in all_media_keys:
+            video_id = media_key.split(" ", 1)[1]
+            archive_line = f"yt-dlp_manager {video_id}"
+            if archive_line not in existing_ids:
+                existing_ids.add(archive_line)
+                f.write(archive_line + "\n")
 
 
 def sync_archive_to_db(archive_path: str, playlist_url: str, user_id: int, db):
@@ -195,13 +258,18 @@ def sync_archive_to_db(archive_path: str, playlist_url: str, user_id: int, db):
     video_urls = parse_archive_file(archive_path, playlist_url)
     
     for video_url in video_urls:
-        existing = db.query(DownloadedFile).filter(
-            DownloadedFile.url == video_url
-        ).first()
+        media_key = get_media_key(video_url)
+        query = db.query(DownloadedFile)
+        if media_key:
+            query = query.filter(DownloadedFile.media_key == media_key)
+        else:
+            query = query.filter(DownloadedFile.url == video_url)
+        existing = query.first()
         
         if not existing:
             downloaded = DownloadedFile(
                 url=video_url,
+                media_key=media_key,
                 file_path="",
                 user_id=user_id
             )
@@ -211,10 +279,9 @@ def sync_archive_to_db(archive_path: str, playlist_url: str, user_id: int, db):
 def add_to_archive(archive_path: str, url: str):
     """Add a URL to the yt-dlp archive file."""
     try:
-        import re
-        yt_id_match = re.search(r'(?:v=|/)([a-zA-Z0-9_-]{11})', url)
-        if yt_id_match:
-            yt_id = yt_id_match.group(1)
+        media_key = resolve_media_key(url)
+        if media_key:
+            yt_id = media_key[1]
             archive_line = f"yt-dlp_manager {yt_id}\n"
             
             # Check for duplicates before writing
@@ -270,20 +337,6 @@ def move_to_global(url: str, source_path: Path) -> Optional[Path]:
         return None
 
 
-def create_symlink(original_path: str, target_path: str) -> bool:
-    try:
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-        if os.path.exists(target_path):
-            if os.path.islink(target_path):
-                os.unlink(target_path)
-            else:
-                os.remove(target_path)
-        os.symlink(original_path, target_path)
-        return True
-    except Exception:
-        return False
-
-
 def build_yt_dlp_args(config_content: str) -> tuple[List[str], List[str]]:
     """
     Parse config JSON and return tuple of (yt-dlp args, custom script args).
@@ -353,15 +406,52 @@ def build_yt_dlp_args(config_content: str) -> tuple[List[str], List[str]]:
     return yt_dlp_args, custom_args
 
 
+def iter_job_urls(urls: List[str], plan, user_id: int, db, user_logger):
+    """
+    Yield the URLs a job downloads. With --only-new-entries, playlists and
+    channels are listed up front and only their new entries are yielded.
+    """
+    for url in urls:
+        if not (plan.only_new_entries and is_collection_url(url)):
+            yield url
+            continue
+
+        try:
+            expansion = expand_playlist(url, plan.for_url(url), user_id, plan.archive_file_path, db)
+        except Exception as e:
+            db.rollback()
+            user_logger.warning(f"Failed to list playlist {url}, downloading it as a whole: {e}")
+            yield url
+            continue
+
+        if expansion is None:
+            yield url
+            continue
+
+        scan = "full scan" if expansion.full_scan else ("stopped at known entries" if expansion.stopped_early else "end of list")
+        user_logger.info(f"Playlist {url}: {len(expansion.new_entries)} new of {expansion.scanned} listed ({scan})")
+        yield from expansion.new_entries
+
+
 def run_download(
     username: str,
     config_name: str,
     urls_name: str,
     job_id: int,
-    create_symlinks: bool = True
+    create_symlinks: bool = True,
+    dispatch_next: bool = True,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
 ):
+    """
+    Run one download job to completion in the calling thread.
+
+    on_progress receives {"current_url", "url_timeout"} as each URL starts.
+    With dispatch_next unset the queue isn't processed afterwards; worker
+    processes leave that to the process that handed them the job.
+    """
     db = SessionLocal()
     user_logger = get_user_logger(username)
+    bandwidth_slot = None
     
     try:
         job = db.query(DownloadJob).filter(DownloadJob.id == job_id).first()
@@ -390,13 +480,33 @@ def run_download(
             UrlSource.name == urls_name
         ).first()
 
-        if not config or not urls_source:
+        if not config or (not urls_source and not job.is_retry):
             job.status = "failed"
             job.error_message = "Config or URLs not found"
             db.commit()
             return
 
-        urls_data = json.loads(urls_source.content)
+        plan = build_job_plan(config.content, username)
+        for error in plan.compiled.errors:
+            user_logger.warning(f"Ignoring setting in config {config_name}: {error}")
+        if plan.archive_file_path:
+            user_logger.info(f"Archive file: {plan.archive_file_path}")
+            if DEDUPLICATION_ENABLED:
+                sync_archive_to_db(plan.archive_file_path, "", job.user_id, db)
+
+        bandwidth_slot = get_bandwidth_governor().register(username, plan.compiled.opts)
+        if bandwidth_slot.rate:
+            user_logger.info(f"Bandwidth limit: {bandwidth_slot.rate / 1024:.0f} KiB/s")
+
+        if job.is_retry:
+            urls_data = retry_urls_for_job(db, job_id)
+            user_logger.info(f"Retrying {sum(len(urls) for urls in urls_data.values())} failed URLs")
+        else:
+            urls_data = json.loads(urls_source.content)
+
+        checkpoint = JobCheckpoint(job_id, db)
+        if checkpoint.resuming:
+            user_logger.info(f"Resuming job {job_id}: {checkpoint.finished_count()} URLs already processed")
 
         for folder_name, urls in urls_data.items():
             with _jobs_lock:
@@ -407,316 +517,222 @@ def run_download(
 
             if isinstance(urls, str):
                 urls = [urls]
+            urls = [url for url in urls if not checkpoint.is_finished(folder_name, url)]
+            if not urls:
+                continue
 
             user_folder = get_user_download_dir(username, folder_name)
             os.makedirs(user_folder, exist_ok=True)
 
-            for url in urls:
+            for url in iter_job_urls(urls, plan, job.user_id, db, user_logger):
                 with _jobs_lock:
                     job_info = _running_jobs.get(job_id, {})
                     if job_info.get("stopped"):
                         user_logger.info(f"Job {job_id} was stopped, exiting")
                         break
 
-                url_lock_acquired = False
+                if checkpoint.is_finished(folder_name, url):
+                    continue
+                if checkpoint.was_interrupted(folder_name, url):
+                    user_logger.info(f"Resuming interrupted download: {url}")
+                checkpoint.start(folder_name, url)
+                attempt_started = datetime.utcnow()
+
+                flight = None
+                flight_result = None
                 # FIXME: Deduplication is unstable and may cause issues - use with caution
                 use_deduplication = DEDUPLICATION_ENABLED
-                
-                archive_file_path = None
-                config_data = json.loads(config.content)
-                
-                yt_dlp_config = config_data
-                custom_args = []
-                
-                if "yt-dlp" in config_data:
-                    yt_dlp_config = config_data.get("yt-dlp", {})
-                    custom_section = config_data.get("custom", {})
-                    for key, value in custom_section.items():
-                        if isinstance(value, bool):
-                            if value:
-                                custom_args.append(key)
-                        elif isinstance(value, list):
-                            custom_args.append(key)
-                            custom_args.extend(str(v) for v in value)
-                        else:
-                            custom_args.append(key)
-                            custom_args.append(str(value))
-                else:
-                    yt_dlp_config = {}
-                    for key, value in config_data.items():
-                        if key.startswith("_"):
-                            custom_key = key[1:]
-                            if isinstance(value, bool):
-                                if value:
-                                    custom_args.append(custom_key)
-                            elif isinstance(value, list):
-                                custom_args.append(custom_key)
-                                custom_args.extend(str(v) for v in value)
-                            else:
-                                custom_args.append(custom_key)
-                                custom_args.append(str(value))
-                        else:
-                            yt_dlp_config[key] = value
-                
-                if "download_archive" in yt_dlp_config or "download-archive" in yt_dlp_config or "--download-archive" in yt_dlp_config:
-                    if "download_archive" in yt_dlp_config:
-                        archive_path = yt_dlp_config["download_archive"]
-                    elif "download-archive" in yt_dlp_config:
-                        archive_path = yt_dlp_config["download-archive"]
-                    else:
-                        archive_path = yt_dlp_config["--download-archive"]
-                    if not os.path.isabs(archive_path):
-                        yt_dlp_config["download_archive"] = str(user_folder.parent / archive_path)
-                    
-                    user_configs_dir = DATA_DIR / username / "configs"
-                    user_configs_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    archive_file = user_configs_dir / "ytdl-archive.txt"
-                    archive_file.touch()
-                    yt_dlp_config["download_archive"] = str(archive_file)
-                    archive_file_path = str(archive_file)
-                    user_logger.info(f"Archive file: {archive_file_path}")
-                    
-                    if DEDUPLICATION_ENABLED:
-                        sync_archive_to_db(archive_file_path, url, job.user_id, db)
+                archive_file_path = plan.archive_file_path
                 
                 if use_deduplication:
-                    url_lock_acquired = acquire_url_lock(url, timeout=30)
-                    
-                    if url_lock_acquired:
-                        existing_file = find_existing_file(url)
-                        if existing_file:
-                            global_path = Path(existing_file)
-                            target_file = user_folder / global_path.name
-                            if create_symlink(existing_file, str(target_file)):
-                                user_logger.info(f"Created symlink (dedup): {global_path.name}")
-                                if archive_file_path:
-                                    add_to_archive(archive_file_path, url)
-                            release_url_lock(url)
-                            continue
-                    else:
-                        existing_file = find_existing_file(url)
-                        if existing_file:
-                            global_path = Path(existing_file)
-                            target_file = user_folder / global_path.name
-                            if create_symlink(existing_file, str(target_file)):
-                                user_logger.info(f"Created symlink (dedup): {global_path.name}")
-                                if archive_file_path:
-                                    add_to_archive(archive_file_path, url)
-                            continue
-                        else:
-                            user_logger.warning(f"URL {url} is being downloaded by another job, waiting...")
-                            time.sleep(10)
-                            url_lock_acquired = acquire_url_lock(url, timeout=60)
-                            if url_lock_acquired:
-                                existing_file = find_existing_file(url)
-                                if existing_file:
-                                    global_path = Path(existing_file)
-                                    target_file = user_folder / global_path.name
-                                    if create_symlink(existing_file, str(target_file)):
-                                        user_logger.info(f"Created symlink (dedup): {global_path.name}")
-                                        if archive_file_path:
-                                            add_to_archive(archive_file_path, url)
-                                    release_url_lock(url)
-                                    continue
+                    def job_stopped() -> bool:
+                        with _jobs_lock:
+                            return _running_jobs.get(job_id, {}).get("stopped", False)
 
-                output_template = str(user_folder / "%(upload_date)s - %(title)s.%(ext)s")
+                    flight = claim_download(
+                        url,
+                        stop_check=job_stopped,
+                        on_wait=lambda: user_logger.info(f"URL {url} is being downloaded by another job, waiting..."),
+                    )
 
-                yt_dlp_config["--output"] = output_template
-                
-                if "cookies" in yt_dlp_config or "--cookies" in yt_dlp_config:
-                    if "cookies" in yt_dlp_config:
-                        cookies_path = yt_dlp_config["cookies"]
-                    else:
-                        cookies_path = yt_dlp_config["--cookies"]
-                    user_cookies_path = DATA_DIR / username / "configs" / "cookies.txt"
-                    if user_cookies_path.exists():
-                        yt_dlp_config["cookies"] = str(user_cookies_path)
-                    elif not os.path.isabs(cookies_path):
-                        yt_dlp_config["cookies"] = str(SCRIPT_DIR / cookies_path)
-
-                if "download_archive" in yt_dlp_config or "--download-archive" in yt_dlp_config:
-                    if "download_archive" in yt_dlp_config:
-                        archive_path = yt_dlp_config["download_archive"]
-                    else:
-                        archive_path = yt_dlp_config["--download-archive"]
-                    user_archive_path = DATA_DIR / username / "configs" / "ytdl-archive.txt"
-                    if user_archive_path.exists():
-                        yt_dlp_config["download_archive"] = str(user_archive_path)
-                    elif not os.path.isabs(archive_path):
-                        yt_dlp_config["download_archive"] = str(SCRIPT_DIR / archive_path)
-
-                base_args, custom_section = build_yt_dlp_opts_from_json(yt_dlp_config)
-                
-                urls_data = {"": [url]}
-                
-                if isinstance(custom_section, dict):
-                    ensure_posters = custom_section.get("--poster", False)
-                    use_random_agent = custom_section.get("--random-agent", False)
-                    download_timeout = custom_section.get("--download-timeout", 7200)
-                    stall_timeout = custom_section.get("--stall-timeout", 300)
-                else:
-                    ensure_posters = False
-                    use_random_agent = False
-                    download_timeout = 7200
-                    stall_timeout = 300
+                    existing_file = find_existing_file(url)
+                    if existing_file:
+                        global_path = Path(existing_file)
+                        target_file = user_folder / global_path.name
+                        link_mode = link_file(existing_file, str(target_file))
+                        if link_mode:
+                            user_logger.info(f"Linked ({link_mode}, dedup): {global_path.name}")
+                            if archive_file_path:
+                                add_to_archive(archive_file_path, url)
+                        if flight:
+                            finish_download(flight, existing_file)
+                        checkpoint.finish(folder_name, url, "done")
+                        record_attempt(db, job.user_id, job_id, url, attempt_started, "dedup")
+                        clear_retry(db, job.user_id, config_name, folder_name, url)
+                        continue
+
+                pending_sidecars = []
+                try:
+                    base_args = plan.for_url(url)
+                    scope = info_scope(job.user_id, base_args.get("cookiefile"))
+                    urls_data = {"": [url]}
                 
-                user_logger.info(f"Starting download using library: {url}")
+                    user_logger.info(f"Starting download using library: {url}")
                 
-                def log_handler(line: str, is_stderr: bool):
-                    if is_stderr:
-                        user_logger.warning(f"[yt-dlp] {line.rstrip()}")
-                    else:
-                        user_logger.info(f"[yt-dlp] {line.rstrip()}")
+                    def log_handler(line: str, is_stderr: bool):
+                        if is_stderr:
+                            user_logger.warning(f"[yt-dlp] {line.rstrip()}")
+                        else:
+                            user_logger.info(f"[yt-dlp] {line.rstrip()}")
                 
-                try:
-                    with _jobs_lock:
-                        existing_info = _running_jobs.get(job_id, {})
-                        was_stopped = existing_info.get("stopped", False)
-                        if was_stopped:
-                            user_logger.info(f"Job {job_id} was stopped, exiting")
-                            break
-                        _running_jobs[job_id] = {"username": username, "process": None, "stopped": was_stopped, "current_url": url, "logs": []}
-                    
-                    def stop_check_callback() -> bool:
+                    try:
                         with _jobs_lock:
-                            job_info = _running_jobs.get(job_id, {})
-                            stopped = job_info.get("stopped", False)
-                            print(f"[DEBUG stop_check_callback] job_id={job_id}, stopped={stopped}, job_info={job_info}")
-                            return stopped
+                            existing_info = _running_jobs.get(job_id, {})
+                            was_stopped = existing_info.get("stopped", False)
+                            if was_stopped:
+                                user_logger.info(f"Job {job_id} was stopped, exiting")
+                                break
+                            _running_jobs[job_id] = {"username": username, "process": None, "stopped": was_stopped, "current_url": url, "logs": []}
+                        if on_progress:
+                            on_progress({"current_url": url, "url_timeout": plan.download_timeout})
                     
-                    stats = download_batch(
-                        urls_dict=urls_data,
-                        base_path=str(user_folder),
-                        base_args=base_args,
-                        ensure_posters=ensure_posters,
-                        use_random_agent=use_random_agent,
-                        download_timeout=download_timeout,
-                        stall_timeout=stall_timeout,
-                        log_callback=log_handler,
-                        stop_check_callback=stop_check_callback,
-                    )
+                        def stop_check_callback() -> bool:
+                            with _jobs_lock:
+                                job_info = _running_jobs.get(job_id, {})
+                                stopped = job_info.get("stopped", False)
+                                print(f"[DEBUG stop_check_callback] job_id={job_id}, stopped={stopped}, job_info={job_info}")
+                                return stopped
                     
-                    with _jobs_lock:
-                        job_info = _running_jobs.get(job_id, {})
-                        if job_info.get("stopped"):
-                            user_logger.info(f"Job {job_id} was stopped after download_batch")
-                            break
+                        stats = download_batch(
+                            urls_dict=urls_data,
+                            base_path=str(user_folder),
+                            base_args=base_args,
+                            ensure_posters=plan.ensure_posters,
+                            use_random_agent=plan.use_random_agent,
+                            download_timeout=plan.download_timeout,
+                            stall_timeout=plan.stall_timeout,
+                            stall_min_rate=plan.stall_min_rate,
+                            log_callback=log_handler,
+                            stop_check_callback=stop_check_callback,
+                            info_lookup=lambda u: get_reusable_info(u, scope),
+                            info_callback=lambda info: store_media_info(info, scope=scope),
+                            pending_sidecars=pending_sidecars,
+                            bandwidth_slot=bandwidth_slot,
+                            pause_on_error=False,
+                            manager_opts=plan.manager_opts,
+                        )
                     
-                    # Check if video files exist regardless of return code
-                    # (yt-dlp may return error due to subtitle 429 but video still downloaded)
-                    video_check_files = list(user_folder.glob("*.mkv")) + list(user_folder.glob("*.mp4")) + list(user_folder.glob("*.webm")) + list(user_folder.glob("*.flv"))
-                    if video_check_files:
-                        proc_returncode = 0
-                        user_logger.info(f"Video file found, treating as success despite yt-dlp error")
-                    elif stats['videos_downloaded'] > 0 or stats['skipped'] > 0:
-                        proc_returncode = 0
-                    else:
-                        proc_returncode = 1
-                except Exception as e:
-                    # Check if video files exist despite the exception
-                    video_check_files = list(user_folder.glob("*.mkv")) + list(user_folder.glob("*.mp4")) + list(user_folder.glob("*.webm")) + list(user_folder.glob("*.flv"))
-                    if video_check_files:
-                        user_logger.warning(f"Download error but video exists: {str(e)[:100]}")
-                        proc_returncode = 0
-                    else:
+                        with _jobs_lock:
+                            job_info = _running_jobs.get(job_id, {})
+                            if job_info.get("stopped"):
+                                user_logger.info(f"Job {job_id} was stopped after download_batch")
+                                break
+                    
+                        # Files yt-dlp reported writing for this URL; a video may exist
+                        # even when yt-dlp returned an error (e.g. subtitle 429)
+                        video_files = [Path(f) for f in stats['files']]
+                        if video_files:
+                            proc_returncode = 0
+                        elif stats['videos_downloaded'] > 0 or stats['skipped'] > 0:
+                            proc_returncode = 0
+                        else:
+                            proc_returncode = 1
+                    except Exception as e:
                         user_logger.error(f"Download error for {url}: {str(e)}")
+                        video_files = []
                         proc_returncode = 1
+                        stats = {'error': str(e)}
                 
-                def find_files_following_symlinks(folder, pattern):
-                    """Find files matching pattern, following symlinks."""
-                    files = []
-                    for root, dirs, filenames in os.walk(folder, followlinks=True):
-                        for fname in filenames:
-                            if fname.lower().endswith(tuple(pattern)):
-                                files.append(Path(root) / fname)
-                    return files
+                    # Thumbnails and other sidecars must be in place before files
+                    # move to global storage and posters are picked
+                    wait_for_sidecars(pending_sidecars, log_handler)
                 
-                if proc_returncode == 0:
-                    video_files = []
-                    image_files = []
-                    for file in user_folder.rglob("*.mkv"):
-                        if file.is_file():
-                            video_files.append(file)
-                    for file in user_folder.rglob("*.mp4"):
-                        if file.is_file():
-                            video_files.append(file)
-                    for file in user_folder.rglob("*.webm"):
-                        if file.is_file():
-                            video_files.append(file)
-                    for file in user_folder.rglob("*.flv"):
-                        if file.is_file():
-                            video_files.append(file)
-                    
-                    image_files = find_files_following_symlinks(str(user_folder), ['.jpg', '.jpeg', '.webp'])
-                    
-                    for file in video_files:
-                        is_first_download = find_existing_file(url) is None
+                    if proc_returncode == 0:
+                        bytes_written = sum(f.stat().st_size for f in video_files if f.is_file())
+                        for file in video_files:
+                            is_first_download = find_existing_file(url) is None
                         
-                        if DEDUPLICATION_ENABLED and is_first_download and create_symlinks:
-                            global_path = move_to_global(url, file)
-                            if global_path:
-                                target_file = user_folder / global_path.name
-                                create_symlink(str(global_path), str(target_file))
-                                file_path = str(global_path)
-                                user_logger.info(f"Moved to global: {global_path.name}")
+                            if DEDUPLICATION_ENABLED and is_first_download and create_symlinks:
+                                global_path = move_to_global(url, file)
+                                if global_path:
+                                    target_file = user_folder / global_path.name
+                                    link_file(str(global_path), str(target_file))
+                                    file_path = str(global_path)
+                                    flight_result = file_path
+                                    user_logger.info(f"Moved to global: {global_path.name}")
                                 
-                                video_stem = global_path.stem
-                                video_dir = global_path.parent
-                                for ext in ['.jpg', '.jpeg', '.webp', '.png', '.description', '.info.json', '.desktop', '.srt', '.vtt', '.ass']:
-                                    related_file = video_dir / f"{video_stem}{ext}"
-                                    if related_file.exists():
-                                        target_related = user_folder / f"{video_stem}{ext}"
-                                        if not target_related.exists():
-                                            create_symlink(str(related_file), str(target_related))
+                                    video_stem = global_path.stem
+                                    video_dir = global_path.parent
+                                    for ext in ['.jpg', '.jpeg', '.webp', '.png', '.description', '.info.json', '.desktop', '.srt', '.vtt', '.ass']:
+                                        related_file = video_dir / f"{video_stem}{ext}"
+                                        if related_file.exists():
+                                            target_related = user_folder / f"{video_stem}{ext}"
+                                            if not target_related.exists():
+                                                link_file(str(related_file), str(target_related))
+                                else:
+                                    file_path = str(file)
                             else:
                                 file_path = str(file)
-                        else:
-                            file_path = str(file)
                         
-                        downloaded = DownloadedFile(
-                            url=url,
-                            file_path=file_path,
-                            user_id=job.user_id
-                        )
-                        db.add(downloaded)
-                        db.commit()
-                        user_logger.info(f"Downloaded: {os.path.basename(file_path)}")
+                            already_recorded = db.query(DownloadedFile.id).filter(
+                                DownloadedFile.user_id == job.user_id,
+                                DownloadedFile.file_path == file_path
+                            ).first()
+                            if not already_recorded:
+                                downloaded = DownloadedFile(
+                                    url=url,
+                                    media_key=lookup_media_key(url, db),
+                                    file_path=file_path,
+                                    user_id=job.user_id
+                                )
+                                db.add(downloaded)
+                                db.commit()
+                            user_logger.info(f"Downloaded: {os.path.basename(file_path)}")
                     
-                    # FIXME: Poster creation for deduplicated files - may not work correctly
-                    # when video is symlinked to global folder (video_files won't contain images)
-                    if ensure_posters:
-                        for video_file in video_files:
-                            try:
-                                if video_file.is_symlink():
-                                    real_video_path = video_file.resolve()
-                                else:
-                                    real_video_path = video_file
+                        # FIXME: Poster creation for deduplicated files - may not work correctly
+                        # when video is symlinked to global folder (video_files won't contain images)
+                        if plan.ensure_posters:
+                            for video_file in video_files:
+                                try:
+                                    if video_file.is_symlink():
+                                        real_video_path = video_file.resolve()
+                                    else:
+                                        real_video_path = video_file
                                 
-                                video_dir = real_video_path.parent
-                                video_stem = real_video_path.stem
+                                    video_dir = real_video_path.parent
+                                    video_stem = real_video_path.stem
                                 
-                                for ext in ['.jpg', '.jpeg', '.webp', '.png']:
-                                    jpg_path = video_dir / f"{video_stem}{ext}"
-                                    if jpg_path.exists():
-                                        poster_name = f"poster{ext}"
-                                        poster_path = user_folder / poster_name
+                                    for ext in ['.jpg', '.jpeg', '.webp', '.png']:
+                                        jpg_path = video_dir / f"{video_stem}{ext}"
+                                        if jpg_path.exists():
+                                            poster_name = f"poster{ext}"
+                                            poster_path = user_folder / poster_name
                                         
-                                        if not poster_path.exists():
-                                            import shutil
-                                            shutil.copy2(str(jpg_path), str(poster_path))
-                                            user_logger.info(f"Created poster: {poster_name}")
-                                        break
-                            except Exception as e:
-                                user_logger.warning(f"Failed to create poster: {e}")
+                                            if not poster_path.exists():
+                                                import shutil
+                                                shutil.copy2(str(jpg_path), str(poster_path))
+                                                user_logger.info(f"Created poster: {poster_name}")
+                                            break
+                                except Exception as e:
+                                    user_logger.warning(f"Failed to create poster: {e}")
                     
-                    if archive_file_path and DEDUPLICATION_ENABLED:
-                        sync_archive_to_db(archive_file_path, url, job.user_id, db)
-                else:
-                    user_logger.error(f"Download failed")
-
-                if url_lock_acquired:
-                    release_url_lock(url)
+                        if archive_file_path and DEDUPLICATION_ENABLED:
+                            sync_archive_to_db(archive_file_path, url, job.user_id, db)
+                        checkpoint.finish(folder_name, url, "done")
+                        outcome = "ok" if video_files else "archived-skip"
+                        record_attempt(db, job.user_id, job_id, url, attempt_started, outcome, bytes_written)
+                        clear_retry(db, job.user_id, config_name, folder_name, url)
+                    else:
+                        user_logger.error(f"Download failed")
+                        checkpoint.finish(folder_name, url, "failed", stats.get('error'))
+                        outcome = classify_error(stats.get('error'))
+                        record_attempt(db, job.user_id, job_id, url, attempt_started, outcome, error=stats.get('error'))
+                        retry_at = schedule_retry(db, job, config_name, urls_name, folder_name, url, outcome, stats.get('error'))
+                        if retry_at:
+                            user_logger.info(f"Will retry {url} after {retry_at:%Y-%m-%d %H:%M:%S} UTC ({outcome})")
+                finally:
+                    if flight:
+                        finish_download(flight, flight_result)
 
         with _jobs_lock:
             job_info = _running_jobs.get(job_id, {})
@@ -742,6 +758,9 @@ def run_download(
             db.commit()
         user_logger.error(f"Download job {job_id} failed: {str(e)}")
     finally:
+        if bandwidth_slot:
+            bandwidth_slot.release()
+        
         with _jobs_lock:
             job_info = _running_jobs.pop(job_id, {})
         
@@ -761,7 +780,8 @@ def run_download(
         
         db.close()
         
-        process_queue()
+        if dispatch_next:
+            process_queue()
 
 
 def start_download_job(
@@ -792,6 +812,10 @@ def start_download_job(
 def process_queue():
     global _queue_processing
     
+    if EXECUTION_MODE == "external":
+        # Jobs are claimed by backend.worker processes instead
+        return
+    
     with _queue_lock:
         if _queue_processing:
             return
@@ -829,14 +853,24 @@ def process_queue():
 
                 next_job.status = "running"
                 next_job.started_at = datetime.utcnow()
+                next_job.worker_id = PROCESS_OWNER
+                next_job.heartbeat_at = next_job.started_at
                 db.commit()
+                _job_heartbeat.start()
 
+                if EXECUTION_MODE == "process":
+                    from backend.services.workers import run_download_in_worker
+                    target = run_download_in_worker
+                else:
+                    target = run_download
+
+                config_name, urls_name = split_job_name(next_job.name)
                 thread = threading.Thread(
-                    target=run_download,
+                    target=target,
                     args=(
                         username,
-                        next_job.name.split("/")[0] if "/" in next_job.name else next_job.name,
-                        next_job.name.split("/")[1] if "/" in next_job.name else next_job.name,
+                        config_name,
+                        urls_name,
                         next_job.id,
                         next_job.create_symlinks
                     )
@@ -849,6 +883,52 @@ def process_queue():
             _queue_processing = False
 
 
+def stop_local_job(job_id: int) -> bool:
+    """Stop job_id if it runs in this process. Returns whether it did."""
+    with _jobs_lock:
+        running_here = job_id in _running_jobs
+    if running_here:
+        stop_download_job(job_id)
+    return running_here
+
+
+_job_heartbeat = JobHeartbeat(PROCESS_OWNER, stop_local_job, process_queue)
+
+retry_scheduler = RetryScheduler(on_enqueued=process_queue)
+
+
+def resume_interrupted_jobs():
+    """
+    Called at startup: queue the jobs a previous run of the server left
+    "running", start heartbeating, and start the queue. The jobs pick up
+    from their checkpoints.
+
+    Without a shared lease backend this is the only process running jobs,
+    so every running job is requeued at once. Otherwise other processes
+    may still own them; they are requeued by the heartbeat once their
+    owner has been silent for WORKER_STALE_AFTER seconds.
+    """
+    if EXECUTION_MODE == "external":
+        return
+    if LEASE_BACKEND == "none":
+        requeued = requeue_running_jobs()
+        if requeued:
+            app_logger.info(f"Requeued {requeued} interrupted download jobs")
+    _job_heartbeat.start()
+    process_queue()
+
+
+def _mark_stopped(job_id: int) -> Optional[dict]:
+    """Flag a job running in this process as stopped; returns its entry, or None when it isn't here."""
+    with _jobs_lock:
+        job_info = _running_jobs.get(job_id)
+        print(f"[DEBUG stop_download_job] job_id={job_id}, job_info={job_info}")
+        if job_info:
+            job_info["stopped"] = True
+            print(f"[DEBUG stop_download_job] Set stopped=True for job {job_id}")
+        return job_info
+
+
 def stop_download_job(job_id: int) -> bool:
     db = SessionLocal()
     try:
@@ -856,28 +936,34 @@ def stop_download_job(job_id: int) -> bool:
         if not job:
             return False
 
-        username = None
-        with _jobs_lock:
-            job_info = _running_jobs.get(job_id)
-            print(f"[DEBUG stop_download_job] job_id={job_id}, job_info={job_info}")
-            if job_info:
-                job_info["stopped"] = True
-                print(f"[DEBUG stop_download_job] Set stopped=True for job {job_id}")
-                proc = job_info.get("process")
-                if proc and proc.poll() is None:
-                    proc.terminate()
-                    try:
-                        proc.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        proc.kill()
-                username = job_info.get("username")
-            else:
-                print(f"[DEBUG stop_download_job] Job {job_id} not in _running_jobs, marking as failed in DB")
-                job.status = "failed"
-                job.error_message = "Stopped by user (job not in memory after restart)"
-                job.finished_at = datetime.utcnow()
-                db.commit()
+        # The database calls below run without _jobs_lock, which every
+        # running job's bookkeeping needs
+        job_info = _mark_stopped(job_id)
+        if job_info is None:
+            if cancel_pending_job(job_id):
+                # Still queued; nothing has started it
+                return True
+            if request_stop(job_id):
+                # Running in a backend.worker process, which stops it on its next heartbeat
                 return True
+            # This process may have started it in the meantime
+            job_info = _mark_stopped(job_id)
+        if job_info is None:
+            print(f"[DEBUG stop_download_job] Job {job_id} not in _running_jobs, marking as failed in DB")
+            job.status = "failed"
+            job.error_message = "Stopped by user (job not in memory after restart)"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return True
+
+        proc = job_info.get("process")
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        username = job_info.get("username")
 
         if not username and job.status == "pending":
             job.status = "failed"
@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.core.config import DATA_DIR
+from backend.services.config_compiler import CompiledConfig, compile_config
+from backend.services.throughput import build_throughput_params
+
+
+OUTPUT_TEMPLATE = "%(upload_date)s - %(title)s.%(ext)s"
+
+
+class JobPlan:
+    """
+    Everything about a download job that doesn't depend on the URL.
+
+    Built once per job from the compiled config, with the user's archive and
+    cookie paths resolved. for_url() only copies the options and samples
+    randomized range values such as "--sleep-interval": "1-3", so each URL
+    still gets its own sample.
+    """
+
+    def __init__(
+        self,
+        compiled: CompiledConfig,
+        overrides: Optional[Dict[str, Any]] = None,
+        archive_file_path: Optional[str] = None,
+    ):
+        self.compiled = compiled
+        self.custom = compiled.custom
+        self.overrides = overrides or {}
+        self.archive_file_path = archive_file_path
+
+    @property
+    def ensure_posters(self) -> bool:
+        return bool(self.custom.get("--poster", False))
+
+    @property
+    def use_random_agent(self) -> bool:
+        return bool(self.custom.get("--random-agent", False))
+
+    @property
+    def download_timeout(self) -> int:
+        return int(self.custom.get("--download-timeout", 7200))
+
+    @property
+    def stall_timeout(self) -> int:
+        return int(self.custom.get("--stall-timeout", 300))
+
+    @property
+    def stall_min_rate(self) -> int:
+        return int(self.custom.get("--stall-min-rate", 0))
+
+    @property
+    def manager_opts(self) -> Dict[str, Any]:
+        """Options the manager implements itself, such as its sidecar writers."""
+        return self.compiled.manager
+
+    @property
+    def only_new_entries(self) -> bool:
+        return bool(self.custom.get("--only-new-entries", False))
+
+    def output_template(self, folder: Path) -> str:
+        return str(folder / OUTPUT_TEMPLATE)
+
+    def for_url(self, url: str) -> Dict[str, Any]:
+        opts = self.compiled.build_opts()
+        opts.update(self.overrides)
+        return opts
+
+
+def build_job_plan(config_content: str, username: str) -> JobPlan:
+    """Compile a stored config and resolve it into a JobPlan for username's jobs."""
+    compiled = compile_config(config_content)
+    user_configs_dir = DATA_DIR / username / "configs"
+    overrides = build_throughput_params(
+        compiled.custom.get("--throughput-profile"),
+        compiled.opts,
+        compiled.custom.get("--external-downloader"),
+    )
+
+    archive_file_path = None
+    if "download_archive" in compiled.opts:
+        user_configs_dir.mkdir(parents=True, exist_ok=True)
+        archive_file = user_configs_dir / "ytdl-archive.txt"
+        archive_file.touch()
+        archive_file_path = str(archive_file)
+        overrides["download_archive"] = archive_file_path
+
+    if compiled.opts.get("cookiefile"):
+        # Whatever path the config names, only the user's uploaded cookies
+        # are used: yt-dlp reads the file and writes it back on close
+        user_cookies_path = user_configs_dir / "cookies.txt"
+        overrides["cookiefile"] = str(user_cookies_path) if user_cookies_path.exists() else None
+
+    return JobPlan(compiled, overrides, archive_file_path)
@@ -0,0 +1,223 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from backend.core.config import WORKER_HEARTBEAT_INTERVAL, WORKER_STALE_AFTER
+from backend.core.deps import app_logger
+from backend.db.session import SessionLocal
+from backend.db.models import DownloadJob, User
+
+
+class ClaimedJob:
+    """A pending job this worker now owns, with what run_download needs to start it."""
+
+    def __init__(self, job_id: int, username: str, config_name: str, urls_name: str, create_symlinks: bool):
+        self.job_id = job_id
+        self.username = username
+        self.config_name = config_name
+        self.urls_name = urls_name
+        self.create_symlinks = create_symlinks
+
+
+def split_job_name(name: str) -> Tuple[str, str]:
+    """The (config name, urls name) a job was started with; jobs are named "config/urls"."""
+    if "/" in name:
+        config_name, urls_name = name.split("/", 1)
+        return config_name, urls_name
+    return name, name
+
+
+def claim_next_job(worker_id: str) -> Optional[ClaimedJob]:
+    """
+    Take the oldest pending job whose user has nothing running anywhere.
+
+    The job moves to running with a conditional UPDATE, so when several
+    workers race for the same row exactly one of them gets it; the others
+    move on to the next candidate.
+    """
+    db = SessionLocal()
+    try:
+        busy_users = {
+            user_id for (user_id,) in
+            db.query(DownloadJob.user_id).filter(DownloadJob.status == "running").distinct()
+        }
+        candidates = db.query(DownloadJob).filter(
+            DownloadJob.status == "pending"
+        ).order_by(DownloadJob.id).all()
+
+        for job in candidates:
+            if job.user_id in busy_users:
+                continue
+            user = db.query(User).filter(User.id == job.user_id).first()
+            if not user:
+                job.status = "failed"
+                job.error_message = "User not found"
+                db.commit()
+                continue
+
+            now = datetime.utcnow()
+            claimed = db.query(DownloadJob).filter(
+                DownloadJob.id == job.id,
+                DownloadJob.status == "pending"
+            ).update({
+                "status": "running",
+                "worker_id": worker_id,
+                "heartbeat_at": now,
+                "started_at": now,
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                busy_users.add(job.user_id)
+                continue
+
+            config_name, urls_name = split_job_name(job.name)
+            return ClaimedJob(job.id, user.username, config_name, urls_name, job.create_symlinks)
+        return None
+    finally:
+        db.close()
+
+
+def heartbeat_jobs(worker_id: str) -> List[int]:
+    """
+    Mark this worker's running jobs as alive. Returns the ids of those
+    jobs that someone asked to stop.
+    """
+    db = SessionLocal()
+    try:
+        db.query(DownloadJob).filter(
+            DownloadJob.worker_id == worker_id,
+            DownloadJob.status == "running"
+        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        rows = db.query(DownloadJob.id).filter(
+            DownloadJob.worker_id == worker_id,
+            DownloadJob.status == "running",
+            DownloadJob.stop_requested.is_(True)
+        ).all()
+        return [job_id for (job_id,) in rows]
+    finally:
+        db.close()
+
+
+def reclaim_stale_jobs(stale_after: int = WORKER_STALE_AFTER) -> int:
+    """
+    Put running jobs whose worker stopped heartbeating back in the queue.
+    Jobs that were asked to stop are failed instead. Returns how many were
+    reclaimed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    db = SessionLocal()
+    try:
+        stale = db.query(DownloadJob).filter(
+            DownloadJob.status == "running",
+            DownloadJob.worker_id.isnot(None),
+            DownloadJob.heartbeat_at < cutoff
+        ).all()
+        reclaimed = 0
+        for job in stale:
+            if job.stop_requested:
+                values = {"status": "failed", "error_message": "Stopped by user", "finished_at": datetime.utcnow()}
+            else:
+                values = {"status": "pending", "worker_id": None, "heartbeat_at": None}
+            # Only if the worker still hasn't heartbeated since we looked
+            updated = db.query(DownloadJob).filter(
+                DownloadJob.id == job.id,
+                DownloadJob.status == "running",
+                DownloadJob.heartbeat_at == job.heartbeat_at
+            ).update(values, synchronize_session=False)
+            db.commit()
+            if updated and values["status"] == "pending":
+                reclaimed += 1
+                app_logger.warning(f"Reclaimed job {job.id} from unresponsive worker {job.worker_id}")
+        return reclaimed
+    finally:
+        db.close()
+
+
+def request_stop(job_id: int) -> bool:
+    """Ask the worker running job_id to stop it. Returns False when no worker owns the job."""
+    db = SessionLocal()
+    try:
+        updated = db.query(DownloadJob).filter(
+            DownloadJob.id == job_id,
+            DownloadJob.status == "running",
+            DownloadJob.worker_id.isnot(None)
+        ).update({"stop_requested": True}, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def cancel_pending_job(job_id: int, message: str = "Stopped by user") -> bool:
+    """
+    Fail job_id if no worker has claimed it yet. The update only matches a
+    job that is still pending, so it can't race a worker claiming it.
+    Returns whether the job was cancelled.
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(DownloadJob).filter(
+            DownloadJob.id == job_id,
+            DownloadJob.status == "pending"
+        ).update({"status": "failed", "error_message": message, "finished_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def requeue_running_jobs() -> int:
+    """
+    Put every running job back in the queue. Only safe at startup of a
+    single-process deployment, where nothing else can be running them.
+    Returns how many were requeued.
+    """
+    db = SessionLocal()
+    try:
+        requeued = db.query(DownloadJob).filter(
+            DownloadJob.status == "running",
+            DownloadJob.stop_requested.is_(False)
+        ).update({"status": "pending", "worker_id": None, "heartbeat_at": None}, synchronize_session=False)
+        db.commit()
+        return requeued
+    finally:
+        db.close()
+
+
+class JobHeartbeat:
+    """
+    Background thread of a process that runs jobs: heartbeats the jobs it
+    owns, stops those someone asked to stop, and requeues jobs of other
+    processes that went silent.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        on_stop_requested: Callable[[int], None],
+        on_reclaimed: Optional[Callable[[], None]] = None,
+        interval: int = WORKER_HEARTBEAT_INTERVAL,
+    ):
+        self.worker_id = worker_id
+        self.on_stop_requested = on_stop_requested
+        self.on_reclaimed = on_reclaimed
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="job-heartbeat", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                for job_id in heartbeat_jobs(self.worker_id):
+                    self.on_stop_requested(job_id)
+                if reclaim_stale_jobs() and self.on_reclaimed:
+                    self.on_reclaimed()
+            except Exception as e:
+                app_logger.error(f"Job heartbeat of {self.worker_id} failed: {e}")
+            time.sleep(self.interval)
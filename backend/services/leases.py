@@ -0,0 +1,222 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.config import GLOBAL_DIR, LEASE_BACKEND, LEASE_TTL
+from backend.core.deps import app_logger
+from backend.db.session import SessionLocal
+from backend.db.models import Lease
+
+
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseHandle:
+    """A lease held by this process. Pass it back to the backend to renew or release it."""
+
+    def __init__(self, key: str, owner: str, fd: Optional[int] = None):
+        self.key = key
+        self.owner = owner
+        self.fd = fd
+
+
+class LeaseBackend:
+    """
+    Cross-process mutual exclusion for string keys.
+
+    acquire() never blocks: it returns a LeaseHandle, or None while another
+    process holds the key.
+    """
+
+    def acquire(self, key: str, ttl: int = LEASE_TTL) -> Optional[LeaseHandle]:
+        raise NotImplementedError
+
+    def renew(self, lease: LeaseHandle, ttl: int = LEASE_TTL) -> bool:
+        return True
+
+    def release(self, lease: LeaseHandle):
+        pass
+
+
+class LocalLeaseBackend(LeaseBackend):
+    """Single-process deployments: every lease is granted."""
+
+    def acquire(self, key: str, ttl: int = LEASE_TTL) -> Optional[LeaseHandle]:
+        return LeaseHandle(key, PROCESS_OWNER)
+
+
+class DatabaseLeaseBackend(LeaseBackend):
+    """
+    Leases stored as rows in the `leases` table.
+
+    Rows carry an expiry that a background heartbeat pushes forward while the
+    lease is held, so a crashed process loses its leases after one TTL.
+    """
+
+    def __init__(self, ttl: int = LEASE_TTL):
+        self.ttl = ttl
+        self._held: Dict[str, LeaseHandle] = {}
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self, key: str, ttl: int = LEASE_TTL) -> Optional[LeaseHandle]:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        db = SessionLocal()
+        try:
+            updated = db.query(Lease).filter(
+                Lease.key == key,
+                or_(Lease.expires_at < now, Lease.owner == PROCESS_OWNER)
+            ).update(
+                {"owner": PROCESS_OWNER, "acquired_at": now, "expires_at": expires_at},
+                synchronize_session=False
+            )
+            if not updated:
+                db.add(Lease(key=key, owner=PROCESS_OWNER, acquired_at=now, expires_at=expires_at))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+        lease = LeaseHandle(key, PROCESS_OWNER)
+        with self._lock:
+            self._held[key] = lease
+        self._ensure_heartbeat()
+        return lease
+
+    def renew(self, lease: LeaseHandle, ttl: int = LEASE_TTL) -> bool:
+        db = SessionLocal()
+        try:
+            updated = db.query(Lease).filter(
+                Lease.key == lease.key,
+                Lease.owner == lease.owner
+            ).update(
+                {"expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+                synchronize_session=False
+            )
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    def release(self, lease: LeaseHandle):
+        with self._lock:
+            self._held.pop(lease.key, None)
+        db = SessionLocal()
+        try:
+            db.query(Lease).filter(
+                Lease.key == lease.key,
+                Lease.owner == lease.owner
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._run_heartbeat, daemon=True)
+            self._heartbeat.start()
+
+    def _run_heartbeat(self):
+        while True:
+            time.sleep(max(self.ttl / 3, 1))
+            with self._lock:
+                held = list(self._held.values())
+                if not held:
+                    self._heartbeat = None
+                    return
+            for lease in held:
+                try:
+                    if not self.renew(lease, self.ttl):
+                        app_logger.warning(f"Lease lost: {lease.key}")
+                        with self._lock:
+                            self._held.pop(lease.key, None)
+                except Exception as e:
+                    app_logger.error(f"Lease heartbeat error for {lease.key}: {e}")
+
+
+class FileLeaseBackend(LeaseBackend):
+    """
+    Advisory fcntl locks on files under data/global/locks.
+
+    Works across processes and containers that share the data volume; the
+    kernel drops the lock when the holder dies, so no heartbeat is needed.
+    A lock file is removed on release, so the directory only holds files
+    for leases that are held (or whose holder died).
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir or (GLOBAL_DIR / "locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, hashlib.md5(key.encode()).hexdigest() + ".lock")
+
+    def acquire(self, key: str, ttl: int = LEASE_TTL) -> Optional[LeaseHandle]:
+        lock_path = self._lock_path(key)
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return None
+            # The previous holder may have unlinked the file between our open
+            # and flock; a lock on that orphaned inode excludes nobody
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                    return LeaseHandle(key, PROCESS_OWNER, fd)
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def release(self, lease: LeaseHandle):
+        if lease.fd is None:
+            return
+        try:
+            # Unlink while still holding the lock, so nobody locks the old inode unnoticed
+            os.unlink(self._lock_path(lease.key))
+        except FileNotFoundError:
+            pass
+        try:
+            fcntl.flock(lease.fd, fcntl.LOCK_UN)
+        finally:
+            os.close(lease.fd)
+            lease.fd = None
+
+
+_backend: Optional[LeaseBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_lease_backend() -> LeaseBackend:
+    """Return the lease backend selected by BACKEND_LEASE_BACKEND (none, db or file)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if LEASE_BACKEND == "db":
+                _backend = DatabaseLeaseBackend()
+            elif LEASE_BACKEND == "file" and fcntl is not None:
+                _backend = FileLeaseBackend()
+            else:
+                if LEASE_BACKEND not in ("none", "local"):
+                    app_logger.warning(f"Lease backend '{LEASE_BACKEND}' is not available, using process-local leases")
+                _backend = LocalLeaseBackend()
+        return _backend
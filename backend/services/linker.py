@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+linker.py - Link files from the global dedup store into user libraries
+
+Supported link modes:
+- symlink:  absolute symbolic link into data/global (default)
+- hardlink: second directory entry for the same inode (same filesystem only)
+- reflink:  copy-on-write clone via FICLONE (btrfs, xfs, ...)
+
+Hardlinks and reflinks make each user's tree self-contained, so media
+servers and poster lookups never have to resolve a link into data/global.
+When a mode is not available on the filesystem the next one is tried:
+reflink -> hardlink -> symlink.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from backend.core.config import DATA_DIR, GLOBAL_DIR, DEDUPLICATION_LINK_MODE
+
+
+FICLONE = 0x40049409
+
+LINK_MODES = ("symlink", "hardlink", "reflink")
+
+_FALLBACKS = {
+    "reflink": ["reflink", "hardlink", "symlink"],
+    "hardlink": ["hardlink", "symlink"],
+    "symlink": ["symlink"],
+}
+
+
+def reflink(original_path: str, target_path: str):
+    """Create a copy-on-write clone of original_path at target_path."""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(original_path, "rb") as src, open(target_path, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target_path)
+            raise
+
+
+def _make_link(mode: str, original_path: str, target_path: str):
+    if mode == "reflink":
+        reflink(original_path, target_path)
+    elif mode == "hardlink":
+        os.link(original_path, target_path)
+    else:
+        os.symlink(original_path, target_path)
+
+
+def link_file(original_path: str, target_path: str, mode: Optional[str] = None) -> Optional[str]:
+    """
+    Link original_path to target_path using the configured link mode.
+
+    Any existing file or (possibly dangling) link at target_path is replaced
+    atomically. Returns the mode that was actually used, or None on failure.
+    """
+    mode = mode or DEDUPLICATION_LINK_MODE
+    if mode not in _FALLBACKS:
+        mode = "symlink"
+
+    try:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    except OSError:
+        return None
+
+    tmp_path = f"{target_path}.link-tmp"
+    for candidate in _FALLBACKS[mode]:
+        try:
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+            _make_link(candidate, original_path, tmp_path)
+            os.replace(tmp_path, target_path)
+            return candidate
+        except OSError:
+            continue
+    return None
+
+
+def _global_inodes() -> Dict[tuple, Path]:
+    inodes = {}
+    global_downloads = GLOBAL_DIR / "downloads"
+    for root, dirs, files in os.walk(global_downloads):
+        for filename in files:
+            path = Path(root) / filename
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            inodes[(st.st_dev, st.st_ino)] = path
+    return inodes
+
+
+def convert_links(mode: str, usernames: Optional[List[str]] = None, dry_run: bool = False, log=print) -> dict:
+    """
+    Convert links in existing user libraries to the given link mode.
+
+    Symlinks into data/global are recognized by their target; hardlinks by
+    sharing an inode with a file in data/global. Reflinked copies are
+    independent files and are left untouched.
+    """
+    stats = {"converted": 0, "skipped": 0, "failed": 0}
+    global_root = GLOBAL_DIR.resolve()
+    inodes = _global_inodes() if mode != "hardlink" else {}
+
+    if usernames is None:
+        usernames = [
+            d.name for d in DATA_DIR.iterdir()
+            if d.is_dir() and d.name not in ("global", "logs")
+        ]
+
+    for username in usernames:
+        downloads_dir = DATA_DIR / username / "downloads"
+        if not downloads_dir.exists():
+            continue
+
+        for root, dirs, files in os.walk(downloads_dir):
+            for filename in files:
+                path = Path(root) / filename
+
+                if path.is_symlink():
+                    original = path.resolve()
+                    if not original.exists() or global_root not in original.parents:
+                        stats["skipped"] += 1
+                        continue
+                    if mode == "symlink":
+                        stats["skipped"] += 1
+                        continue
+                else:
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        stats["skipped"] += 1
+                        continue
+                    original = inodes.get((st.st_dev, st.st_ino))
+                    if original is None:
+                        stats["skipped"] += 1
+                        continue
+
+                if dry_run:
+                    log(f"Would convert: {path} -> {original}")
+                    stats["converted"] += 1
+                    continue
+
+                used_mode = link_file(str(original), str(path), mode)
+                if used_mode:
+                    if used_mode != mode:
+                        log(f"Fell back to {used_mode}: {path}")
+                    stats["converted"] += 1
+                else:
+                    log(f"Failed to convert: {path}")
+                    stats["failed"] += 1
+
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Convert user library links into the global dedup store to another link mode"
+    )
+    parser.add_argument("--mode", choices=LINK_MODES, default=DEDUPLICATION_LINK_MODE, help="Target link mode")
+    parser.add_argument("--user", action="append", dest="users", help="Only convert this user's library (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be converted without changing anything")
+
+    args = parser.parse_args()
+
+    stats = convert_links(args.mode, usernames=args.users, dry_run=args.dry_run)
+    print(f"Converted: {stats['converted']}, skipped: {stats['skipped']}, failed: {stats['failed']}", flush=True)
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import re
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.config import MEDIA_INFO_FORMATS_TTL, MEDIA_INFO_TTL
+from backend.core.deps import app_logger
+from backend.db.session import SessionLocal
+from backend.db.models import MediaInfo
+from backend.services.media_key import get_media_key
+
+
+# Keys that describe one particular download rather than the media itself
+_PRIVATE_KEYS = {
+    "requested_downloads", "requested_formats", "requested_subtitles", "requested_entries",
+    "entries", "filepath", "_filename", "filename", "infojson_filename", "original_url",
+    "playlist_autonumber",
+}
+
+# Keys that carry format URLs and the headers/cookies sent with them; they
+# are only kept for the scope that extracted them
+_FORMAT_KEYS = {
+    "formats", "url", "manifest_url", "fragment_base_url", "fragments", "http_headers", "cookies",
+}
+
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d{9,11})")
+
+# Format URLs are not reused this close to their expiry
+_EXPIRY_MARGIN = 600
+
+
+def compress_info(info: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(info, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def load_info(row: MediaInfo) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(row.info_json).decode("utf-8"))
+
+
+def info_scope(user_id: int, cookiefile: Optional[str] = None) -> str:
+    """
+    Scope of an extraction by user and cookie file. Format URLs can be
+    signed for the session and cookies that extracted them, so only the same
+    scope may reuse them.
+    """
+    return hashlib.sha256(f"{user_id}\0{cookiefile or ''}".encode("utf-8")).hexdigest()[:32]
+
+
+def media_key_for_info(info: Dict[str, Any]) -> Optional[str]:
+    """The media key of an extracted video, in the same form get_media_key() returns."""
+    extractor = info.get("extractor_key") or info.get("ie_key")
+    video_id = info.get("id")
+    if not extractor or not video_id:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+
+def _iter_videos(info: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    if info.get("_type", "video") == "video":
+        yield info
+        return
+    for entry in info.get("entries") or []:
+        if isinstance(entry, dict):
+            yield from _iter_videos(entry)
+
+
+def _formats_expire_at(info: Dict[str, Any], fetched_at: datetime) -> Optional[datetime]:
+    """
+    When the format URLs in info stop working. Signed URLs that carry an
+    `expire` timestamp (YouTube, many CDNs) use the earliest one; the result
+    is never later than MEDIA_INFO_FORMATS_TTL after fetching.
+    """
+    if not info.get("formats"):
+        return None
+    expires_at = fetched_at + timedelta(seconds=MEDIA_INFO_FORMATS_TTL)
+    for fmt in info["formats"]:
+        match = _EXPIRE_RE.search(fmt.get("url") or "")
+        if match:
+            url_expiry = datetime.utcfromtimestamp(int(match.group(1))) - timedelta(seconds=_EXPIRY_MARGIN)
+            expires_at = min(expires_at, url_expiry)
+    return expires_at
+
+
+def _to_row(info: Dict[str, Any], media_key: str, fetched_at: datetime, scope: Optional[str]) -> MediaInfo:
+    cached = {k: v for k, v in info.items() if k not in _PRIVATE_KEYS and not k.startswith("__")}
+    if scope is None:
+        cached = {k: v for k, v in cached.items() if k not in _FORMAT_KEYS}
+    duration = info.get("duration")
+    return MediaInfo(
+        media_key=media_key,
+        extractor=media_key.split(" ", 1)[0],
+        video_id=str(info["id"]),
+        webpage_url=info.get("webpage_url"),
+        title=info.get("title"),
+        upload_date=info.get("upload_date"),
+        duration=int(duration) if isinstance(duration, (int, float)) else None,
+        thumbnail=info.get("thumbnail"),
+        info_json=compress_info(cached),
+        fetched_at=fetched_at,
+        formats_expire_at=_formats_expire_at(cached, fetched_at),
+        formats_scope=scope,
+    )
+
+
+def store_media_info(info: Dict[str, Any], db=None, scope: Optional[str] = None):
+    """
+    Cache the sanitized info dict of a video, or of every video of a playlist.
+
+    info must already be sanitized (ydl.sanitize_info); it is stored as-is
+    minus the per-download keys, compressed. Format URLs are kept only with
+    a scope (info_scope()), for get_reusable_info() calls in that scope;
+    without one only the metadata is stored.
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    try:
+        fetched_at = datetime.utcnow()
+        for video in _iter_videos(info):
+            media_key = media_key_for_info(video)
+            if media_key:
+                db.merge(_to_row(video, media_key, fetched_at, scope))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        app_logger.warning(f"Failed to cache media info: {e}")
+    finally:
+        if owns_session:
+            db.close()
+
+
+def lookup_media_key(url: str, db) -> Optional[str]:
+    """
+    Media key for url: resolved offline when possible, otherwise from a
+    cached extraction of that exact page URL.
+    """
+    media_key = get_media_key(url)
+    if media_key:
+        return media_key
+    row = db.query(MediaInfo.media_key).filter(MediaInfo.webpage_url == url).first()
+    return row[0] if row else None
+
+
+def get_media_info(media_key: str, db) -> Optional[MediaInfo]:
+    """The cached metadata of media_key, or None when missing or older than MEDIA_INFO_TTL."""
+    row = db.query(MediaInfo).filter(MediaInfo.media_key == media_key).first()
+    if row is None or datetime.utcnow() - row.fetched_at > timedelta(seconds=MEDIA_INFO_TTL):
+        return None
+    return row
+
+
+def get_reusable_info(url: str, scope: str) -> Optional[Dict[str, Any]]:
+    """
+    A cached info dict for url whose format URLs are still valid and were
+    extracted in scope, so the download can skip extraction entirely.
+    Returns None otherwise.
+    """
+    db = SessionLocal()
+    try:
+        media_key = lookup_media_key(url, db)
+        if not media_key:
+            return None
+        row = get_media_info(media_key, db)
+        if row is None or row.formats_scope != scope:
+            return None
+        if row.formats_expire_at is None or row.formats_expire_at <= datetime.utcnow():
+            return None
+        return load_info(row)
+    finally:
+        db.close()
+
+
+def probe_media_info(url: str, db, refresh: bool = False) -> Optional[MediaInfo]:
+    """
+    Return metadata for url, extracting it (without downloading) only when
+    it isn't cached or refresh is set.
+    """
+    if not refresh:
+        media_key = lookup_media_key(url, db)
+        row = get_media_info(media_key, db) if media_key else None
+        if row is not None:
+            return row
+
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True, "skip_download": True}) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    if not info:
+        return None
+
+    store_media_info(info, db)
+    media_key = media_key_for_info(info)
+    if not media_key:
+        return None
+    return db.query(MediaInfo).filter(MediaInfo.media_key == media_key).first()
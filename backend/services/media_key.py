@@ -0,0 +1,78 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from yt_dlp.extractor import gen_extractor_classes
+
+
+_extractors = None
+
+
+def _get_extractors() -> list:
+    """Load yt-dlp extractor classes once, in the same priority order yt-dlp uses."""
+    global _extractors
+    if _extractors is None:
+        _extractors = [ie for ie in gen_extractor_classes() if ie.ie_key() != "Generic"]
+    return _extractors
+
+
+@lru_cache(maxsize=65536)
+def _match_extractor(url: str) -> Optional[Tuple[type, Optional[str]]]:
+    """
+    The first specific extractor that claims a URL, offline, and the id it
+    reads from the URL. None for file:// URLs and URLs only the generic
+    extractor handles.
+    """
+    if not url or url.startswith("file://"):
+        return None
+
+    for ie in _get_extractors():
+        try:
+            if not ie.suitable(url):
+                continue
+        except Exception:
+            continue
+        video_id = ie.get_temp_id(url)
+        return ie, str(video_id) if video_id else None
+    return None
+
+
+def resolve_media_key(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Normalize a URL to an (extractor, id) pair without touching the network.
+
+    Uses yt-dlp's offline `suitable`/`_match_id` matching, so `youtu.be/X`,
+    `watch?v=X&t=10` and `shorts/X` all resolve to ("youtube", "X").
+    Returns None for URLs that don't point to a single video (channels,
+    playlists) or that no specific extractor recognizes.
+    """
+    match = _match_extractor(url)
+    if match is None:
+        return None
+    ie, video_id = match
+    if getattr(ie, "_RETURN_TYPE", None) != "video" or not video_id:
+        return None
+    return ie.ie_key().lower(), video_id
+
+
+def is_collection_url(url: str) -> bool:
+    """
+    Whether a URL may list several videos (channel, playlist, tab), decided
+    offline from the first extractor that claims it. URLs only the generic
+    extractor handles return False.
+    """
+    match = _match_extractor(url)
+    return match is not None and getattr(match[0], "_RETURN_TYPE", None) != "video"
+
+
+def get_extractor_name(url: str) -> Optional[str]:
+    """The lowercased key of the first specific extractor that claims a URL, offline; None if only the generic one does."""
+    match = _match_extractor(url)
+    return match[0].ie_key().lower() if match else None
+
+
+def get_media_key(url: str) -> Optional[str]:
+    """Return the canonical media key for a URL, formatted like a yt-dlp archive entry."""
+    parts = resolve_media_key(url)
+    if parts is None:
+        return None
+    return f"{parts[0]} {parts[1]}"
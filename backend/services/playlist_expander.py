@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+import yt_dlp
+
+from backend.core.config import PLAYLIST_FULL_SCAN_DAYS, PLAYLIST_STOP_AFTER_KNOWN
+from backend.db.models import DownloadedFile, PlaylistState
+
+
+# Options forwarded from the job's params to the flat listing
+_LISTING_OPTS = ("cookiefile", "proxy", "source_address", "socket_timeout", "http_headers")
+
+_MAX_REDIRECTS = 5
+
+
+class PlaylistExpansion:
+    """The result of listing one playlist: the entries to download and how far listing went."""
+
+    def __init__(self, new_entries: List[str], scanned: int, stopped_early: bool, full_scan: bool):
+        self.new_entries = new_entries
+        self.scanned = scanned
+        self.stopped_early = stopped_early
+        self.full_scan = full_scan
+
+
+def load_known_ids(user_id: int, archive_file_path: Optional[str], db) -> Set[str]:
+    """Video ids the user already has, from their download archive and downloaded files."""
+    known = set()
+    if archive_file_path:
+        try:
+            with open(archive_file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and not parts[0].startswith("#"):
+                        known.add(parts[1])
+        except FileNotFoundError:
+            pass
+
+    rows = db.query(DownloadedFile.media_key).filter(
+        DownloadedFile.user_id == user_id,
+        DownloadedFile.media_key.isnot(None)
+    ).all()
+    for (media_key,) in rows:
+        known.add(media_key.split(" ", 1)[-1])
+    return known
+
+
+def _entry_url(entry: Dict[str, Any]) -> Optional[str]:
+    return entry.get("url") or entry.get("webpage_url")
+
+
+def _list_playlist(url: str, ytdlp_opts: Dict[str, Any]):
+    """
+    Return (YoutubeDL, playlist info) for url with lazily paged entries, or
+    None when it isn't a playlist. The caller closes the YoutubeDL.
+    """
+    params = {key: ytdlp_opts[key] for key in _LISTING_OPTS if key in ytdlp_opts}
+    params.update({
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True,
+        "extract_flat": "in_playlist",
+        "lazy_playlist": True,
+    })
+
+    ydl = yt_dlp.YoutubeDL(params)
+    try:
+        info = ydl.extract_info(url, download=False, process=False)
+        for _ in range(_MAX_REDIRECTS):
+            if not info or info.get("_type") not in ("url", "url_transparent"):
+                break
+            info = ydl.extract_info(info["url"], download=False, process=False, ie_key=info.get("ie_key"))
+    except Exception:
+        ydl.close()
+        raise
+
+    if not info or info.get("_type") != "playlist":
+        ydl.close()
+        return None
+    return ydl, info
+
+
+def expand_playlist(
+    url: str,
+    ytdlp_opts: Dict[str, Any],
+    user_id: int,
+    archive_file_path: Optional[str],
+    db,
+) -> Optional[PlaylistExpansion]:
+    """
+    List a playlist with extract_flat and return only the entries the user
+    doesn't have yet.
+
+    Pages are fetched lazily, so once PLAYLIST_STOP_AFTER_KNOWN consecutive
+    known entries are seen the remaining pages are never requested; for
+    date-ordered feeds (channels, uploads) everything past that point has
+    already been downloaded. The first listing of a playlist, and one every
+    PLAYLIST_FULL_SCAN_DAYS, goes through every entry to catch items added
+    out of order. Returns None when url turns out not to be a playlist.
+    """
+    state = db.query(PlaylistState).filter(
+        PlaylistState.user_id == user_id,
+        PlaylistState.url == url
+    ).first()
+    now = datetime.utcnow()
+    full_scan = (
+        state is None
+        or state.last_full_scan_at is None
+        or now - state.last_full_scan_at >= timedelta(days=PLAYLIST_FULL_SCAN_DAYS)
+    )
+
+    listing = _list_playlist(url, ytdlp_opts)
+    if listing is None:
+        return None
+    ydl, info = listing
+
+    known = load_known_ids(user_id, archive_file_path, db)
+    new_entries = []
+    queued = set()
+    newest_id = None
+    scanned = 0
+    known_in_a_row = 0
+    stopped_early = False
+
+    try:
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            scanned += 1
+            entry_id = entry.get("id")
+            if newest_id is None:
+                newest_id = entry_id
+
+            if entry_id and entry_id in known:
+                known_in_a_row += 1
+                if not full_scan and known_in_a_row >= PLAYLIST_STOP_AFTER_KNOWN:
+                    stopped_early = True
+                    break
+                continue
+
+            known_in_a_row = 0
+            entry_url = _entry_url(entry)
+            if entry_url and entry_url not in queued:
+                queued.add(entry_url)
+                new_entries.append(entry_url)
+    finally:
+        ydl.close()
+
+    if state is None:
+        state = PlaylistState(user_id=user_id, url=url)
+        db.add(state)
+    state.playlist_id = info.get("id")
+    state.newest_id = newest_id
+    state.last_new_entries = len(new_entries)
+    state.last_expanded_at = now
+    if full_scan:
+        state.entry_count = scanned
+        state.last_full_scan_at = now
+    db.commit()
+
+    return PlaylistExpansion(new_entries, scanned, stopped_early, full_scan)
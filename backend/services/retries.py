@@ -0,0 +1,212 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.core.config import RETRY_BASE_DELAY, RETRY_BUDGETS, RETRY_MAX_DELAY, RETRY_POLL_INTERVAL
+from backend.core.deps import app_logger
+from backend.db.session import SessionLocal
+from backend.db.models import DownloadJob, DownloadRetry
+
+
+def parse_retry_budgets(value: str) -> Dict[str, int]:
+    """
+    Parse retry budgets per outcome class, e.g. "429=5,stall=3,timeout=3".
+    Classes that aren't listed are never retried. Raises ValueError on
+    malformed input.
+    """
+    budgets = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        outcome, sep, count = part.partition("=")
+        if not sep or not count.strip().isdigit():
+            raise ValueError(f"Invalid retry budget {part!r}, expected CLASS=COUNT")
+        budgets[outcome.strip()] = int(count)
+    return budgets
+
+
+try:
+    _budgets = parse_retry_budgets(RETRY_BUDGETS)
+except ValueError as e:
+    app_logger.error(f"Ignoring BACKEND_RETRY_BUDGETS, failed URLs won't be retried: {e}")
+    _budgets = {}
+
+
+def retry_delay(retry_number: int) -> float:
+    """Seconds to wait before the given retry (1 for the first): doubles each time, with jitter."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (retry_number - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def schedule_retry(
+    db,
+    job: DownloadJob,
+    config_name: str,
+    urls_name: str,
+    folder: str,
+    url: str,
+    outcome: str,
+    error: Optional[str] = None,
+) -> Optional[datetime]:
+    """
+    Queue a URL that just failed for another attempt, unless its outcome
+    class has used up its budget. Each class counts only the retries its own
+    failures caused; the backoff grows with every retry of the URL.
+    Returns when it will be retried, or None.
+    """
+    retry = db.query(DownloadRetry).filter(
+        DownloadRetry.user_id == job.user_id,
+        DownloadRetry.config_name == config_name,
+        DownloadRetry.folder == folder,
+        DownloadRetry.url == url
+    ).first()
+    if retry is None:
+        retry = DownloadRetry(
+            user_id=job.user_id,
+            config_name=config_name,
+            folder=folder,
+            url=url,
+            attempts=0,
+        )
+        db.add(retry)
+    else:
+        retry.attempts += 1
+
+    now = datetime.utcnow()
+    if retry.class_retries:
+        class_retries = json.loads(retry.class_retries)
+    else:
+        # Rows from before per-class counts charged every retry to the last class
+        class_retries = {retry.error_class: retry.attempts} if retry.attempts else {}
+    retry.urls_name = urls_name
+    retry.create_symlinks = job.create_symlinks
+    retry.error_class = outcome
+    retry.last_error = error
+    retry.job_id = None
+    retry.updated_at = now
+    if class_retries.get(outcome, 0) >= _budgets.get(outcome, 0):
+        retry.status = "exhausted"
+        retry.next_attempt_at = None
+    else:
+        class_retries[outcome] = class_retries.get(outcome, 0) + 1
+        retry.class_retries = json.dumps(class_retries)
+        retry.status = "waiting"
+        retry.next_attempt_at = now + timedelta(seconds=retry_delay(retry.attempts + 1))
+    db.commit()
+    return retry.next_attempt_at
+
+
+def clear_retry(db, user_id: int, config_name: str, folder: str, url: str):
+    """Forget a URL's retries once it has downloaded."""
+    db.query(DownloadRetry).filter(
+        DownloadRetry.user_id == user_id,
+        DownloadRetry.config_name == config_name,
+        DownloadRetry.folder == folder,
+        DownloadRetry.url == url
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def retry_urls_for_job(db, job_id: int) -> Dict[str, List[str]]:
+    """The URLs a retry job downloads, by folder, in the shape of a URL source."""
+    urls_data: Dict[str, List[str]] = {}
+    rows = db.query(DownloadRetry).filter(
+        DownloadRetry.job_id == job_id,
+        DownloadRetry.status == "queued"
+    ).order_by(DownloadRetry.id).all()
+    for retry in rows:
+        urls_data.setdefault(retry.folder, []).append(retry.url)
+    return urls_data
+
+
+def _release_abandoned(db):
+    """Retries whose job ended without reaching them (stopped, cancelled, crashed) wait again."""
+    ended_jobs = db.query(DownloadJob.id).filter(DownloadJob.status.in_(("completed", "failed")))
+    rows = db.query(DownloadRetry).filter(
+        DownloadRetry.status == "queued",
+        DownloadRetry.job_id.in_(ended_jobs)
+    ).all()
+    now = datetime.utcnow()
+    for retry in rows:
+        retry.status = "waiting"
+        retry.job_id = None
+        retry.next_attempt_at = now + timedelta(seconds=retry_delay(retry.attempts + 1))
+        retry.updated_at = now
+    db.commit()
+
+
+def enqueue_due_retries() -> int:
+    """
+    Queue one retry job per user and config for the URLs whose retry time
+    has come. Returns how many URLs were queued.
+    """
+    db = SessionLocal()
+    try:
+        _release_abandoned(db)
+
+        due = db.query(DownloadRetry).filter(
+            DownloadRetry.status == "waiting",
+            DownloadRetry.next_attempt_at <= datetime.utcnow()
+        ).order_by(DownloadRetry.next_attempt_at).all()
+
+        groups: Dict[Tuple[int, str, str, bool], List[int]] = {}
+        for retry in due:
+            key = (retry.user_id, retry.config_name, retry.urls_name, retry.create_symlinks)
+            groups.setdefault(key, []).append(retry.id)
+
+        enqueued = 0
+        for (user_id, config_name, urls_name, create_symlinks), retry_ids in groups.items():
+            job = DownloadJob(
+                user_id=user_id,
+                name=f"{config_name}/{urls_name}",
+                status="pending",
+                create_symlinks=create_symlinks,
+                is_retry=True,
+            )
+            db.add(job)
+            db.flush()
+            # Only rows still waiting, in case another process queued them first
+            claimed = db.query(DownloadRetry).filter(
+                DownloadRetry.id.in_(retry_ids),
+                DownloadRetry.status == "waiting"
+            ).update({"status": "queued", "job_id": job.id, "updated_at": datetime.utcnow()}, synchronize_session=False)
+            if not claimed:
+                db.rollback()
+                continue
+            db.commit()
+            enqueued += claimed
+            app_logger.info(f"Queued retry job {job.id} for {claimed} failed URLs of {config_name}/{urls_name}")
+        return enqueued
+    finally:
+        db.close()
+
+
+class RetryScheduler:
+    """
+    Background thread that turns due retries into retry jobs. Nothing holds
+    a download slot while a retry waits; the job only enters the queue once
+    its backoff has passed.
+    """
+
+    def __init__(self, on_enqueued: Optional[Callable[[], None]] = None, interval: int = RETRY_POLL_INTERVAL):
+        self.on_enqueued = on_enqueued
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="retry-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if enqueue_due_retries() and self.on_enqueued:
+                    self.on_enqueued()
+            except Exception as e:
+                app_logger.error(f"Retry scheduler failed: {e}")
+            time.sleep(self.interval)
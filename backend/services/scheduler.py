@@ -1,77 +1,330 @@
 import os
 import json
 import time
+import heapq
+import random
 import threading
-from datetime import datetime
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, List, Set, Tuple, Dict
 from croniter import croniter
 from pathlib import Path
 
+from backend.core.config import LEASE_TTL, SCHEDULER_MISFIRE_GRACE, SCHEDULER_CATCHUP_SPREAD, SCHEDULER_RESYNC_INTERVAL
 from backend.core.deps import app_logger
 from backend.db.session import SessionLocal
 from backend.db.models import ScheduledTask, User
 from backend.services.downloader import start_download_job
+from backend.services.leases import LeaseHandle, LocalLeaseBackend, get_lease_backend
+
+
+MISFIRE_POLICIES = ("once", "all", "skip")
+
+LEADER_LEASE_KEY = "scheduler:leader"
 
 
 class TaskScheduler:
+    """
+    Fires cron-driven ScheduledTasks at their exact due time.
+
+    Keeps a min-heap of precomputed (next_run, task_id) pairs and sleeps on a
+    condition variable until the earliest one is due, so idle tasks cost
+    nothing between firings. The tasks API calls reschedule()/unschedule()
+    after every change, which wakes the loop early.
+
+    Due tasks run on a small worker pool, each with its own session. Firing
+    times are spread by the task's jitter, and tasks that are overdue when
+    (re)scheduled are staggered over SCHEDULER_CATCHUP_SPREAD seconds so a
+    restart doesn't fire everything in the same second.
+
+    Only one process fires tasks: every API worker competes for the
+    "scheduler:leader" lease and the holder schedules. Followers retry every
+    LEASE_TTL / 3 seconds and take over when the leader's lease expires.
+    Since followers don't see other processes' reschedule() calls, the leader
+    also reloads tasks from the database every SCHEDULER_RESYNC_INTERVAL
+    seconds when a shared lease backend is configured.
+    """
+
     def __init__(self):
         self._running = False
         self._thread: Optional[threading.Thread] = None
-        self._check_interval = 60
+        self._election_thread: Optional[threading.Thread] = None
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}
+        self._due: Dict[int, datetime] = {}
+        self._active: Set[int] = set()
+        self._cond = threading.Condition()
+        self._max_sleep = 3600
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lease: Optional[LeaseHandle] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lease is not None
 
     def start(self):
         if self._running:
             return
         self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="scheduler")
         self._thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self._thread.start()
+        self._election_thread = threading.Thread(target=self._run_election, daemon=True)
+        self._election_thread.start()
         app_logger.info("Task scheduler started")
 
     def stop(self):
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in (self._thread, self._election_thread):
+            if thread:
+                thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False)
         app_logger.info("Task scheduler stopped")
 
-    def _run_scheduler(self):
+    def reschedule(self, task_id: int):
+        """Re-read a task after it was created or updated and wake the scheduler."""
+        if not self.is_leader:
+            return
+        db = SessionLocal()
+        try:
+            task = db.query(ScheduledTask).filter(ScheduledTask.id == task_id).first()
+            next_run = self._compute_next_run(task) if task and task.is_active else None
+            fire_at = self._fire_time(task, next_run) if next_run else None
+        finally:
+            db.close()
+        self._set_next_run(task_id, fire_at, next_run)
+
+    def unschedule(self, task_id: int):
+        self._set_next_run(task_id, None)
+
+    def _run_election(self):
+        backend = get_lease_backend()
+        interval = max(LEASE_TTL / 3, 1)
+        resync = not isinstance(backend, LocalLeaseBackend)
+        last_sync = 0.0
+
         while self._running:
             try:
-                self._check_and_run_tasks()
+                if self._lease is None:
+                    lease = backend.acquire(LEADER_LEASE_KEY)
+                    if lease:
+                        app_logger.info("Scheduler leadership acquired")
+                        self._lease = lease
+                        self._load_tasks()
+                        last_sync = time.monotonic()
+                elif not backend.renew(self._lease):
+                    app_logger.warning("Scheduler leadership lost")
+                    self._step_down()
+                elif resync and time.monotonic() - last_sync >= SCHEDULER_RESYNC_INTERVAL:
+                    self._load_tasks()
+                    last_sync = time.monotonic()
             except Exception as e:
-                app_logger.error(f"Scheduler error: {e}")
-            time.sleep(self._check_interval)
+                app_logger.error(f"Scheduler election error: {e}")
+
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running, timeout=interval)
+
+        if self._lease:
+            lease = self._lease
+            self._step_down()
+            try:
+                backend.release(lease)
+            except Exception as e:
+                app_logger.error(f"Error releasing scheduler leadership: {e}")
+
+    def _step_down(self):
+        with self._cond:
+            self._lease = None
+            self._heap = []
+            self._scheduled = {}
+            self._due = {}
+            self._cond.notify_all()
 
-    def _check_and_run_tasks(self):
+    def _set_next_run(self, task_id: int, fire_at: Optional[datetime], next_run: Optional[datetime] = None):
+        with self._cond:
+            if fire_at is None or not self.is_leader:
+                self._scheduled.pop(task_id, None)
+                self._due.pop(task_id, None)
+            else:
+                self._scheduled[task_id] = fire_at
+                self._due[task_id] = next_run
+                heapq.heappush(self._heap, (fire_at, task_id))
+            if len(self._heap) > 2 * len(self._scheduled) + 64:
+                self._heap = [(run_at, tid) for tid, run_at in self._scheduled.items()]
+                heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def _load_tasks(self):
+        """Rebuild the heap from the database, keeping firing times of unchanged tasks."""
         db = SessionLocal()
         try:
-            now = datetime.utcnow()
             tasks = db.query(ScheduledTask).filter(
                 ScheduledTask.is_active == True
             ).all()
-
-            for task in tasks:
-                if self._should_run_task(task, now):
-                    self._run_task(task)
-                    task.last_run = now
-                    self._update_next_run(task, db)
-                    db.commit()
-        except Exception as e:
-            app_logger.error(f"Error checking tasks: {e}")
+            next_runs = {task.id: (task, self._compute_next_run(task)) for task in tasks}
         finally:
             db.close()
 
-    def _should_run_task(self, task: ScheduledTask, now: datetime) -> bool:
+        with self._cond:
+            if not self.is_leader:
+                return
+            scheduled = {}
+            due = {}
+            for task_id, (task, next_run) in next_runs.items():
+                if not next_run or task_id in self._active:
+                    continue
+                if task_id in self._scheduled and self._due.get(task_id) == next_run:
+                    scheduled[task_id] = self._scheduled[task_id]
+                else:
+                    scheduled[task_id] = self._fire_time(task, next_run)
+                due[task_id] = next_run
+            self._scheduled = scheduled
+            self._due = due
+            self._heap = [(run_at, task_id) for task_id, run_at in scheduled.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def _compute_next_run(self, task: ScheduledTask) -> Optional[datetime]:
         if not task.cron_expression:
-            return False
-        
+            return None
+        if task.next_run:
+            return task.next_run
         try:
-            cron = croniter(task.cron_expression, now)
-            prev_run = cron.get_prev(datetime)
-            if task.last_run:
-                return prev_run > task.last_run
-            return True
+            cron = croniter(task.cron_expression, task.last_run or datetime.utcnow())
+            return cron.get_next(datetime)
         except Exception:
-            return False
+            return None
+
+    def _fire_time(self, task: ScheduledTask, next_run: datetime) -> datetime:
+        fire_at = next_run + timedelta(seconds=random.uniform(0, task.jitter_seconds or 0))
+        now = datetime.utcnow()
+        if fire_at < now:
+            fire_at = now + timedelta(seconds=random.uniform(0, SCHEDULER_CATCHUP_SPREAD))
+        return fire_at
+
+    def _missed_runs(self, task: ScheduledTask, due: datetime, now: datetime, limit: int) -> int:
+        """Count schedule points in [due, now], stopping at limit."""
+        count = 1
+        try:
+            cron = croniter(task.cron_expression, due)
+            while count < limit and cron.get_next(datetime) <= now:
+                count += 1
+        except Exception:
+            pass
+        return count
+
+    def _runs_for_misfire(self, task: ScheduledTask, now: datetime) -> int:
+        """
+        Decide how many times a due task runs according to its misfire policy.
+
+        once: overdue schedule points are coalesced into a single run
+        all:  every missed point runs, up to max_catchup
+        skip: a run that is late beyond the grace window is dropped
+        """
+        due = task.next_run or now
+        policy = task.misfire_policy or "once"
+        late = (now - due).total_seconds() > SCHEDULER_MISFIRE_GRACE + (task.jitter_seconds or 0)
+
+        if policy == "skip":
+            if late:
+                app_logger.info(f"Skipping missed run of task {task.name} (due {due})")
+                return 0
+            return 1
+
+        if policy == "all":
+            max_catchup = max(task.max_catchup or 1, 1)
+            runs = self._missed_runs(task, due, now, max_catchup)
+            if runs > 1:
+                app_logger.info(f"Catching up {runs} missed runs of task {task.name}")
+            return runs
+
+        if late:
+            app_logger.info(f"Coalescing missed runs of task {task.name} (due {due}) into one")
+        return 1
+
+    def _next_due(self) -> Optional[int]:
+        """Block until a task is due. Returns None once the scheduler is stopped."""
+        with self._cond:
+            while self._running:
+                while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+
+                now = datetime.utcnow()
+                if self._heap and self._heap[0][0] <= now:
+                    _, task_id = heapq.heappop(self._heap)
+                    del self._scheduled[task_id]
+                    self._due.pop(task_id, None)
+                    self._active.add(task_id)
+                    return task_id
+
+                timeout = self._max_sleep
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._cond.wait(timeout)
+            return None
+
+    def _run_scheduler(self):
+        while True:
+            task_id = self._next_due()
+            if task_id is None:
+                return
+            try:
+                self._executor.submit(self._run_due_task, task_id)
+            except RuntimeError as e:
+                app_logger.error(f"Scheduler error: {e}")
+                return
+
+    def _run_due_task(self, task_id: int):
+        """
+        Claim and run a due task.
+
+        The run is claimed with a conditional UPDATE on next_run, so if two
+        processes ever both believe they lead (e.g. during a failover) only
+        one of them runs each schedule point.
+        """
+        fire_at = None
+        next_run = None
+        db = SessionLocal()
+        try:
+            task = db.query(ScheduledTask).filter(ScheduledTask.id == task_id).first()
+            if not task or not task.is_active:
+                return
+
+            now = datetime.utcnow()
+            runs = self._runs_for_misfire(task, now)
+            due = task.next_run
+            next_run = get_next_run_time(task.cron_expression)
+            values = {"next_run": next_run}
+            if runs:
+                values["last_run"] = now
+            claimed = db.query(ScheduledTask).filter(
+                ScheduledTask.id == task_id,
+                ScheduledTask.next_run.is_(None) if due is None else ScheduledTask.next_run == due
+            ).update(values, synchronize_session=False)
+            db.commit()
+
+            if not claimed:
+                db.expire_all()
+                task = db.query(ScheduledTask).filter(ScheduledTask.id == task_id).first()
+                next_run = task.next_run if task and task.is_active else None
+                runs = 0
+            if next_run:
+                fire_at = self._fire_time(task, next_run)
+
+            for _ in range(runs):
+                self._run_task(task)
+        except Exception as e:
+            app_logger.error(f"Error running due task {task_id}: {e}")
+        finally:
+            db.close()
+            with self._cond:
+                self._active.discard(task_id)
+
+        if fire_at:
+            self._set_next_run(task_id, fire_at, next_run)
 
     def _run_task(self, task: ScheduledTask):
         app_logger.info(f"Running scheduled task: {task.name} (ID: {task.id}, type: {task.task_type})")
@@ -132,14 +385,6 @@ class TaskScheduler:
         result = delete_old_files(task.user_id, days, user.username)
         app_logger.info(f"Cleanup task {task.name}: deleted {result['files_deleted']} files, {result['folders_deleted']} folders, freed {result['space_freed']} bytes")
 
-    def _update_next_run(self, task: ScheduledTask, db):
-        try:
-            cron = croniter(task.cron_expression, datetime.utcnow())
-            next_run = cron.get_next(datetime)
-            task.next_run = next_run
-        except Exception:
-            task.next_run = None
-
 
 def validate_cron_expression(cron: str) -> bool:
     try:
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.core.config import SIDECAR_TIMEOUT, SIDECAR_WORKERS
+
+
+_RECENT_SIZE = 256
+
+
+class SidecarPool:
+    """
+    Write a download's sidecar files (thumbnails, descriptions, links,
+    info.json) on a small thread pool instead of the download thread.
+
+    Thumbnails go through one pooled requests.Session with timeouts and
+    retries. Identical thumbnail URLs are fetched once: concurrent requests
+    share the in-flight fetch, and later ones revalidate the last copy with
+    a conditional request and copy it locally on 304.
+    """
+
+    def __init__(self, workers: int = SIDECAR_WORKERS, timeout: int = SIDECAR_TIMEOUT):
+        workers = max(workers, 1)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sidecar")
+        self._session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._in_flight: Dict[str, Future] = {}
+        # url -> (path, etag, last_modified) of the last completed fetch
+        self._recent: "OrderedDict[str, Tuple[str, Optional[str], Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, path: str, headers: Optional[Mapping[str, str]] = None) -> Future:
+        """Download url to path. The future resolves to path."""
+        with self._lock:
+            first = self._in_flight.get(url)
+            if first is None:
+                future = self._executor.submit(self._download, url, path, dict(headers or {}))
+                self._in_flight[url] = future
+                future.add_done_callback(lambda f: self._finish(url, f))
+                return future
+
+        # Same URL already in flight: copy its result once it lands
+        future = Future()
+
+        def copy_result(done: Future):
+            try:
+                source = done.result()
+                if os.path.abspath(source) != os.path.abspath(path):
+                    shutil.copyfile(source, path)
+                future.set_result(path)
+            except Exception as e:
+                future.set_exception(e)
+
+        first.add_done_callback(copy_result)
+        return future
+
+    def write_text(self, path: str, text: str) -> Future:
+        return self._executor.submit(self._write_text, path, text)
+
+    def write_json(self, path: str, data: Any) -> Future:
+        return self._executor.submit(self._write_json, path, data)
+
+    def _finish(self, url: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(url) is future:
+                del self._in_flight[url]
+
+    def _download(self, url: str, path: str, headers: Dict[str, str]) -> str:
+        with self._lock:
+            recent = self._recent.get(url)
+        if recent and os.path.isfile(recent[0]):
+            if recent[1]:
+                headers["If-None-Match"] = recent[1]
+            if recent[2]:
+                headers["If-Modified-Since"] = recent[2]
+        else:
+            recent = None
+
+        with self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and recent:
+                if os.path.abspath(recent[0]) != os.path.abspath(path):
+                    shutil.copyfile(recent[0], path)
+            else:
+                response.raise_for_status()
+                tmp_path = path + ".part"
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(64 * 1024):
+                        f.write(chunk)
+                os.replace(tmp_path, path)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        with self._lock:
+            self._recent[url] = (path, etag or (recent[1] if recent else None), last_modified or (recent[2] if recent else None))
+            self._recent.move_to_end(url)
+            while len(self._recent) > _RECENT_SIZE:
+                self._recent.popitem(last=False)
+        return path
+
+    @staticmethod
+    def _write_text(path: str, text: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    @staticmethod
+    def _write_json(path: str, data: Any) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+def wait_for_sidecars(futures: Iterable[Future], log_callback=None, timeout: Optional[float] = None):
+    """Block until the given sidecar writes finish, logging the ones that failed."""
+    futures = list(futures)
+    if not futures:
+        return
+    done, not_done = wait(futures, timeout=timeout)
+    for future in done:
+        error = future.exception()
+        if error and log_callback:
+            log_callback(f"Failed to write sidecar: {error}", True)
+    if not_done and log_callback:
+        log_callback(f"{len(not_done)} sidecar writes still pending after {timeout}s", True)
+
+
+_pool: Optional[SidecarPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sidecar_pool() -> SidecarPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SidecarPool()
+        return _pool
@@ -0,0 +1,66 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class Flight:
+    """A single in-flight operation shared by every caller asking for the same key."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.result: Any = None
+        self.refs = 0
+        self.lease: Any = None
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the leader finishes. Returns False if the timeout expired first."""
+        return self._done.wait(timeout)
+
+
+class SingleFlight:
+    """
+    Coordinate duplicate work so only one caller (the leader) performs it.
+
+    The first caller to join a key becomes the leader and must call finish();
+    everyone else waits on the same Flight and reads the leader's result.
+    Entries are refcounted and evicted as soon as the leader finishes or the
+    last participant leaves, so the map only ever holds in-flight keys.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Join the flight for key. Returns (flight, is_leader)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None or flight.done
+            if is_leader:
+                flight = Flight(key)
+                self._flights[key] = flight
+            flight.refs += 1
+            return flight, is_leader
+
+    def leave(self, flight: Flight):
+        with self._lock:
+            flight.refs -= 1
+            if flight.refs <= 0 and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def finish(self, flight: Flight, result: Any = None):
+        """Publish the leader's result, wake all waiters and evict the entry."""
+        with self._lock:
+            flight.result = result
+            flight._done.set()
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        self.leave(flight)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,308 @@
+import mimetypes
+import os
+import stat
+import tarfile
+import time
+import zipfile
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Iterator, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+for _ext, _type in (
+    (".mkv", "video/x-matroska"),
+    (".webm", "video/webm"),
+    (".flv", "video/x-flv"),
+    (".m4a", "audio/mp4"),
+    (".opus", "audio/ogg"),
+    (".vtt", "text/vtt"),
+    (".srt", "application/x-subrip"),
+    (".ass", "text/x-ssa"),
+    (".webp", "image/webp"),
+):
+    mimetypes.add_type(_type, _ext)
+
+
+def guess_media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    return media_type or "application/octet-stream"
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, which are answered with the full file). Raises ValueError when
+    the range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep or not (start_str.isdigit() or not start_str) or not (end_str.isdigit() or not end_str):
+        return None
+
+    if not start_str:
+        if not end_str or int(end_str) == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - int(end_str), 0), size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+class MediaFileResponse(Response):
+    """
+    Serve a file with HTTP range, conditional request and zero-copy support.
+
+    Handles `Range`/`If-Range` (206, 416), `If-None-Match`/`If-Modified-Since`
+    (304) and uses the ASGI zero-copy send extension when the server offers
+    it, otherwise streams the requested byte range in chunks.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        request_headers: Mapping[str, str],
+        filename: Optional[str] = None,
+        as_attachment: bool = False,
+        stat_result: Optional[os.stat_result] = None,
+    ):
+        self.path = path
+        self.background = None
+        stat_result = stat_result or os.stat(path)
+        size = stat_result.st_size
+        etag = make_etag(stat_result)
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+            "content-type": guess_media_type(filename or path),
+        }
+        if filename:
+            disposition = "attachment" if as_attachment else "inline"
+            headers["content-disposition"] = f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+        self.range: Optional[Tuple[int, int]] = None
+        self.status_code = 200
+
+        if self._not_modified(request_headers, etag, stat_result.st_mtime):
+            self.status_code = 304
+            del headers["content-type"]
+        else:
+            range_header = request_headers.get("range")
+            if_range = request_headers.get("if-range")
+            if range_header and (not if_range or if_range.strip() in (etag, last_modified)):
+                try:
+                    self.range = parse_range_header(range_header, size)
+                except ValueError:
+                    self.status_code = 416
+                    headers["content-range"] = f"bytes */{size}"
+                    headers["content-length"] = "0"
+
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            headers["content-length"] = str(end - start + 1)
+        elif self.status_code == 200:
+            self.range = (0, size - 1)
+            headers["content-length"] = str(size)
+
+        self.init_headers(headers)
+
+    @staticmethod
+    def _not_modified(request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, etag)
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD" or self.status_code not in (200, 206):
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.range
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+
+        if count > 0 and "http.response.zerocopysend" in extensions:
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": fd,
+                    "offset": start,
+                    "count": count,
+                    "more_body": False,
+                })
+            finally:
+                os.close(fd)
+            return
+
+        if count > 0 and self.status_code == 200 and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0 or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def resolve_media_path(path: str, allowed_roots) -> Optional[str]:
+    """
+    Resolve symlinks and return the real path of a regular file, or None when
+    it doesn't exist or resolves outside every allowed root.
+    """
+    real_path = os.path.realpath(path)
+    roots = [os.path.realpath(str(root)) for root in allowed_roots]
+    if not any(real_path == root or real_path.startswith(root + os.sep) for root in roots):
+        return None
+    try:
+        if not stat.S_ISREG(os.stat(real_path).st_mode):
+            return None
+    except OSError:
+        return None
+    return real_path
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_archive_members(folder: str, allowed_roots) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Yield (archive name, real path, stat) for every file below folder.
+
+    Symlinks are followed (deduplicated files live in global/downloads) but
+    only targets inside allowed_roots are included, and each real directory
+    is visited once so symlink loops can't recurse forever.
+    """
+    seen_dirs = set()
+    for root, dirs, files in os.walk(folder, followlinks=True):
+        real_root = os.path.realpath(root)
+        if real_root in seen_dirs:
+            dirs[:] = []
+            continue
+        seen_dirs.add(real_root)
+        dirs.sort()
+
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            real_path = resolve_media_path(path, allowed_roots)
+            if real_path is None:
+                continue
+            arcname = os.path.relpath(path, folder).replace(os.sep, "/")
+            yield arcname, real_path, os.stat(real_path)
+
+
+def _iter_file(path: str, size: int, chunk_size: int) -> Iterator[bytes]:
+    """Read exactly size bytes, zero-padding if the file shrank meanwhile."""
+    remaining = size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    if remaining > 0:
+        yield b"\0" * remaining
+
+
+def stream_zip(members: Iterable[Tuple[str, str, os.stat_result]], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Stream a store-mode (uncompressed) zip archive in constant memory.
+
+    The archive is written to a non-seekable sink, so zipfile emits data
+    descriptors after each member and switches to Zip64 records for members
+    and archives past 4 GB.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for arcname, path, st in members:
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(max(st.st_mtime, 315532800))[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = st.st_size
+            info.external_attr = 0o644 << 16
+            with zf.open(info, mode="w") as dest:
+                for chunk in _iter_file(path, st.st_size, chunk_size):
+                    dest.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_tar(members: Iterable[Tuple[str, str, os.stat_result]], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Stream an uncompressed PAX tar archive in constant memory."""
+    for arcname, path, st in members:
+        info = tarfile.TarInfo(arcname)
+        info.size = st.st_size
+        info.mtime = int(st.st_mtime)
+        info.mode = 0o644
+        yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+        yield from _iter_file(path, st.st_size, chunk_size)
+        padding = -st.st_size % tarfile.BLOCKSIZE
+        if padding:
+            yield b"\0" * padding
+    yield b"\0" * (tarfile.BLOCKSIZE * 2)
@@ -0,0 +1,62 @@
+import shutil
+from typing import Any, Dict, Optional
+
+
+MiB = 1024 * 1024
+
+# yt-dlp params per profile. "max" hands http(s) downloads to aria2c when it
+# is installed; fragmented formats (HLS/DASH) stay on the native downloader,
+# which fetches fragments concurrently itself.
+THROUGHPUT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "conservative": {
+        "concurrent_fragment_downloads": 1,
+        "buffersize": 1024,
+    },
+    "balanced": {
+        "concurrent_fragment_downloads": 4,
+        "http_chunk_size": 10 * MiB,
+        "buffersize": 16 * 1024,
+    },
+    "max": {
+        "concurrent_fragment_downloads": 16,
+        "http_chunk_size": 10 * MiB,
+        "buffersize": 64 * 1024,
+        "external_downloader": "aria2c",
+    },
+}
+
+EXTERNAL_DOWNLOADERS = ("native", "aria2c")
+
+ARIA2C_ARGS = ["--max-connection-per-server=16", "--split=16", "--min-split-size=1M", "--file-allocation=none"]
+
+# Params the profiles set; a value the config sets itself wins over the profile
+_CONFIG_PARAMS = ("concurrent_fragment_downloads", "http_chunk_size", "buffersize")
+
+
+def build_throughput_params(
+    profile: Optional[str],
+    config_opts: Dict[str, Any],
+    external_downloader: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return the yt-dlp params that tune download throughput for a job.
+
+    Starts from the named profile (no profile means yt-dlp's defaults), then
+    keeps the config's own --concurrent-fragments, --http-chunk-size and
+    --buffer-size values (config_opts are compiled params, so they are
+    already parsed). external_downloader ("native" or "aria2c") overrides the
+    profile's choice; aria2c is skipped when it isn't installed.
+    """
+    params = dict(THROUGHPUT_PROFILES.get(profile or "", {}))
+
+    for param in _CONFIG_PARAMS:
+        if config_opts.get(param):
+            params[param] = config_opts[param]
+
+    downloader = external_downloader or params.pop("external_downloader", None)
+    params.pop("external_downloader", None)
+    if downloader == "aria2c" and shutil.which("aria2c"):
+        params["external_downloader"] = {"http": "aria2c"}
+        params["external_downloader_args"] = {"aria2c": ARIA2C_ARGS}
+
+    return params
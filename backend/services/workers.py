@@ -0,0 +1,329 @@
+import multiprocessing
+import queue
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from backend.core.config import WORKER_KILL_GRACE, WORKER_MAX_JOBS, WORKER_MAX_RSS_MB
+from backend.core.deps import app_logger, get_user_logger
+from backend.db.session import SessionLocal
+from backend.db.models import Config, DownloadJob
+from backend.services import downloader
+from backend.services.bandwidth import get_bandwidth_governor
+from backend.services.config_compiler import compile_config
+
+
+# spawn, not fork: the API process has threads (scheduler, sync, downloads)
+# whose locks a forked child would inherit in whatever state they were in
+_context = multiprocessing.get_context("spawn")
+
+_POLL_INTERVAL = 1.0
+
+
+def _worker_main(conn):
+    """
+    Entry point of a worker process: run the jobs sent over conn one at a
+    time and report back on the same pipe.
+
+    Messages in: ("job", kwargs for run_download), ("rate", bytes/s), ("exit",).
+    Messages out: ("progress", job_id, dict), ("done", job_id).
+    """
+    governor = get_bandwidth_governor()
+    governor.set_fixed_rate(0)
+    jobs: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def read_messages():
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                jobs.put(None)
+                return
+            if message[0] == "job":
+                jobs.put(message[1])
+            elif message[0] == "rate":
+                governor.set_fixed_rate(message[1])
+            elif message[0] == "exit":
+                jobs.put(None)
+                return
+
+    threading.Thread(target=read_messages, name="worker-pipe", daemon=True).start()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id = job["job_id"]
+        try:
+            downloader.run_download(
+                **job,
+                dispatch_next=False,
+                on_progress=lambda progress: send(("progress", job_id, progress)),
+            )
+        finally:
+            send(("done", job_id))
+
+
+class WorkerProcess:
+    """A child process that runs download jobs sent to it over a pipe."""
+
+    def __init__(self):
+        self.conn, child_conn = _context.Pipe()
+        self.process = _context.Process(target=_worker_main, args=(child_conn,), name="download-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_run = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def rss(self) -> int:
+        """Resident memory of the worker and everything it started (ffmpeg, aria2c), in bytes."""
+        try:
+            proc = psutil.Process(self.pid)
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return 0
+
+    def kill(self):
+        """Kill the worker and any downloader processes it started."""
+        try:
+            children = psutil.Process(self.pid).children(recursive=True)
+        except psutil.Error:
+            children = []
+        self.process.kill()
+        for child in children:
+            try:
+                child.kill()
+            except psutil.Error:
+                pass
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def close(self):
+        """Ask an idle worker to exit, killing it if it doesn't."""
+        try:
+            self.conn.send(("exit",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class WorkerPool:
+    """
+    Idle worker processes kept for reuse. A worker is retired after
+    WORKER_MAX_JOBS jobs, so whatever memory yt-dlp or an extractor leaks
+    goes away with it.
+    """
+
+    def __init__(self, max_jobs: int = WORKER_MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._idle: List[WorkerProcess] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> WorkerProcess:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+        return WorkerProcess()
+
+    def release(self, worker: WorkerProcess):
+        if not worker.is_alive():
+            return
+        if self.max_jobs and worker.jobs_run >= self.max_jobs:
+            worker.close()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+
+class WorkerHandle:
+    """
+    Popen-like handle on the worker running a job, stored as the job's
+    "process" so stop_download_job can terminate it.
+    """
+
+    def __init__(self, worker: WorkerProcess):
+        self.worker = worker
+        self.finished = threading.Event()
+        self.kill_reason: Optional[str] = None
+
+    def poll(self) -> Optional[int]:
+        if self.finished.is_set() or not self.worker.is_alive():
+            return self.worker.process.exitcode or 0
+        return None
+
+    def terminate(self):
+        self.kill("Stopped by user")
+
+    def kill(self, reason: str = "Stopped by user"):
+        if self.kill_reason is None:
+            self.kill_reason = reason
+        self.worker.kill()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        self.worker.process.join(timeout)
+        if self.worker.is_alive() and not self.finished.is_set():
+            raise subprocess.TimeoutExpired("download-worker", timeout)
+        return self.poll()
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+def _register_bandwidth(username: str, config_name: str, job_id: int):
+    """This job's slot in the API process's bandwidth governor, which decides the worker's rate."""
+    db = SessionLocal()
+    try:
+        job = db.query(DownloadJob).filter(DownloadJob.id == job_id).first()
+        config = job and db.query(Config).filter(Config.user_id == job.user_id, Config.name == config_name).first()
+        opts = compile_config(config.content).opts if config else {}
+    except ValueError:
+        opts = {}
+    finally:
+        db.close()
+    return get_bandwidth_governor().register(username, opts)
+
+
+def _fail_job(job_id: int, message: str):
+    db = SessionLocal()
+    try:
+        job = db.query(DownloadJob).filter(DownloadJob.id == job_id).first()
+        if job and job.status in ("pending", "running"):
+            job.status = "failed"
+            job.error_message = message
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+def run_download_in_worker(
+    username: str,
+    config_name: str,
+    urls_name: str,
+    job_id: int,
+    create_symlinks: bool = True,
+    dispatch_next: bool = True,
+):
+    """
+    Run a job in a worker process and supervise it from this thread.
+
+    The worker reports the URL it's on over its pipe. It is killed, together
+    with any ffmpeg/aria2c it started, when the job is stopped, when one URL
+    runs WORKER_KILL_GRACE seconds past the config's download timeout (a
+    hung extractor never reaches the in-process timeout checks), or when
+    its memory grows past WORKER_MAX_RSS_MB.
+    """
+    user_logger = get_user_logger(username)
+    pool = get_worker_pool()
+    worker = pool.acquire()
+    handle = WorkerHandle(worker)
+    slot = _register_bandwidth(username, config_name, job_id)
+    rss_limit = WORKER_MAX_RSS_MB * 1024 * 1024
+
+    with downloader._jobs_lock:
+        downloader._running_jobs[job_id] = {"username": username, "process": handle}
+
+    user_logger.info(f"Job {job_id} running in worker process {worker.pid}")
+    sent_rate = None
+    url_started = None
+    url_timeout = None
+
+    try:
+        worker.conn.send(("job", {
+            "username": username,
+            "config_name": config_name,
+            "urls_name": urls_name,
+            "job_id": job_id,
+            "create_symlinks": create_symlinks,
+        }))
+        worker.jobs_run += 1
+
+        while not handle.finished.is_set():
+            if slot.rate != sent_rate:
+                sent_rate = slot.rate
+                worker.conn.send(("rate", sent_rate))
+
+            try:
+                has_message = worker.conn.poll(_POLL_INTERVAL)
+                message = worker.conn.recv() if has_message else None
+            except (EOFError, OSError):
+                break
+
+            if message and message[0] == "progress":
+                progress = message[2]
+                url_started = time.monotonic()
+                url_timeout = progress.get("url_timeout")
+                with downloader._jobs_lock:
+                    job_info = downloader._running_jobs.get(job_id)
+                    if job_info is not None:
+                        job_info["current_url"] = progress.get("current_url")
+            elif message and message[0] == "done":
+                handle.finished.set()
+                break
+
+            if not worker.is_alive():
+                break
+            if url_timeout and time.monotonic() - url_started > url_timeout + WORKER_KILL_GRACE:
+                handle.kill(f"Worker killed: URL exceeded the {url_timeout}s download timeout")
+                break
+            if rss_limit and worker.rss() > rss_limit:
+                handle.kill(f"Worker killed: memory exceeded {WORKER_MAX_RSS_MB} MiB")
+                break
+    except (OSError, ValueError) as e:
+        app_logger.error(f"Lost contact with worker for job {job_id}: {e}")
+    finally:
+        slot.release()
+
+        if handle.finished.is_set():
+            pool.release(worker)
+        else:
+            if worker.is_alive():
+                worker.kill()
+            exitcode = worker.process.exitcode
+            message = handle.kill_reason or f"Worker process exited unexpectedly (exit code {exitcode})"
+            user_logger.error(f"Download job {job_id} failed: {message}")
+            _fail_job(job_id, message)
+
+        with downloader._jobs_lock:
+            downloader._running_jobs.pop(job_id, None)
+        with downloader._users_lock:
+            downloader._running_users.discard(username)
+
+        if dispatch_next:
+            downloader.process_queue()
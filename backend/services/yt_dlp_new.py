@@ -39,13 +39,17 @@ import subprocess
 from datetime import datetime
 from typing import Dict, List, Union, Optional, Tuple, Any, Callable
 from queue import Queue, Empty
+from collections import deque
 
 try:
     import yt_dlp
+    from yt_dlp.postprocessor import PostProcessor
 except ImportError:
     print("yt-dlp library not installed. Install with: pip install yt-dlp")
     sys.exit(1)
 
+from backend.services.sidecars import get_sidecar_pool, wait_for_sidecars
+
 
 DEFAULT_USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -103,95 +107,6 @@ def get_random_user_agent() -> str:
     return random.choice(DEFAULT_USER_AGENTS)
 
 
-def parse_range_value(value: Any) -> Union[float, int, str]:
-    """
-    Parse a range value like '5-15' and return a random value within that range.
-    If it's a single number, return it as-is.
-    """
-    if isinstance(value, (int, float)):
-        return value
-    
-    if '-' in str(value):
-        parts = str(value).split('-')
-        try:
-            min_val = float(parts[0])
-            max_val = float(parts[1])
-            if min_val == int(min_val) and max_val == int(max_val):
-                return random.randint(int(min_val), int(max_val))
-            return random.uniform(min_val, max_val)
-        except (ValueError, IndexError):
-            pass
-    
-    try:
-        return float(value)
-    except ValueError:
-        return value
-
-
-def build_yt_dlp_opts_from_json(args_dict: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert a JSON args dictionary to yt-dlp options dict."""
-    ytdlp_opts = {}
-    
-    # Handle new format: separate yt-dlp and custom sections
-    if "yt-dlp" in args_dict:
-        yt_dlp_section = args_dict.get("yt-dlp", {})
-        custom_section = args_dict.get("custom", {})
-        
-        for key, value in yt_dlp_section.items():
-            opt_key = key.lstrip('-').replace('-', '_')
-            
-            if isinstance(value, bool):
-                if value:
-                    ytdlp_opts[opt_key] = True
-                continue
-            
-            if isinstance(value, str) and ',' in value:
-                if opt_key in ('sub_langs', 'subtitles', 'languages', 'sub_lang', 'subtitleslangs'):
-                    ytdlp_opts[opt_key] = [v.strip() for v in value.split(',')]
-                    if opt_key == 'sub_langs':
-                        ytdlp_opts['subtitleslangs'] = ytdlp_opts.pop('sub_langs')
-                    if opt_key == 'subtitleslangs':
-                        ytdlp_opts['writesubtitles'] = True
-                        ytdlp_opts['writeautomaticsub'] = True
-                    continue
-            
-            parsed_value = parse_range_value(value)
-            ytdlp_opts[opt_key] = parsed_value
-        
-        return ytdlp_opts, custom_section
-    
-    # Handle legacy format
-    for key, value in args_dict.items():
-        if key.startswith('_'):
-            continue
-        
-        opt_key = key.lstrip('-').replace('-', '_')
-        
-        if isinstance(value, bool):
-            if value:
-                ytdlp_opts[opt_key] = True
-            continue
-        
-        if isinstance(value, str) and ',' in value:
-            if opt_key in ('sub_langs', 'subtitles', 'languages', 'sub_lang', 'subtitleslangs'):
-                ytdlp_opts[opt_key] = [v.strip() for v in value.split(',')]
-                if opt_key == 'sub_langs':
-                    ytdlp_opts['subtitleslangs'] = ytdlp_opts.pop('sub_langs')
-                if opt_key == 'subtitleslangs':
-                    ytdlp_opts['writesubtitles'] = True
-                    ytdlp_opts['writeautomaticsub'] = True
-            continue
-        
-        if isinstance(value, list):
-            ytdlp_opts[opt_key] = value
-            continue
-        
-        parsed_value = parse_range_value(value)
-        ytdlp_opts[opt_key] = parsed_value
-    
-    return ytdlp_opts, {}
-
-
 def load_urls_from_json(urls_file: str) -> Dict[str, List[str]]:
     """Load URLs from a JSON file."""
     with open(urls_file, 'r', encoding='utf-8') as f:
@@ -210,15 +125,53 @@ def load_urls_from_json(urls_file: str) -> Dict[str, List[str]]:
 
 
 class DownloadState:
-    def __init__(self, timeout: int, stall_timeout: int, log_callback: Optional[Callable] = None):
+    """
+    Timeout and stall tracking for one run_yt_dlp call.
+    
+    Progress means new bytes or a new fragment for any file being written;
+    with concurrent fragment downloads the hooks arrive from several
+    threads. With min_rate set, a download that keeps trickling below
+    min_rate bytes/s over a whole stall_timeout window is a stall too.
+    """
+    
+    def __init__(self, timeout: int, stall_timeout: int, log_callback: Optional[Callable] = None, min_rate: int = 0):
         self.timeout = timeout
         self.stall_timeout = stall_timeout
         self.log_callback = log_callback
+        self.min_rate = min_rate
         self.start_time = time.time()
         self.last_progress_time = time.time()
         self.stalled = False
         self.timed_out = False
         self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._total_bytes = 0
+        self._samples = deque()
+    
+    def _record(self, info: Dict) -> bool:
+        """Record a progress report; return whether it moved the download forward."""
+        if 'downloaded_bytes' not in info and 'fragment_index' not in info:
+            # Downloaders that report no counters: any report counts
+            return True
+        key = info.get('tmpfilename') or info.get('filename') or ''
+        downloaded = info.get('downloaded_bytes') or 0
+        fragment = info.get('fragment_index') or 0
+        last_bytes, last_fragment = self._files.get(key, (0, 0))
+        if downloaded <= last_bytes and fragment <= last_fragment:
+            return False
+        self._total_bytes += max(downloaded - last_bytes, 0)
+        self._files[key] = (max(downloaded, last_bytes), max(fragment, last_fragment))
+        return True
+    
+    def _window_rate(self, now: float) -> Optional[float]:
+        """Average bytes/s over the last stall_timeout seconds, once that much history exists."""
+        self._samples.append((now, self._total_bytes))
+        while len(self._samples) > 1 and self._samples[1][0] <= now - self.stall_timeout:
+            self._samples.popleft()
+        started, start_bytes = self._samples[0]
+        if now - started < self.stall_timeout:
+            return None
+        return (self._total_bytes - start_bytes) / (now - started)
     
     def check_progress(self, status: str, info: Dict = None):
         with self._lock:
@@ -233,7 +186,8 @@ class DownloadState:
                 return False
             
             if status == 'downloading' or (info and info.get('status') == 'downloading'):
-                self.last_progress_time = current_time
+                if self._record(info or {}):
+                    self.last_progress_time = current_time
             
             elapsed_since_progress = current_time - self.last_progress_time
             if elapsed_since_progress > self.stall_timeout and not self.stalled:
@@ -244,6 +198,16 @@ class DownloadState:
                     self.log_callback(msg, False)
                 return False
             
+            if self.min_rate > 0 and not self.stalled:
+                rate = self._window_rate(current_time)
+                if rate is not None and rate < self.min_rate:
+                    self.stalled = True
+                    msg = f"\n[STALL] {rate / 1024:.1f} KiB/s over {self.stall_timeout}s, below {self.min_rate / 1024:.1f} KiB/s"
+                    print(msg, flush=True)
+                    if self.log_callback:
+                        self.log_callback(msg, False)
+                    return False
+            
             return True
     
     def log(self, msg: str, is_err: bool = False):
@@ -252,6 +216,39 @@ class DownloadState:
             self.log_callback(msg, is_err)
 
 
+def get_output_files(info: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Final media paths yt-dlp recorded in info['requested_downloads'], after
+    merging and post-processing, including those of playlist entries.
+    """
+    if not info:
+        return []
+    files = []
+    for download in info.get('requested_downloads') or []:
+        filepath = download.get('filepath') or download.get('filename')
+        if filepath:
+            files.append(filepath)
+    for entry in info.get('entries') or []:
+        if isinstance(entry, dict):
+            files.extend(get_output_files(entry))
+    return files
+
+
+class BeforeDownloadHook(PostProcessor):
+    """Hands each video's info dict to a callback once its format and filename are chosen."""
+    
+    def __init__(self, callback: Callable[[Dict[str, Any]], None]):
+        super().__init__()
+        self._callback = callback
+    
+    def run(self, info):
+        try:
+            self._callback(info)
+        except Exception as e:
+            self.report_warning(f"Before-download hook failed: {e}")
+        return [], info
+
+
 def run_yt_dlp(
     url: str,
     ytdlp_opts: Dict[str, Any],
@@ -260,12 +257,38 @@ def run_yt_dlp(
     stall_timeout: int = 300,
     use_random_agent: bool = True,
     log_callback: Optional[Callable[[str, bool], None]] = None,
+    cached_info: Optional[Dict[str, Any]] = None,
+    info_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    produced_files: Optional[List[str]] = None,
+    pending_sidecars: Optional[List[Any]] = None,
+    stall_min_rate: int = 0,
+    bandwidth_slot: Optional[Any] = None,
+    manager_opts: Optional[Dict[str, Any]] = None,
 ) -> Tuple[int, str, str]:
     """
     Run yt-dlp with the given options using the library.
+
+    When cached_info (a previously extracted info dict with still valid
+    format URLs) is given, it is downloaded directly without re-extracting;
+    if that fails the URL is extracted as usual. info_callback receives the
+    sanitized info dict of every successful extraction. The paths of the
+    media files written are appended to produced_files, taken from yt-dlp's
+    hooks and requested_downloads rather than by scanning the folder.
+    
+    Sidecar files (thumbnail, description, link, info.json) are written on
+    the shared sidecar pool; the thumbnail fetch starts as soon as the
+    filename is known, in parallel with the video download. Their futures
+    are appended to pending_sidecars for the caller to wait on, or awaited
+    before returning when it is None.
+    
+    bandwidth_slot (from the bandwidth governor) throttles the download to
+    the job's current share of the global and per-user limits.
+    manager_opts holds the options the manager implements itself rather than
+    yt-dlp (write_info_json, write_thumbnail, write_description, write_link).
     Returns (returncode, info_json, error_message).
     """
     opts = ytdlp_opts.copy()
+    manager_opts = manager_opts or {}
     
     opts['quiet'] = False
     opts['verbose'] = True
@@ -285,25 +308,72 @@ def run_yt_dlp(
         opts['http_headers'] = {'User-Agent': get_random_user_agent()}
     
     if output_template:
-        opts['outtmpl'] = output_template
+        if isinstance(opts.get('outtmpl'), dict):
+            opts['outtmpl'] = {**opts['outtmpl'], 'default': output_template}
+        else:
+            opts['outtmpl'] = output_template
     
-    state = DownloadState(timeout, stall_timeout, log_callback)
+    state = DownloadState(timeout, stall_timeout, log_callback, stall_min_rate)
     info_json_str = ""
+    finished_files: List[str] = []
+    moved_files: List[str] = []
+    sidecars = get_sidecar_pool()
+    sidecar_futures: List[Any] = []
+    thumbnails_requested = set()
+    
+    def track_sidecar(future, label: str, path: str):
+        def report(done):
+            error = done.exception()
+            if error:
+                state.log(f"Failed to write {label}: {error}")
+            else:
+                state.log(f"Wrote {label}: {path}")
+        future.add_done_callback(report)
+        sidecar_futures.append(future)
+    
+    def fetch_thumbnail(info: Dict[str, Any], filename: str):
+        thumb_url = info.get('thumbnail')
+        thumb_path = os.path.splitext(filename)[0] + '.webp'
+        if not thumb_url or thumb_path in thumbnails_requested or os.path.exists(thumb_path):
+            return
+        thumbnails_requested.add(thumb_path)
+        track_sidecar(sidecars.fetch(thumb_url, thumb_path, opts.get('http_headers')), "thumbnail", thumb_path)
+    
+    def record_files(paths: List[str]):
+        if produced_files is None:
+            return
+        for path in paths:
+            if path not in produced_files and os.path.isfile(path):
+                produced_files.append(path)
     
     def progress_hook(d):
         status = d.get('status', '')
         
         if status == 'downloading':
+            if bandwidth_slot and bandwidth_slot.rate:
+                # Don't report a download held back by the governor as a stall
+                state.min_rate = min(stall_min_rate, bandwidth_slot.rate // 2)
             if not state.check_progress(status, d):
                 raise Exception("Download stalled or timed out")
+            if bandwidth_slot:
+                bandwidth_slot.throttle(d)
         
         if status == 'finished':
             state.log(f"  [finished] {d.get('filename', 'unknown')}")
+            if d.get('filename'):
+                finished_files.append(d['filename'])
         
         if status == 'error':
             state.log(f"  [error] {d.get('error', 'unknown error')}", True)
     
+    def postprocessor_hook(d):
+        if d.get('status') == 'finished' and d.get('postprocessor') == 'MoveFiles':
+            filepath = (d.get('info_dict') or {}).get('filepath')
+            if filepath:
+                moved_files.append(filepath)
+    
     opts['progress_hooks'] = [progress_hook]
+    opts['postprocessor_hooks'] = [postprocessor_hook]
     
     # Filter to suppress verbose/unimportant yt-dlp messages
     def filter_log(msg: str) -> bool:
@@ -353,68 +423,82 @@ def run_yt_dlp(
     class Logger:
         def __init__(self, log_func):
             self.log_func = log_func
+            self.last_error = None
         def debug(self, msg):
             if not filter_log(msg):
                 self.log_func(f"[yt-dlp] {msg}")
         def warning(self, msg):
             self.log_func(f"[yt-dlp] {msg}")
         def error(self, msg):
+            # Verbose mode follows each error with its traceback
+            if msg.startswith("ERROR:"):
+                self.last_error = msg
             self.log_func(f"[yt-dlp] {msg}")
         def info(self, msg):
             if not filter_log(msg):
                 self.log_func(f"[yt-dlp] {msg}")
     
-    opts['logger'] = Logger(state.log)
+    logger = Logger(state.log)
+    opts['logger'] = logger
+    ydl = None
     
     try:
         state.log(f"Starting download: {url}")
         
         with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            info_json_str = json.dumps(ydl.sanitize_info(info))
+            if bandwidth_slot:
+                bandwidth_slot.attach(ydl)
+            if manager_opts.get('write_thumbnail'):
+                ydl.add_post_processor(
+                    BeforeDownloadHook(lambda i: fetch_thumbnail(i, i.get('_filename') or ydl.prepare_filename(i))),
+                    when='before_dl',
+                )
+            
+            info = None
+            extracted = False
+            if cached_info:
+                state.log("Using cached metadata, skipping extraction")
+                try:
+                    info = ydl.process_ie_result(cached_info, download=True)
+                except yt_dlp.utils.DownloadError as e:
+                    state.log(f"Cached metadata failed ({e}), extracting again")
+                if ydl._download_retcode:
+                    info = None
+                    ydl._download_retcode = 0
+            if info is None:
+                info = ydl.extract_info(url, download=True)
+                extracted = True
+            if info is None and ydl._download_retcode and not (moved_files or finished_files):
+                # ignoreerrors turned the failure into an empty result
+                raise yt_dlp.utils.DownloadError(logger.last_error or "Download failed")
             
-            if opts.get('write_info_json') and info:
-                final_filename = ydl.prepare_filename(info)
-                info_json_path = os.path.splitext(final_filename)[0] + '.info.json'
-                with open(info_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(ydl.sanitize_info(info), f, ensure_ascii=False, indent=2)
-                state.log(f"Wrote info.json: {info_json_path}")
+            record_files(get_output_files(info) + moved_files)
             
-            if opts.get('write_thumbnail') and info:
+            sanitized_info = ydl.sanitize_info(info)
+            info_json_str = json.dumps(sanitized_info)
+            if info_callback and sanitized_info and extracted:
+                info_callback(sanitized_info)
+            
+            final_filename = ydl.prepare_filename(info) if info else None
+            final_base = os.path.splitext(final_filename)[0] if info else None
+            
+            if manager_opts.get('write_info_json') and info:
+                info_json_path = final_base + '.info.json'
+                track_sidecar(sidecars.write_json(info_json_path, sanitized_info), "info.json", info_json_path)
+            
+            if manager_opts.get('write_thumbnail') and info:
                 # FIXME: --convert-thumbnails option doesn't work - needs ffmpeg or imagemagick dependency
-                final_filename = ydl.prepare_filename(info)
-                thumb_path = os.path.splitext(final_filename)[0] + '.webp'
-                if not os.path.exists(thumb_path) and 'thumbnail' in info:
-                    thumb_url = info.get('thumbnail')
-                    if thumb_url:
-                        try:
-                            import urllib.request
-                            urllib.request.urlretrieve(thumb_url, thumb_path)
-                            state.log(f"Wrote thumbnail: {thumb_path}")
-                        except Exception as e:
-                            state.log(f"Failed to write thumbnail: {e}")
+                fetch_thumbnail(info, final_filename)
             
-            if opts.get('write_description') and info:
-                final_filename = ydl.prepare_filename(info)
-                desc_path = os.path.splitext(final_filename)[0] + '.description'
+            if manager_opts.get('write_description') and info:
+                desc_path = final_base + '.description'
                 if 'description' in info and info['description']:
-                    try:
-                        with open(desc_path, 'w', encoding='utf-8') as f:
-                            f.write(info['description'])
-                        state.log(f"Wrote description: {desc_path}")
-                    except Exception as e:
-                        state.log(f"Failed to write description: {e}")
+                    track_sidecar(sidecars.write_text(desc_path, info['description']), "description", desc_path)
             
-            if opts.get('write_link') and info:
-                final_filename = ydl.prepare_filename(info)
-                link_path = os.path.splitext(final_filename)[0] + '.link'
+            if manager_opts.get('write_link') and info:
+                link_path = final_base + '.link'
                 if 'url' in info:
-                    try:
-                        with open(link_path, 'w', encoding='utf-8') as f:
-                            f.write(info['url'])
-                        state.log(f"Wrote link: {link_path}")
-                    except Exception as e:
-                        state.log(f"Failed to write link: {e}")
+                    track_sidecar(sidecars.write_text(link_path, info['url']), "link", link_path)
             
             if opts.get('download_archive') and info:
                 archive_path = opts.get('download_archive')
@@ -453,17 +537,22 @@ def run_yt_dlp(
         
         # Check if video was downloaded despite the error
         # This handles cases like subtitle 429 errors where video downloads fine
-        if output_template:
-            import glob
-            video_pattern = output_template.replace('%(ext)s', '*')
-            downloaded_files = glob.glob(video_pattern)
-            video_files = [f for f in downloaded_files if f.endswith(('.mp4', '.mkv', '.webm', '.flv'))]
-            if video_files:
-                state.log(f"Video file found despite error: {video_files[0]}")
-                state.log("Download completed successfully (with errors)")
-                return 0, info_json_str, ""
+        video_files = [f for f in moved_files + finished_files if os.path.isfile(f)]
+        if video_files:
+            record_files(video_files)
+            state.log(f"Video file found despite error: {video_files[0]}")
+            state.log("Download completed successfully (with errors)")
+            return 0, info_json_str, ""
         
         return -1, "", error_msg
+    
+    finally:
+        if bandwidth_slot and ydl is not None:
+            bandwidth_slot.detach(ydl)
+        if pending_sidecars is not None:
+            pending_sidecars.extend(sidecar_futures)
+        else:
+            wait_for_sidecars(sidecar_futures, state.log)
 
 
 def ensure_poster(folder_path: str, log_callback: Optional[Callable[[str, bool], None]] = None) -> bool:
@@ -569,8 +658,26 @@ def download_batch(
     stall_timeout: int = 300,
     log_callback: Optional[Callable[[str, bool], None]] = None,
     stop_check_callback: Optional[Callable[[], bool]] = None,
+    stall_min_rate: int = 0,
+    info_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    info_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    pending_sidecars: Optional[List[Any]] = None,
+    bandwidth_slot: Optional[Any] = None,
+    pause_on_error: bool = True,
+    manager_opts: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
-    """Download videos from a dictionary of URLs using args from JSON."""
+    """
+    Download videos from a dictionary of URLs using args from JSON.
+
+    info_lookup may return a cached info dict for a URL to skip extraction;
+    info_callback receives every freshly extracted (sanitized) info dict.
+    Sidecar writes are appended to pending_sidecars when given; otherwise
+    each folder's sidecars are awaited before its poster check.
+    bandwidth_slot is passed on to run_yt_dlp to throttle every download,
+    and manager_opts for the sidecars the manager writes itself.
+    With pause_on_error unset, failures and rate limits don't sleep before
+    the next URL; the caller retries failed URLs later instead.
+    """
     stats = {
         'start_time': datetime.now().isoformat(),
         'videos_downloaded': 0,
@@ -580,10 +687,13 @@ def download_batch(
         'total_urls': 0,
         'timeouts': 0,
         'stalls': 0,
+        'files': [],
+        'error': None,
     }
     
     session_start = time.time()
     videos_downloaded = 0
+    folder_sidecars = [] if pending_sidecars is None else pending_sidecars
     
     for folder_name, urls in urls_dict.items():
         if stop_check_callback and stop_check_callback():
@@ -635,6 +745,13 @@ def download_batch(
                 timeout=download_timeout,
                 stall_timeout=stall_timeout,
                 log_callback=log_callback,
+                cached_info=info_lookup(url) if info_lookup else None,
+                info_callback=info_callback,
+                produced_files=stats['files'],
+                pending_sidecars=folder_sidecars,
+                stall_min_rate=stall_min_rate,
+                bandwidth_slot=bandwidth_slot,
+                manager_opts=manager_opts,
             )
             
             if returncode == -1:
@@ -646,13 +763,15 @@ def download_batch(
                     timestamped_print(f"  Download stalled (no progress for {stall_timeout}s)")
                 stats['errors'] += 1
                 error_msg = stderr[:200] if stderr else "Unknown error"
+                stats['error'] = error_msg
                 timestamped_print(f"  Error: {error_msg}")
                 if log_callback:
                     log_callback(f"  Error: {error_msg}", True)
                 
-                sleep_time = random.uniform(30, 60)
-                timestamped_print(f"  Sleeping {sleep_time:.1f}s before next URL...")
-                time.sleep(sleep_time)
+                if pause_on_error:
+                    sleep_time = random.uniform(30, 60)
+                    timestamped_print(f"  Sleeping {sleep_time:.1f}s before next URL...")
+                    time.sleep(sleep_time)
                 continue
             
             if returncode == 0:
@@ -664,11 +783,12 @@ def download_batch(
             else:
                 stats['errors'] += 1
                 error_msg = stderr[:200] if stderr else "Unknown error"
+                stats['error'] = error_msg
                 timestamped_print(f"  Error: {error_msg}")
                 if log_callback:
                     log_callback(f"  Error: {error_msg}", True)
                 
-                if "rate-limit" in stderr.lower() or "429" in stderr:
+                if pause_on_error and ("rate-limit" in stderr.lower() or "429" in stderr):
                     sleep_time = random.uniform(600, 1200)
                     timestamped_print(f"  Rate limited! Sleeping {sleep_time/60:.1f} minutes")
                     if log_callback:
@@ -690,6 +810,13 @@ def download_batch(
         stats['folders_processed'] += 1
         stats['total_urls'] += len(urls)
         
+        if pending_sidecars is None:
+            wait_for_sidecars(folder_sidecars, log_callback)
+            folder_sidecars.clear()
+        elif ensure_posters:
+            # The poster is picked from the thumbnails
+            wait_for_sidecars(folder_sidecars)
+        
         if ensure_posters:
             ensure_poster(folder_path, log_callback)
         
@@ -747,12 +874,22 @@ Examples:
         upgrade_yt_dlp()
     
     base_args = {}
+    manager_opts = {}
     if args.args:
         if os.path.exists(args.args):
             print(f"Loading arguments from {args.args}", flush=True)
             with open(args.args, 'r', encoding='utf-8') as f:
-                args_dict = json.load(f)
-            base_args, custom = build_yt_dlp_opts_from_json(args_dict)
+                content = f.read()
+            from backend.services.config_compiler import compile_config
+            try:
+                compiled = compile_config(content)
+            except ValueError as e:
+                print(f"Error: Invalid JSON in {args.args}: {e}", flush=True)
+                sys.exit(1)
+            for error in compiled.errors:
+                print(f"Warning: Ignoring setting in {args.args}: {error}", flush=True)
+            base_args = compiled.opts
+            manager_opts = compiled.manager
             print(f"Loaded {len(base_args)} arguments from JSON", flush=True)
         else:
             print(f"Warning: Args file not found: {args.args}", flush=True)
@@ -783,7 +920,8 @@ Examples:
             ensure_posters=args.poster,
             use_random_agent=use_random_agent,
             download_timeout=args.download_timeout,
-            stall_timeout=args.stall_timeout
+            stall_timeout=args.stall_timeout,
+            manager_opts=manager_opts,
         )
         
         print(f"\n{'='*60}", flush=True)
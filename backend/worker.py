@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+worker.py - Standalone download worker
+
+Claims pending jobs from the shared download_jobs table and runs them with
+run_download, heartbeating each job while it runs. Any number of workers
+can run on hosts that share the database and the data volume; set
+BACKEND_EXECUTION_MODE=external on the API so it only queues jobs.
+Running jobs of a worker that stops heartbeating are put back in the
+queue by the other workers.
+
+SIGINT/SIGTERM stop claiming and wait for running jobs to finish; a second
+signal exits at once (those jobs are reclaimed once they go stale).
+
+Usage:
+    python -m backend.worker --concurrency 2
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import uuid
+
+from backend.core.config import EXECUTION_MODE, MAX_CONCURRENT_DOWNLOADS, WORKER_POLL_INTERVAL
+from backend.core.deps import app_logger
+from backend.db.base import Base
+from backend.db.session import engine
+from backend.db.migrate import upgrade_schema
+from backend.db import models  # noqa: F401 - registers the tables
+from backend.services import downloader
+from backend.services.job_queue import ClaimedJob, JobHeartbeat, claim_next_job
+
+
+class JobWorker:
+    def __init__(self, worker_id: str, concurrency: int, use_processes: bool):
+        self.worker_id = worker_id
+        self.concurrency = max(concurrency, 1)
+        self.use_processes = use_processes
+        self.stopping = threading.Event()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def run(self):
+        app_logger.info(f"Worker {self.worker_id} started, running up to {self.concurrency} jobs")
+        JobHeartbeat(self.worker_id, downloader.stop_local_job).start()
+
+        while not self.stopping.is_set():
+            try:
+                while self._free_slots() > 0 and not self.stopping.is_set():
+                    job = claim_next_job(self.worker_id)
+                    if job is None:
+                        break
+                    self._start(job)
+            except Exception as e:
+                app_logger.error(f"Worker {self.worker_id} failed to poll for jobs: {e}")
+            self.stopping.wait(WORKER_POLL_INTERVAL)
+
+        app_logger.info(f"Worker {self.worker_id} stopping, waiting for {len(self._threads)} running jobs")
+        for thread in list(self._threads.values()):
+            thread.join()
+        app_logger.info(f"Worker {self.worker_id} stopped")
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            for job_id, thread in list(self._threads.items()):
+                if not thread.is_alive():
+                    del self._threads[job_id]
+            return self.concurrency - len(self._threads)
+
+    def _start(self, job: ClaimedJob):
+        app_logger.info(f"Worker {self.worker_id} claimed job {job.job_id} ({job.username}: {job.config_name}/{job.urls_name})")
+        thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.job_id}")
+        with self._lock:
+            self._threads[job.job_id] = thread
+        thread.start()
+
+    def _run_job(self, job: ClaimedJob):
+        args = (job.username, job.config_name, job.urls_name, job.job_id, job.create_symlinks)
+        try:
+            if self.use_processes:
+                from backend.services.workers import run_download_in_worker
+                run_download_in_worker(*args, dispatch_next=False)
+            else:
+                downloader.run_download(*args, dispatch_next=False)
+        except Exception as e:
+            app_logger.error(f"Job {job.job_id} crashed in worker {self.worker_id}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run download jobs from the shared job queue")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_DOWNLOADS, help="Jobs to run at once")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}",
+                        help="Name recorded on claimed jobs")
+    parser.add_argument("--processes", action="store_true", default=EXECUTION_MODE == "process",
+                        help="Run each job in an isolated worker process")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+    worker = JobWorker(args.worker_id, args.concurrency, args.processes)
+
+    def handle_signal(signum, frame):
+        if worker.stopping.is_set():
+            os._exit(1)
+        worker.stopping.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -96,17 +96,23 @@ class ApiClient {
   }
 
   async changePassword(currentPassword: string, newPassword: string): Promise<void> {
-    return this.request('/api/v1/auth/me/password', {
+    const data = await this.request<{ access_token?: string }>('/api/v1/auth/me/password', {
       method: 'POST',
       body: JSON.stringify({ current_password: currentPassword, new_password: newPassword }),
     });
+    if (data?.access_token) {
+      this.setToken(data.access_token);
+    }
   }
 
   async changeUsername(newUsername: string): Promise<void> {
-    return this.request('/api/v1/auth/me/username', {
+    const data = await this.request<{ access_token?: string }>('/api/v1/auth/me/username', {
       method: 'PUT',
       body: JSON.stringify({ new_username: newUsername }),
     });
+    if (data?.access_token) {
+      this.setToken(data.access_token);
+    }
   }
 
   async changeEmail(newEmail: string): Promise<any> {